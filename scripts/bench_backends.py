@@ -0,0 +1,114 @@
+# =============================================
+# BENCHMARK BACKEND INFERENSI: LATENSI DAN PARITAS mAP
+# =============================================
+# Contoh:
+#   python bench_backends.py ../detections --backends pytorch onnx openvino
+#   python bench_backends.py clip.mkv --backends pytorch onnx=/path/yolov11n1_int8.onnx
+#
+# Backend pertama menjadi referensi: deteksinya dipakai sebagai ground truth
+# sehingga mAP@0.5 backend lain menunjukkan seberapa mirip hasilnya.
+
+import time
+import argparse
+import numpy as np
+from config.settings import BACKEND_MODEL_PATHS, INFERENCE_THREADS
+from utils.inference_backend import create_backend
+from utils.tracker import iou_matrix
+from bench_road_marking import load_frames
+
+def average_precision(recall, precision):
+    """AP interpolasi 101 titik (gaya COCO)"""
+    # Envelope: presisi maksimum untuk recall >= r
+    precision = np.flip(np.maximum.accumulate(np.flip(precision)))
+    points = np.linspace(0, 1, 101)
+    indices = np.searchsorted(recall, points, side="left")
+    values = np.where(indices < len(recall), precision[np.minimum(indices, len(recall) - 1)], 0.0)
+    return float(np.mean(values))
+
+def map50(predictions, references):
+    """mAP@0.5 prediksi terhadap deteksi referensi (list array Nx6 per frame)"""
+    classes = set()
+    for ref in references:
+        classes.update(ref[:, 5].astype(int).tolist())
+
+    aps = []
+    for cls in classes:
+        gt = [ref[ref[:, 5] == cls, :4] for ref in references]
+        total_gt = sum(len(g) for g in gt)
+        matched = [np.zeros(len(g), dtype=bool) for g in gt]
+
+        candidates = []
+        for frame_index, pred in enumerate(predictions):
+            for row in pred[pred[:, 5] == cls]:
+                candidates.append((row[4], frame_index, row[:4]))
+        candidates.sort(key=lambda item: -item[0])
+
+        tp = np.zeros(len(candidates))
+        for i, (_, frame_index, box) in enumerate(candidates):
+            if len(gt[frame_index]) == 0:
+                continue
+            ious = iou_matrix([box], gt[frame_index])[0]
+            ious[matched[frame_index]] = 0
+            best = int(np.argmax(ious))
+            if ious[best] >= 0.5:
+                matched[frame_index][best] = True
+                tp[i] = 1
+
+        if not candidates:
+            aps.append(0.0)
+            continue
+        cum_tp = np.cumsum(tp)
+        recall = cum_tp / max(total_gt, 1)
+        precision = cum_tp / np.arange(1, len(candidates) + 1)
+        aps.append(average_precision(recall, precision))
+    return float(np.mean(aps)) if aps else 1.0
+
+def run_backend(backend, frames, conf, imgsz, warmup=5):
+    for frame in frames[:warmup]:
+        backend.detect([frame], conf, imgsz)
+    detections, latencies = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        detections.append(backend.detect([frame], conf, imgsz)[0])
+        latencies.append((time.perf_counter() - start) * 1000)
+    return detections, np.array(latencies)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend inferensi (latensi + paritas mAP)")
+    parser.add_argument("source", help="File video atau folder berisi gambar .jpg")
+    parser.add_argument("--backends", nargs="+", default=["pytorch", "onnx"],
+                        help="Nama backend, opsional dengan path: onnx=/path/model.onnx")
+    parser.add_argument("--imgsz", type=int, default=320)
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--max-frames", type=int, default=200)
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.max_frames)
+    if not frames:
+        print("❌ Tidak ada frame yang bisa dibaca dari sumber.")
+        return
+    print(f"🎞️  {len(frames)} frame dari {args.source}")
+
+    rows, reference = [], None
+    for spec in args.backends:
+        kind, _, path = spec.partition("=")
+        path = path or BACKEND_MODEL_PATHS[kind]
+        backend = create_backend(kind, path, INFERENCE_THREADS)
+        detections, latencies = run_backend(backend, frames, args.conf, args.imgsz)
+        if reference is None:
+            reference = detections
+        rows.append((spec, latencies, map50(detections, reference), sum(len(d) for d in detections)))
+        print(f"   ✓ {spec} selesai")
+
+    base_latency = np.mean(rows[0][1])
+    print("\n" + "="*80)
+    print(f"⚡ HASIL BENCHMARK BACKEND (imgsz {args.imgsz}, referensi: {rows[0][0]})")
+    print("="*80)
+    print(f"   {'Backend':<28}{'mean ms':>9}{'p50':>8}{'p95':>8}{'speedup':>9}{'mAP50':>8}{'boxes':>7}")
+    for spec, latencies, score, boxes in rows:
+        print(f"   {spec[:27]:<28}{latencies.mean():>9.2f}{np.percentile(latencies, 50):>8.2f}"
+              f"{np.percentile(latencies, 95):>8.2f}{base_latency / latencies.mean():>8.2f}x{score:>8.3f}{boxes:>7}")
+    print("="*80)
+
+if __name__ == "__main__":
+    main()
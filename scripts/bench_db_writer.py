@@ -0,0 +1,106 @@
+# =============================================
+# BENCHMARK PENULISAN DATABASE: PER RECORD vs BATCH
+# =============================================
+# Contoh:
+#   python bench_db_writer.py --records 2000
+#   python bench_db_writer.py --backend mysql --records 500
+#
+# Cara lama: SELECT COUNT(*) + INSERT + commit untuk setiap pelanggaran.
+# Cara baru: ViolationWriter (executemany + INSERT IGNORE, flush per batch).
+
+import os
+import time
+import argparse
+import tempfile
+from config.settings import DB_CONFIG
+from utils.save_db import create_db_backend, ViolationWriter
+
+def make_records(count, duplicate_every):
+    records = []
+    for i in range(count):
+        # Sebagian record sengaja duplikat untuk menguji anti-duplikasi
+        index = i - 1 if duplicate_every and i % duplicate_every == 0 and i > 0 else i
+        records.append({
+            'label': 'car',
+            'timestamp': '2024-12-25 14:30:22',
+            'image_path': f"/tmp/bench_car_20241225_143022_{index}.jpg"
+        })
+    return records
+
+def legacy_insert(backend, records):
+    """Pola lama: cek dulu lalu insert dan commit per record"""
+    if backend.kind == "sqlite":
+        conn, placeholder = backend.conn, "?"
+    else:
+        conn, placeholder = backend.pool.get_connection(), "%s"
+    inserted = 0
+    for record in records:
+        cursor = conn.cursor()
+        image_name = os.path.basename(record['image_path'])
+        cursor.execute(f"SELECT COUNT(*) FROM violations WHERE image_path = {placeholder}", (image_name,))
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"INSERT INTO violations (label, timestamp, image_path) VALUES "
+                           f"({placeholder}, {placeholder}, {placeholder})",
+                           (record['label'], record['timestamp'], image_name))
+            conn.commit()
+            inserted += 1
+        cursor.close()
+    if backend.kind != "sqlite":
+        conn.close()
+    return inserted
+
+def batched_insert(backend, records, batch_size, flush_interval):
+    writer = ViolationWriter(backend, batch_size=batch_size, flush_interval=flush_interval)
+    writer.start()
+    for record in records:
+        writer.put(record)
+    writer.stop()
+    return writer.get_stats()['inserted']
+
+def clear(backend):
+    if backend.kind == "sqlite":
+        backend.conn.execute("DELETE FROM violations WHERE image_path LIKE 'bench_%'")
+        backend.conn.commit()
+    else:
+        conn = backend.pool.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM violations WHERE image_path LIKE 'bench\\_%'")
+        conn.commit()
+        cursor.close()
+        conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark penulisan data pelanggaran ke database")
+    parser.add_argument("--backend", choices=["sqlite", "mysql"], default="sqlite")
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--duplicate-every", type=int, default=10, help="Setiap N record adalah duplikat")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    sqlite_file = os.path.join(tempfile.mkdtemp(), "bench_violations.db")
+    backend = create_db_backend(args.backend, DB_CONFIG, sqlite_file=sqlite_file)
+    records = make_records(args.records, args.duplicate_every)
+
+    results = []
+    for name, run in [("per record", lambda: legacy_insert(backend, records)),
+                      ("batch", lambda: batched_insert(backend, records, args.batch_size, args.flush_interval))]:
+        clear(backend)
+        start = time.perf_counter()
+        inserted = run()
+        elapsed = time.perf_counter() - start
+        results.append((name, elapsed, inserted))
+
+    clear(backend)
+    backend.close()
+
+    print("\n" + "="*60)
+    print(f"🗄️  HASIL BENCHMARK DATABASE ({args.backend}, {args.records} record)")
+    print("="*60)
+    for name, elapsed, inserted in results:
+        print(f"   {name:<12}: {elapsed * 1000:8.1f}ms | {args.records / elapsed:9.0f} record/s | {inserted} baris baru")
+    print(f"   Speedup     : {results[0][1] / results[1][1]:.1f}x")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
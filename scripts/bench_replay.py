@@ -0,0 +1,236 @@
+# =============================================
+# REPLAY VIDEO REKAMAN LEWAT PIPELINE PELANGGARAN LENGKAP
+# =============================================
+# Contoh:
+#   python bench_replay.py "/home/surya/Desktop/PA/sample/2025-05-01 14-30-52.mkv"
+#   python bench_replay.py clip.mkv --backend onnx --light-offset 25 --report hasil_onnx.json
+#
+# Berbeda dengan cobavideo.py (hanya YOLO, diputar sesuai FPS video), harness ini
+# menjalankan stage yang sama dengan main.py: deteksi marka, scheduler fase lampu,
+# inferensi + tracker + aturan pelanggaran, simpan bukti, dan tulis database.
+# - Jam simulasi: waktu frame = awal + indeks / FPS video, bukan time.time(), dipakai
+#   untuk fase lampu, rate capture per fase, serta cache/verifikasi ulang garis marka,
+#   jadi hasil selalu sama untuk video yang sama, berapa pun kecepatan CPU
+# - Secepat CPU: semua antrian memakai policy "block" (tidak ada frame dibuang)
+# - Bukti JPEG ditulis ke folder sementara, database ke SQLite lokal; tanpa transfer SFTP
+#
+# Laporan: FPS, persentil latensi per tahap, jumlah pelanggaran, dan peak RSS.
+
+import os
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import itertools
+import cv2
+from config.settings import BACKEND_MODEL_PATHS, INFERENCE_BACKEND, INFERENCE_THREADS, INFERENCE_IMGSZ
+from config.settings import TRACKER_CONFIG, MARKING_MODE, MARKING_CALIBRATION, MARKING_DETECTOR
+from config.settings import BAND_INFERENCE, MOTION_GATE, PHASE_PROFILES, WARMUP_LEAD, PIPELINE_STAGES
+from config.settings import EVIDENCE, DB_WRITER, cycle_time
+from utils.inference_backend import create_backend
+from utils.detection_stages import DetectionStages
+from utils.pipeline import Stage, Pipeline, POLICY_BLOCK
+from utils.road_marking import RoadMarkingDetector, StopLineCalibrator
+from utils.tracker import ViolationTracker
+from utils.motion_gate import MotionGate
+from utils.multi_camera import CameraState
+from utils.scheduler import PhaseScheduler
+from utils.evidence import EvidenceWriter
+from utils.save_db import SQLiteBackend, ViolationWriter
+from utils.streaming_stats import StreamingStats
+
+SPANS = ["capture", "marking", "predict", "postprocess", "evidence", "db", "frame"]
+
+class ReplayMetrics:
+    """Pengganti MetricsRegistry: setiap span disimpan sebagai StreamingStats (untuk persentil)"""
+
+    def __init__(self):
+        self.spans = {}
+
+    def observe(self, name, seconds):
+        self.spans.setdefault(name, StreamingStats()).add(seconds * 1000)
+
+    def span(self, name):
+        return _Span(self, name)
+
+
+class _Span:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+
+
+def create_replay_camera(calibration_file, sim_start, light_offset):
+    """Kamera tanpa grabber (frame dibaca langsung dari video oleh loop replay)"""
+    detector = RoadMarkingDetector(**MARKING_DETECTOR)
+    calibrator = StopLineCalibrator("replay", calibration_file, detector=detector, **MARKING_CALIBRATION)
+    tracker = ViolationTracker(id_source=itertools.count(1), **TRACKER_CONFIG)
+    motion_gate = None
+    if MOTION_GATE['enabled']:
+        motion_gate = MotionGate(scale=MOTION_GATE['scale'],
+                                 pixel_threshold=MOTION_GATE['pixel_threshold'],
+                                 min_changed_ratio=MOTION_GATE['min_changed_ratio'],
+                                 heartbeat_frames=MOTION_GATE['heartbeat_frames'],
+                                 learning_rate=MOTION_GATE['learning_rate'],
+                                 above=BAND_INFERENCE['above'], below=BAND_INFERENCE['below'])
+    return CameraState("replay", None, detector, calibrator, tracker, motion_gate,
+                       start_cycle=sim_start, light_offset=light_offset, location="Replay",
+                       marking_mode=MARKING_MODE,
+                       scheduler_factory=lambda camera_id, cycle: PhaseScheduler(camera_id, cycle, PHASE_PROFILES,
+                                                                                 warmup_lead=WARMUP_LEAD))
+
+def blocking(stage_config):
+    """Konfigurasi antrian yang sama dengan main.py, tetapi tidak pernah membuang frame"""
+    return dict(stage_config, policy=POLICY_BLOCK)
+
+def replay(args, output_dir):
+    cap = cv2.VideoCapture(args.video)
+    if not cap.isOpened():
+        raise SystemExit(f"❌ Video tidak bisa dibuka: {args.video}")
+    video_fps = args.fps or cap.get(cv2.CAP_PROP_FPS) or 30.0
+
+    model_path = args.model or BACKEND_MODEL_PATHS[args.backend]
+    model = create_backend(args.backend, model_path, INFERENCE_THREADS)
+    print(f"🤖 Model dimuat: {args.backend} ({model_path})")
+
+    metrics = ReplayMetrics()
+    sim_start = time.time()
+    calibration_file = args.calibration or os.path.join(output_dir, "calibration.json")
+    camera = create_replay_camera(calibration_file, sim_start, args.light_offset)
+
+    backend = SQLiteBackend(os.path.join(output_dir, "violations.db"))
+    db_writer = ViolationWriter(backend, metrics=metrics, **DB_WRITER, **blocking(PIPELINE_STAGES['database']))
+    evidence_writer = EvidenceWriter(output_dir, on_saved=db_writer.put, metrics=metrics, **EVIDENCE,
+                                     **blocking(PIPELINE_STAGES['evidence']))
+
+    stages = DetectionStages(model, TRACKER_CONFIG['low_thresh'], INFERENCE_IMGSZ,
+                             band=BAND_INFERENCE if BAND_INFERENCE['enabled'] else None, metrics=metrics)
+    totals = {'frames': 0, 'violations': 0}
+
+    def stage_done(batch):
+        """Akhir pipeline: latensi frame (masuk pipeline → selesai aturan pelanggaran)"""
+        for ctx in batch:
+            metrics.observe("frame", time.time() - ctx['start_time'])
+            totals['frames'] += 1
+            totals['violations'] += len(ctx['violations'])
+
+    marking_stage = Stage("marking", stages.marking, **blocking(PIPELINE_STAGES['marking']))
+    inference_stage = Stage("inference", stages.inference, **blocking(PIPELINE_STAGES['inference']))
+    done_stage = Stage("done", stage_done, maxsize=64, policy=POLICY_BLOCK)
+    marking_stage.connect(inference_stage)
+    inference_stage.connect(evidence_writer, when=lambda batch: any(ctx['violations'] for ctx in batch))
+    inference_stage.connect(done_stage)
+    pipeline = Pipeline([marking_stage, inference_stage, done_stage, evidence_writer, db_writer])
+    pipeline.start()
+
+    frames_read = 0
+    frames_skipped = 0
+    start = time.perf_counter()
+    while args.max_frames is None or frames_read < args.max_frames:
+        now = sim_start + frames_read / video_fps
+        if not camera.scheduler.frame_due(now):
+            # Di luar jadwal capture fase ini: lewati tanpa decode penuh
+            if not cap.grab():
+                break
+            frames_read += 1
+            frames_skipped += 1
+            continue
+
+        capture_start = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret:
+            break
+        metrics.observe("capture", time.perf_counter() - capture_start)
+        ctx = {
+            'camera': camera,
+            'frame': frame,
+            'frame_id': frames_read,
+            'frame_time': now,
+            'start_time': time.time()
+        }
+        ctx.update(camera.scheduler.on_frame(now))
+        frames_read += 1
+        marking_stage.put([ctx])
+
+    pipeline.stop()
+    wall = time.perf_counter() - start
+    cap.release()
+
+    stored = backend.conn.execute("SELECT COUNT(*) FROM violations").fetchone()[0]
+    backend.close()
+    return {
+        'video': os.path.basename(args.video),
+        'backend': args.backend,
+        'video_fps': video_fps,
+        'sim_seconds': frames_read / video_fps,
+        'light_cycles': frames_read / video_fps / cycle_time,
+        'frames_read': frames_read,
+        'frames_skipped': frames_skipped,
+        'frames_processed': totals['frames'],
+        'wall_seconds': wall,
+        'fps': totals['frames'] / wall if wall > 0 else 0.0,
+        'realtime_factor': frames_read / video_fps / wall if wall > 0 else 0.0,
+        'violations': totals['violations'],
+        'violations_stored': stored,
+        'evidence_bytes': evidence_writer.get_stats()['bytes_written'],
+        # ru_maxrss dalam KB di Linux
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'spans_ms': {name: metrics.spans[name].summary() for name in SPANS if name in metrics.spans}
+    }
+
+def print_report(report):
+    print("\n" + "="*78)
+    print(f"🎬 HASIL REPLAY: {report['video']} ({report['backend']})")
+    print("="*78)
+    print(f"   Video     : {report['frames_read']} frame @ {report['video_fps']:.1f} FPS = "
+          f"{report['sim_seconds']:.1f}s simulasi ({report['light_cycles']:.1f} siklus lampu)")
+    print(f"   Diproses  : {report['frames_processed']} frame | {report['frames_skipped']} dilewati scheduler fase")
+    print(f"   Waktu     : {report['wall_seconds']:.2f}s | {report['fps']:.1f} frame/s | "
+          f"{report['realtime_factor']:.1f}x realtime")
+    print(f"   Pelanggaran: {report['violations']} terdeteksi | {report['violations_stored']} tersimpan di database | "
+          f"bukti {report['evidence_bytes'] / (1024 * 1024):.1f} MB")
+    print(f"   Peak RSS  : {report['peak_rss_mb']:.0f} MB")
+    print(f"\n   {'Tahap (ms)':<14}{'n':>7}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name, summary in report['spans_ms'].items():
+        print(f"   {name:<14}{summary['count']:>7}{summary['mean']:>9.2f}{summary['p50']:>9.2f}"
+              f"{summary['p95']:>9.2f}{summary['p99']:>9.2f}{summary['max']:>9.2f}")
+    print("="*78)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay video rekaman lewat pipeline pelanggaran (secepat CPU)")
+    parser.add_argument("video", help="File video rekaman (.mkv/.mp4)")
+    parser.add_argument("--backend", default=INFERENCE_BACKEND, choices=sorted(BACKEND_MODEL_PATHS))
+    parser.add_argument("--model", help="Path model (default: BACKEND_MODEL_PATHS di settings)")
+    parser.add_argument("--fps", type=float, help="FPS video jika metadata kontainer salah/kosong")
+    parser.add_argument("--light-offset", type=float, default=0.0,
+                        help="Detik dalam siklus lampu pada awal video (0 = awal RED)")
+    parser.add_argument("--max-frames", type=int, help="Batasi jumlah frame video yang dibaca")
+    parser.add_argument("--calibration", help="File kalibrasi marka yang sudah ada (default: kalibrasi ulang dari video)")
+    parser.add_argument("--output", help="Folder bukti + violations.db (default: folder sementara, dihapus)")
+    parser.add_argument("--report", help="Simpan laporan sebagai JSON untuk dibandingkan antar versi/setting")
+    args = parser.parse_args()
+
+    output_dir = args.output or tempfile.mkdtemp(prefix="replay_")
+    os.makedirs(output_dir, exist_ok=True)
+    try:
+        report = replay(args, output_dir)
+    finally:
+        if not args.output:
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Laporan disimpan: {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# =============================================
+# BENCHMARK DETEKSI MARKA: VERSI LAMA VS CEPAT
+# =============================================
+# Contoh:
+#   python bench_road_marking.py ../detections
+#   python bench_road_marking.py "/home/surya/Desktop/PA/sample/2025-05-01 14-30-52.mkv" --scale 0.5
+
+import os
+import glob
+import time
+import argparse
+import cv2
+import numpy as np
+from utils.road_marking import find_marking_line, find_marking_line_fast
+from config.settings import MARKING_DETECTOR
+
+def load_frames(source, max_frames):
+    """Baca frame dari video atau folder gambar"""
+    frames = []
+    if os.path.isdir(source):
+        for path in sorted(glob.glob(os.path.join(source, "*.jpg")))[:max_frames]:
+            frame = cv2.imread(path)
+            if frame is not None:
+                frames.append(frame)
+    else:
+        cap = cv2.VideoCapture(source)
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    return frames
+
+def time_detector(detector, frames, repeat):
+    """Jalankan detektor pada semua frame; return hasil dan waktu per frame (ms)"""
+    results = [detector(frame) for frame in frames]  # warm-up sekaligus hasil
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            detector(frame)
+    elapsed = time.perf_counter() - start
+    return results, elapsed / (repeat * len(frames)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark deteksi garis marka lama vs cepat")
+    parser.add_argument("source", help="File video atau folder berisi gambar .jpg")
+    parser.add_argument("--scale", type=float, default=MARKING_DETECTOR['scale'],
+                        help="Faktor downscale detektor cepat (default: MARKING_DETECTOR di settings)")
+    parser.add_argument("--max-frames", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = load_frames(args.source, args.max_frames)
+    if not frames:
+        print("❌ Tidak ada frame yang bisa dibaca dari sumber.")
+        return
+    print(f"🎞️  {len(frames)} frame dari {args.source} ({frames[0].shape[1]}x{frames[0].shape[0]})")
+
+    old_results, old_ms = time_detector(find_marking_line, frames, args.repeat)
+    new_results, new_ms = time_detector(lambda f: find_marking_line_fast(f, args.scale), frames, args.repeat)
+
+    # Bandingkan posisi y
+    both = [(o, n) for o, n in zip(old_results, new_results) if o is not None and n is not None]
+    only_old = sum(1 for o, n in zip(old_results, new_results) if o is not None and n is None)
+    only_new = sum(1 for o, n in zip(old_results, new_results) if o is None and n is not None)
+    errors = np.abs(np.array([o - n for o, n in both])) if both else np.array([])
+
+    print("\n" + "="*60)
+    print("📐 HASIL BENCHMARK DETEKSI MARKA")
+    print("="*60)
+    print(f"   Lama     : {old_ms:.2f} ms/frame")
+    print(f"   Cepat    : {new_ms:.2f} ms/frame (scale {args.scale})")
+    print(f"   Speedup  : {old_ms / new_ms:.2f}x" if new_ms > 0 else "   Speedup  : -")
+    print(f"   Terdeteksi keduanya : {len(both)}/{len(frames)}")
+    print(f"   Hanya versi lama    : {only_old}")
+    print(f"   Hanya versi cepat   : {only_new}")
+    if len(errors):
+        print(f"   Error y  : rata-rata {errors.mean():.2f}px | median {np.median(errors):.1f}px | "
+              f"p95 {np.percentile(errors, 95):.1f}px | max {errors.max():.0f}px")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
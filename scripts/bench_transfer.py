@@ -0,0 +1,184 @@
+# =============================================
+# BENCHMARK TRANSFER SFTP: JUMLAH SESI vs THROUGHPUT
+# =============================================
+# Contoh:
+#   python bench_transfer.py --files 200 --pool-sizes 1 2 4
+#   python bench_transfer.py --latency 20 --size-kb 80
+#
+# Server SFTP lokal (paramiko, di proses yang sama) dipakai sebagai pengganti
+# laptop tujuan. --latency menambahkan jeda per operasi SFTP untuk meniru
+# round-trip jaringan WiFi/4G, sehingga efek sesi paralel dan arsip batch terlihat.
+
+import os
+import time
+import errno
+import socket
+import shutil
+import argparse
+import tempfile
+import threading
+import paramiko
+from transfer.file_transfer import FileTransferManager
+from transfer.sent_index import SentIndex
+from transfer.transfer_queue import TransferQueue
+
+class StubServer(paramiko.ServerInterface):
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+
+class StubHandle(paramiko.SFTPHandle):
+    def stat(self):
+        return paramiko.SFTPAttributes.from_stat(os.fstat(self.writefile.fileno()))
+
+    def chattr(self, attr):
+        return paramiko.SFTP_OK
+
+
+def make_sftp_interface(root, latency):
+    class StubSFTP(paramiko.SFTPServerInterface):
+        """Petakan path remote ke folder lokal root, dengan jeda per operasi"""
+
+        def _local(self, path):
+            # Path ganda ("//home") ditolak seperti sebagian server SFTP asli, agar bug path ketahuan
+            if "//" in path:
+                raise OSError(errno.ENOENT, "path ganda", path)
+            return os.path.join(root, path.lstrip("/"))
+
+        def _delay(self):
+            if latency:
+                time.sleep(latency)
+
+        def open(self, path, flags, attr):
+            self._delay()
+            try:
+                fd = os.open(self._local(path), flags, 0o644)
+            except OSError as e:
+                return paramiko.SFTPServer.convert_errno(e.errno)
+            handle = StubHandle(flags)
+            handle.filename = self._local(path)
+            handle.readfile = handle.writefile = os.fdopen(fd, "wb" if flags & os.O_WRONLY else "r+b")
+            return handle
+
+        def stat(self, path):
+            self._delay()
+            try:
+                return paramiko.SFTPAttributes.from_stat(os.stat(self._local(path)))
+            except OSError as e:
+                return paramiko.SFTPServer.convert_errno(e.errno)
+
+        lstat = stat
+
+        def mkdir(self, path, attr):
+            self._delay()
+            try:
+                os.mkdir(self._local(path))
+            except OSError as e:
+                return paramiko.SFTPServer.convert_errno(e.errno)
+            return paramiko.SFTP_OK
+
+        def rename(self, oldpath, newpath):
+            self._delay()
+            try:
+                os.replace(self._local(oldpath), self._local(newpath))
+            except OSError as e:
+                return paramiko.SFTPServer.convert_errno(e.errno)
+            return paramiko.SFTP_OK
+
+        posix_rename = rename
+
+    return StubSFTP
+
+
+def start_server(root, latency):
+    """Server SFTP lokal di port acak; return port"""
+    host_key = paramiko.RSAKey.generate(2048)
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(16)
+    interface = make_sftp_interface(root, latency)
+
+    def serve():
+        while True:
+            client, _ = listener.accept()
+            transport = paramiko.Transport(client)
+            transport.add_server_key(host_key)
+            transport.set_subsystem_handler("sftp", paramiko.SFTPServer, interface)
+            transport.start_server(server=StubServer())
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener.getsockname()[1]
+
+
+def run(port, remote_root, pool_size, payloads, legacy_mkdir, batch_size=1):
+    config = {'hostname': "127.0.0.1", 'username': "bench", 'password': "bench", 'port': port,
+              'remote_path': f"/{remote_root}/detections", 'timeout': 10}
+    state_dir = tempfile.mkdtemp()
+    manager = FileTransferManager(config, SentIndex(os.path.join(state_dir, "sent_index.sqlite")),
+                                  TransferQueue(os.path.join(state_dir, "transfer_queue.sqlite")),
+                                  workers=pool_size, batch_size=batch_size, batch_wait=0.5)
+    if legacy_mkdir:
+        # Tiru perilaku lama: cek/buat direktori remote untuk setiap file
+        original = manager._ensure_remote_dir
+
+        def ensure_every_time(sftp, remote_dir):
+            manager.remote_dirs.clear()
+            original(sftp, remote_dir)
+        manager._ensure_remote_dir = ensure_every_time
+
+    start = time.perf_counter()
+    for index, data in enumerate(payloads):
+        manager.add_to_queue(f"car_{index}.jpg", {'index': index}, data=data)
+    manager.join()
+    elapsed = time.perf_counter() - start
+    stats = manager.get_stats()
+    manager.disconnect_ssh()
+    shutil.rmtree(state_dir)
+    return elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark throughput upload SFTP per ukuran pool")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=80, help="Ukuran file (kira-kira JPEG 640x480)")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--latency", type=float, default=5.0, help="Jeda per operasi SFTP (ms)")
+    parser.add_argument("--batch-size", type=int, default=20, help="Ukuran batch arsip tar (0 = tidak diuji)")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp()
+    port = start_server(root, args.latency / 1000)
+    print(f"🖥️  Server SFTP lokal di 127.0.0.1:{port} (jeda {args.latency:.0f}ms/operasi)")
+
+    rows = []
+    runs = [(1, True, 1)] + [(size, False, 1) for size in args.pool_sizes]
+    if args.batch_size > 1:
+        runs.append((1, False, args.batch_size))
+    for pool_size, legacy_mkdir, batch_size in runs:
+        # Isi unik per run agar hash tidak dianggap sudah terkirim
+        payloads = [os.urandom(args.size_kb * 1024) for _ in range(args.files)]
+        remote_root = f"run_{len(rows)}"
+        elapsed, stats = run(port, remote_root, pool_size, payloads, legacy_mkdir, batch_size)
+        name = f"{pool_size} sesi" + (" (cek dir per file)" if legacy_mkdir else "")
+        name += f", arsip {batch_size} file" if batch_size > 1 else ""
+        rows.append((name, elapsed, stats))
+
+    print("\n" + "="*70)
+    print(f"📤 HASIL BENCHMARK TRANSFER ({args.files} file x {args.size_kb} KB)")
+    print("="*70)
+    print(f"   {'Konfigurasi':<26}{'waktu s':>9}{'file/s':>9}{'MB/s':>8}{'gagal':>7}")
+    for name, elapsed, stats in rows:
+        print(f"   {name:<26}{elapsed:>9.2f}{stats['sent'] / elapsed:>9.1f}"
+              f"{stats['bytes_sent'] / (1024 * 1024) / elapsed:>8.2f}{stats['failures']:>7}")
+    print("="*70)
+    shutil.rmtree(root)
+
+if __name__ == "__main__":
+    main()
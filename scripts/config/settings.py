@@ -32,6 +32,27 @@ DB_CONFIG = {
     'database': 'traffic_violation_db'
 }
 
+# Backend database: "mysql" atau "sqlite" (file lokal, untuk uji coba tanpa MySQL)
+DB_BACKEND = "mysql"
+DB_SQLITE_FILE = os.path.join(output_dir, "violations.db")
+DB_POOL_SIZE = 2
+
+# Penulisan batch: simpan saat batch_size record terkumpul atau flush_interval detik berlalu
+DB_WRITER = {
+    'batch_size': 50,
+    'flush_interval': 1.0,
+    'retry_interval': 5.0
+}
+
+# Outbox lokal (SQLite WAL): record tetap aman saat MySQL tidak tersedia
+DB_OUTBOX = {
+    'path': os.path.join(output_dir, "db_outbox.sqlite"),
+    'synchronous': "FULL",  # FULL: tahan mati listrik (commit ditulis ke disk)
+    'batch_size': 200,
+    'retry_interval': 5.0,
+    'drain_timeout': 10.0
+}
+
 # =============================================
 # KONFIGURASI LAPTOP UNTUK TRANSFER
 # =============================================
@@ -51,3 +72,236 @@ LAPTOP_CONFIG = {
 # Bisa gunakan SSH key:
 # LAPTOP_CONFIG['key_filename'] = '/home/surya/.ssh/id_rsa'
 # dan hapus 'password' dari config
+
+# Pool upload SFTP: satu sesi persisten per worker, retry dengan exponential backoff per file
+TRANSFER = {
+    'workers': 2,
+    'max_retries': 5,
+    'backoff_base': 1.0,   # detik, dikali 2 setiap percobaan gagal
+    'backoff_max': 60.0,
+    'join_timeout': 30.0,  # batas tunggu antrian transfer saat program berhenti
+    # Mode batch: > 1 mengirim N file + manifest dalam satu arsip tar (hemat round-trip di 4G).
+    # Jalankan receive_batches.py di laptop tujuan untuk membongkar arsip.
+    'batch_size': 1,
+    'batch_wait': 5.0      # detik maksimum menunggu batch penuh
+}
+
+# Antrian transfer di disk (SQLite) dengan prioritas dan batas ukuran
+TRANSFER_QUEUE = {
+    'path': os.path.join(output_dir, "transfer_queue.sqlite"),
+    'order': "newest",      # "newest" = pelanggaran terbaru dulu, "confidence" = confidence tertinggi dulu
+    'max_items': 5000,      # antrian penuh: item prioritas terendah dikeluarkan (file lokal tetap ada)
+    'max_mb': 1024,
+    'cache_mb': 16          # byte gambar terbaru disimpan di memori agar tidak dibaca ulang dari disk
+}
+
+# Preview saat bandwidth rendah: gambar kecil dikirim dulu, resolusi penuh menyusul
+TRANSFER_PREVIEW = {
+    'enabled': True,
+    'below_kbps': 200,      # kecepatan upload per sesi di bawah ini dianggap rendah
+    'width': 320,
+    'jpeg_quality': 60
+}
+
+# Indeks file terkirim (SQLite append-only + bloom filter, pengganti sent_images.json)
+SENT_INDEX = {
+    'path': os.path.join(output_dir, "sent_index.sqlite"),
+    'capacity': 100000,     # kapasitas awal bloom filter (otomatis diperbesar)
+    'fp_rate': 0.01,
+    'snapshot_every': 500   # simpan snapshot bloom setiap N file terkirim
+}
+
+# =============================================
+# KONFIGURASI SYSTEM MONITOR
+# =============================================
+
+# Interval sampling CPU/RAM/suhu/GPU di thread background (detik)
+MONITOR_INTERVAL = 1.0
+
+# Jendela bergulir untuk laporan statistik terbaru (detik)
+MONITOR_RECENT_WINDOW = 3600
+
+# Probe GPU lewat GPUtil (nvidia-smi). False di Raspberry Pi: GPUtil tidak diimport sama sekali
+MONITOR_GPU = True
+
+# Endpoint metrik Prometheus (histogram latensi per tahap + gauge sistem/antrian)
+METRICS = {
+    'enabled': True,
+    'host': "127.0.0.1",   # "0.0.0.0" agar bisa di-scrape dari jaringan
+    'port': 9108
+}
+
+# =============================================
+# KONFIGURASI TAMPILAN
+# =============================================
+
+# True untuk unit tanpa monitor: tidak ada overlay dan cv2.imshow (keluar dengan Ctrl+C / SIGTERM)
+HEADLESS = False
+
+# Preview MJPEG lewat HTTP untuk pengecekan jarak jauh (buka http://<ip-pi>:8080/ di browser/VLC).
+# Overlay hanya digambar saat ada klien yang terhubung.
+PREVIEW_SERVER = {
+    'enabled': False,
+    'host': "0.0.0.0",
+    'port': 8080,
+    'max_fps': 5,
+    'max_width': 640,
+    'jpeg_quality': 70
+}
+
+# =============================================
+# KONFIGURASI CAPTURE KAMERA
+# =============================================
+
+CAMERA_SOURCE = 0
+
+# Daftar kamera. Semua kamera memakai satu model YOLO dengan inferensi batch.
+# light_offset (detik) menggeser siklus lampu kamera tersebut.
+CAMERAS = [
+    {'id': 'cam1', 'source': CAMERA_SOURCE, 'location': 'Traffic Light Camera 1', 'light_offset': 0},
+    # {'id': 'cam2', 'source': 2, 'location': 'Traffic Light Camera 2', 'light_offset': 0},
+]
+# "latest": selalu proses frame terbaru (kamera live)
+# "all"   : proses semua frame berurutan (video rekaman)
+CAPTURE_MODE = "latest"
+CAPTURE_BUFFER_SIZE = 4
+
+# =============================================
+# KONFIGURASI PIPELINE
+# =============================================
+
+# Ukuran antrian dan policy backpressure tiap stage:
+# "block" (tidak ada data hilang), "drop_oldest", atau "drop_newest"
+PIPELINE_STAGES = {
+    'marking': {'maxsize': 2, 'policy': 'drop_oldest'},
+    'inference': {'maxsize': 2, 'policy': 'drop_oldest'},
+    'evidence': {'maxsize': 64, 'policy': 'block'},
+    'database': {'maxsize': 256, 'policy': 'block'},
+    'display': {'maxsize': 1, 'policy': 'drop_oldest'}
+}
+
+# =============================================
+# KONFIGURASI TRACKER KENDARAAN
+# =============================================
+
+TRACKER_CONFIG = {
+    'high_thresh': 0.6,   # Confidence minimal untuk membuat track baru
+    'low_thresh': 0.25,   # Deteksi lemah hanya dipakai untuk melanjutkan track
+    'match_iou': 0.3,     # IoU minimal antara prediksi track dan deteksi
+    'max_age': 30,        # Frame maksimum track boleh hilang sebelum dihapus
+    'min_hits': 2         # Track harus terlihat minimal N kali sebelum bisa melanggar
+}
+
+# =============================================
+# KONFIGURASI KALIBRASI GARIS MARKA
+# =============================================
+
+# "static" : garis dicari sekali dari burst frame lalu hanya diverifikasi berkala
+# "dynamic": deteksi garis di setiap frame (perilaku lama)
+MARKING_MODE = "static"
+MARKING_CALIBRATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "stopline_calibration.json")
+
+MARKING_CALIBRATION = {
+    'burst_frames': 30,       # Jumlah frame untuk kalibrasi awal
+    'verify_interval': 60.0,  # Verifikasi ulang garis tiap N detik
+    'band_height': 6,         # Tinggi pita (px) di atas/bawah garis untuk cek drift
+    'drift_threshold': 0.6,   # Korelasi mask minimal sebelum dianggap drift
+    'drift_retry': 1.0,       # Jeda minimal antar deteksi ulang saat drift (detik)
+    'move_tolerance': 8       # Pergeseran (px) yang dianggap garis berpindah
+}
+
+# Detektor marka: fast=True memakai ROI yang di-downscale dan filter NumPy.
+# Pada scale=1.0 mode fast tidak lebih cepat (detections/: 2.90 ms lama vs 3.21 ms
+# fast) dan juga menghitung garis tepat 0° yang dilewati detektor lama, jadi posisi
+# y bisa berbeda (cek bench_road_marking.py sebelum mengganti mode).
+MARKING_DETECTOR = {
+    'fast': True,
+    'scale': 1.0,          # Downscale ROI mode fast; < 1.0 tidak sama dengan detektor lama (cek bench_road_marking.py)
+    'history_size': 5,     # Jumlah sampel smoothing
+    'cache_seconds': 1.5   # Lama cache dipakai saat garis tidak terdeteksi
+}
+
+# =============================================
+# KONFIGURASI INFERENSI
+# =============================================
+
+# Backend inferensi: "pytorch" (ultralytics), "onnx" (ONNX Runtime), atau "openvino".
+# Model ONNX/OpenVINO dibuat dengan export_model.py
+INFERENCE_BACKEND = "pytorch"
+BACKEND_MODEL_PATHS = {
+    'pytorch': MODEL_PATH,
+    'onnx': MODEL_PATH.replace(".pt", ".onnx"),
+    'openvino': MODEL_PATH.replace(".pt", "_openvino_model")
+}
+INFERENCE_THREADS = 4
+
+# Ukuran input YOLO untuk inferensi seluruh frame
+INFERENCE_IMGSZ = 320
+
+# Inferensi hanya pada pita di sekitar garis marka (resolusi asli crop)
+BAND_INFERENCE = {
+    'enabled': True,
+    'above': 160,      # Tinggi pita di atas garis marka (px)
+    'below': 120,      # Tinggi pita di bawah garis marka (px)
+    'max_imgsz': 640   # Batas sisi terpanjang input saat inferensi pita
+}
+
+# Motion gate: lewati YOLO saat tidak ada gerakan di zona pendekatan
+MOTION_GATE = {
+    'enabled': True,
+    'scale': 0.25,               # Downscale ROI sebelum frame differencing
+    'pixel_threshold': 25,       # Selisih intensitas minimal agar piksel dianggap berubah
+    'min_changed_ratio': 0.002,  # Rasio piksel berubah minimal untuk memicu inferensi
+    'heartbeat_frames': 15,      # Tetap jalankan inferensi tiap N frame tanpa gerakan
+    'learning_rate': 0.05        # Kecepatan update background
+}
+
+# =============================================
+# KONFIGURASI SCHEDULER FASE LAMPU
+# =============================================
+
+# Profil rate per fase lampu:
+#   capture_fps  : batas frame yang diproses per detik (None = secepat mungkin)
+#   marking_every: deteksi garis marka tiap N frame
+PHASE_PROFILES = {
+    'RED': {'capture_fps': None, 'marking_every': 1},
+    'YELLOW': {'capture_fps': 10, 'marking_every': 5},
+    'GREEN': {'capture_fps': 5, 'marking_every': 10}
+}
+
+# Warm-up model N detik sebelum lampu merah
+WARMUP_LEAD = 1.0
+
+# =============================================
+# KONFIGURASI GAMBAR BUKTI
+# =============================================
+
+# Encode JPEG di pool worker (satu encode per frame):
+#   jpeg_quality: kualitas JPEG (0-100)
+#   crop        : simpan potongan kendaraan saja (dengan margin relatif crop_margin)
+#   max_width   : perkecil gambar ke lebar ini (None = ukuran asli)
+EVIDENCE = {
+    'workers': 2,
+    'jpeg_quality': 90,
+    'crop': False,
+    'crop_margin': 0.25,
+    'max_width': None
+}
+
+# =============================================
+# KONFIGURASI BUFFER KLIP PELANGGARAN
+# =============================================
+
+# Ring buffer JPEG di RAM (batas max_mb per kamera). Saat pelanggaran, klip
+# pre_seconds sebelum dan post_seconds sesudah kejadian ditulis ke video.
+CLIP_BUFFER = {
+    'enabled': True,
+    'max_mb': 32,
+    'fps': 10,
+    'jpeg_quality': 70,
+    'max_width': 640,
+    'pre_seconds': 3.0,
+    'post_seconds': 2.0,
+    'fourcc': 'mp4v',
+    'extension': '.mp4'
+}
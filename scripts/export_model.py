@@ -0,0 +1,106 @@
+# =============================================
+# EXPORT MODEL KE ONNX / OPENVINO (OPSIONAL INT8)
+# =============================================
+# Contoh:
+#   python export_model.py --format onnx
+#   python export_model.py --format onnx --int8 --calib-dir ../detections
+#   python export_model.py --format openvino --int8 --calib-dir ../detections
+#
+# Kalibrasi INT8 memakai gambar pelanggaran kita sendiri (tanpa label),
+# jadi distribusi aktivasi sesuai dengan kamera di lapangan.
+
+import os
+import glob
+import shutil
+import argparse
+import cv2
+from config.settings import MODEL_PATH
+from utils.inference_backend import preprocess
+
+def load_calibration_images(calib_dir, limit):
+    paths = sorted(glob.glob(os.path.join(calib_dir, "*.jpg")))[:limit]
+    images = [cv2.imread(path) for path in paths]
+    images = [image for image in images if image is not None]
+    print(f"🖼️  {len(images)} gambar kalibrasi dari {calib_dir}")
+    return images
+
+def export_base(model_path, fmt, imgsz, dynamic):
+    """Export bobot PyTorch memakai exporter ultralytics"""
+    from ultralytics import YOLO
+    model = YOLO(model_path)
+    return model.export(format=fmt, imgsz=imgsz, dynamic=dynamic, simplify=(fmt == "onnx"))
+
+def quantize_onnx(onnx_path, images, imgsz):
+    """Kuantisasi statis INT8 (QDQ) dengan ONNX Runtime"""
+    import onnx
+    from onnxruntime.quantization import (CalibrationDataReader, QuantFormat, QuantType,
+                                          quantize_static)
+
+    class DetectionsReader(CalibrationDataReader):
+        def __init__(self):
+            input_name = onnx.load(onnx_path, load_external_data=False).graph.input[0].name
+            self.samples = iter([{input_name: preprocess([image], (imgsz, imgsz))[0]} for image in images])
+
+        def get_next(self):
+            return next(self.samples, None)
+
+    int8_path = onnx_path.replace(".onnx", "_int8.onnx")
+    quantize_static(onnx_path, int8_path, DetectionsReader(), quant_format=QuantFormat.QDQ,
+                    per_channel=True, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+    # Salin metadata (nama kelas, stride, imgsz) dari model asli
+    original = onnx.load(onnx_path)
+    quantized = onnx.load(int8_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(original.metadata_props)
+    onnx.save(quantized, int8_path)
+    return int8_path
+
+def quantize_openvino(model_dir, images, imgsz):
+    """Kuantisasi INT8 post-training dengan NNCF"""
+    import nncf
+    import openvino as ov
+
+    xml_path = next(os.path.join(model_dir, f) for f in os.listdir(model_dir) if f.endswith(".xml"))
+    model = ov.Core().read_model(xml_path)
+    dataset = nncf.Dataset(images, lambda image: preprocess([image], (imgsz, imgsz))[0])
+    quantized = nncf.quantize(model, dataset, preset=nncf.QuantizationPreset.MIXED,
+                              subset_size=len(images))
+
+    int8_dir = model_dir.rstrip("/").replace("_openvino_model", "_int8_openvino_model")
+    os.makedirs(int8_dir, exist_ok=True)
+    ov.save_model(quantized, os.path.join(int8_dir, os.path.basename(xml_path)))
+    metadata_file = os.path.join(model_dir, "metadata.yaml")
+    if os.path.exists(metadata_file):
+        shutil.copy(metadata_file, int8_dir)
+    return int8_dir
+
+def main():
+    parser = argparse.ArgumentParser(description="Export model YOLO ke ONNX Runtime / OpenVINO")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument("--imgsz", type=int, default=320)
+    parser.add_argument("--dynamic", action="store_true", help="Shape input dinamis (untuk inferensi pita/batch)")
+    parser.add_argument("--int8", action="store_true", help="Kuantisasi INT8 dengan gambar kalibrasi")
+    parser.add_argument("--calib-dir", default=os.path.join(os.path.dirname(__file__), "..", "detections"))
+    parser.add_argument("--calib-size", type=int, default=200)
+    args = parser.parse_args()
+
+    exported = export_base(args.model, args.format, args.imgsz, args.dynamic)
+    print(f"✅ Export {args.format}: {exported}")
+
+    if args.int8:
+        images = load_calibration_images(args.calib_dir, args.calib_size)
+        if not images:
+            print("❌ Tidak ada gambar kalibrasi, kuantisasi INT8 dilewati.")
+            return
+        if args.format == "onnx":
+            exported = quantize_onnx(exported, images, args.imgsz)
+        else:
+            exported = quantize_openvino(exported, images, args.imgsz)
+        print(f"✅ Model INT8: {exported}")
+
+    print("ℹ️  Atur INFERENCE_BACKEND dan BACKEND_MODEL_PATHS di config/settings.py untuk memakainya.")
+
+if __name__ == "__main__":
+    main()
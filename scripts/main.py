@@ -2,199 +2,73 @@ import cv2
 import time
 import os
 import numpy as np
-import mysql.connector
-from datetime import datetime
-from ultralytics import YOLO
-import paramiko
-import threading
-from queue import Queue
-import json
-import hashlib
+from utils.system_monitor import SystemMonitor
+from utils.capture import FrameGrabber
+from utils.pipeline import Stage, Pipeline, BoundedQueue
+from utils.tracker import ViolationTracker
+from utils.road_marking import RoadMarkingDetector, StopLineCalibrator
+from utils.motion_gate import MotionGate
+from utils.multi_camera import CameraState, model_memory_mb
+from utils.inference_backend import create_backend
+from utils.scheduler import PhaseScheduler
+from utils.evidence import EvidenceWriter
+from utils.detection_stages import DetectionStages
+from utils.clip_buffer import ClipBuffer
+from utils.save_db import create_db_backend, ViolationWriter
+from utils.outbox import Outbox, OutboxReplayer
+from utils.metrics import MetricsRegistry, MetricsServer
+from utils.preview_server import PreviewServer
+from utils.startup import StartupTimeline
+from config.settings import HEADLESS, PREVIEW_SERVER
+from config.settings import MONITOR_INTERVAL, MONITOR_RECENT_WINDOW, MONITOR_GPU, METRICS, CAMERAS, CAPTURE_MODE, CAPTURE_BUFFER_SIZE, PIPELINE_STAGES, TRACKER_CONFIG
+from config.settings import MARKING_MODE, MARKING_CALIBRATION_FILE, MARKING_CALIBRATION, MARKING_DETECTOR
+from config.settings import INFERENCE_IMGSZ, BAND_INFERENCE, MOTION_GATE
+from config.settings import INFERENCE_BACKEND, BACKEND_MODEL_PATHS, INFERENCE_THREADS
+from config.settings import dur_red, dur_yellow, dur_green, cycle_time, PHASE_PROFILES, WARMUP_LEAD
+from config.settings import EVIDENCE, CLIP_BUFFER
+from config.settings import DB_CONFIG, DB_BACKEND, DB_SQLITE_FILE, DB_POOL_SIZE, DB_WRITER, DB_OUTBOX
+from config.settings import TRANSFER, SENT_INDEX, TRANSFER_QUEUE, TRANSFER_PREVIEW
+from transfer.file_transfer import FileTransferManager
+from transfer.transfer_queue import TransferQueue
+from transfer.sent_index import SentIndex
+import itertools
 import psutil
-import GPUtil
-from collections import defaultdict, deque
+import signal
+import threading
 
 # =============================================
-# KELAS SYSTEM MONITOR (TAMBAHAN BARU)
+# TIMELINE STARTUP
 # =============================================
-class SystemMonitor:
-    def __init__(self):
-        self.stats = {
-            'RED': defaultdict(list),
-            'YELLOW': defaultdict(list), 
-            'GREEN': defaultdict(list),
-            'OVERALL': defaultdict(list)
-        }
-        self.start_time = time.time()
-        self.last_update = time.time()
-        
-        # Untuk tracking real-time
-        self.current_stats = {
-            'cpu_percent': 0,
-            'ram_percent': 0,
-            'ram_mb': 0,
-            'gpu_percent': 0,
-            'gpu_memory': 0,
-            'temperature': 0,
-            'power_watts': 0
-        }
-        
-        # Deque untuk smoothing data
-        self.cpu_history = deque(maxlen=10)
-        self.ram_history = deque(maxlen=10)
-        self.temp_history = deque(maxlen=10)
-        
-        print("📊 System Monitor initialized")
-    
-    def get_cpu_temperature(self):
-        """Dapatkan suhu CPU (khusus untuk Raspberry Pi)"""
-        try:
-            # Untuk Raspberry Pi
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                temp = float(f.read().strip()) / 1000.0
-                return temp
-        except:
-            try:
-                # Untuk sistem lain
-                temps = psutil.sensors_temperatures()
-                if 'cpu_thermal' in temps:
-                    return temps['cpu_thermal'][0].current
-                elif 'coretemp' in temps:
-                    return temps['coretemp'][0].current
-                else:
-                    return 0
-            except:
-                return 0
-    
-    def estimate_power_consumption(self, cpu_percent, gpu_percent=0):
-        """Estimasi konsumsi daya berdasarkan penggunaan CPU/GPU"""
-        # Estimasi untuk Raspberry Pi 4 (dalam Watts)
-        base_power = 2.5  # Idle power
-        cpu_power = (cpu_percent / 100) * 3.0  # Max CPU power ~3W
-        gpu_power = (gpu_percent / 100) * 1.5  # Max GPU power ~1.5W
-        
-        return base_power + cpu_power + gpu_power
-    
-    def update_stats(self, light_status, fps):
-        """Update statistik sistem"""
-        try:
-            # CPU Usage
-            cpu_percent = psutil.cpu_percent(interval=0.1)
-            self.cpu_history.append(cpu_percent)
-            
-            # RAM Usage
-            ram = psutil.virtual_memory()
-            ram_percent = ram.percent
-            ram_mb = ram.used / (1024 * 1024)
-            self.ram_history.append(ram_percent)
-            
-            # GPU Usage (jika tersedia)
-            gpu_percent = 0
-            gpu_memory = 0
-            try:
-                gpus = GPUtil.getGPUs()
-                if gpus:
-                    gpu = gpus[0]
-                    gpu_percent = gpu.load * 100
-                    gpu_memory = gpu.memoryUsed
-            except:
-                pass
-            
-            # Temperature
-            temperature = self.get_cpu_temperature()
-            self.temp_history.append(temperature)
-            
-            # Power Consumption
-            power_watts = self.estimate_power_consumption(cpu_percent, gpu_percent)
-            
-            # Update current stats (smoothed)
-            self.current_stats = {
-                'cpu_percent': np.mean(self.cpu_history) if self.cpu_history else cpu_percent,
-                'ram_percent': np.mean(self.ram_history) if self.ram_history else ram_percent,
-                'ram_mb': ram_mb,
-                'gpu_percent': gpu_percent,
-                'gpu_memory': gpu_memory,
-                'temperature': np.mean(self.temp_history) if self.temp_history else temperature,
-                'power_watts': power_watts
-            }
-            
-            # Simpan ke statistik per status lampu
-            self.stats[light_status]['fps'].append(fps)
-            self.stats[light_status]['cpu'].append(cpu_percent)
-            self.stats[light_status]['ram'].append(ram_percent)
-            self.stats[light_status]['gpu'].append(gpu_percent)
-            self.stats[light_status]['temperature'].append(temperature)
-            self.stats[light_status]['power'].append(power_watts)
-            
-            # Simpan ke statistik keseluruhan
-            self.stats['OVERALL']['fps'].append(fps)
-            self.stats['OVERALL']['cpu'].append(cpu_percent)
-            self.stats['OVERALL']['ram'].append(ram_percent)
-            self.stats['OVERALL']['gpu'].append(gpu_percent)
-            self.stats['OVERALL']['temperature'].append(temperature)
-            self.stats['OVERALL']['power'].append(power_watts)
-            
-        except Exception as e:
-            print(f"⚠️ Error updating system stats: {e}")
-    
-    def get_current_stats(self):
-        """Dapatkan statistik saat ini"""
-        return self.current_stats
-    
-    def print_final_report(self):
-        """Cetak laporan akhir dengan rata-rata"""
-        print("\n" + "="*80)
-        print("📈 LAPORAN AKHIR SISTEM MONITORING")
-        print("="*80)
-        
-        runtime = time.time() - self.start_time
-        print(f"⏱️  Total Runtime: {runtime/60:.2f} menit ({runtime:.2f} detik)")
-        
-        for status in ['RED', 'YELLOW', 'GREEN', 'OVERALL']:
-            data = self.stats[status]
-            if not data.get('fps'):
-                continue
-                
-            print(f"\n🚦 Status: {status}")
-            print("-" * 40)
-            
-            # Hitung rata-rata
-            avg_fps = np.mean(data['fps'])
-            avg_cpu = np.mean(data['cpu'])
-            avg_ram = np.mean(data['ram'])
-            avg_gpu = np.mean(data['gpu']) if data['gpu'] else 0
-            avg_temp = np.mean(data['temperature'])
-            avg_power = np.mean(data['power'])
-            
-            # Hitung min/max
-            min_fps, max_fps = np.min(data['fps']), np.max(data['fps'])
-            min_cpu, max_cpu = np.min(data['cpu']), np.max(data['cpu'])
-            min_temp, max_temp = np.min(data['temperature']), np.max(data['temperature'])
-            
-            print(f"   FPS      : {avg_fps:.2f} (min: {min_fps:.2f}, max: {max_fps:.2f})")
-            print(f"   CPU      : {avg_cpu:.1f}% (min: {min_cpu:.1f}%, max: {max_cpu:.1f}%)")
-            print(f"   RAM      : {avg_ram:.1f}%")
-            print(f"   GPU      : {avg_gpu:.1f}%")
-            print(f"   Temp     : {avg_temp:.1f}°C (min: {min_temp:.1f}°C, max: {max_temp:.1f}°C)")
-            print(f"   Power    : {avg_power:.2f}W")
-            print(f"   Samples  : {len(data['fps'])}")
-        
-        print("\n" + "="*80)
+# Langkah startup yang saling bebas berjalan paralel; library berat (ultralytics/torch,
+# onnxruntime, openvino, mysql.connector, paramiko, GPUtil) baru diimport di dalam
+# langkah yang memakainya. Waktu dicatat sejak proses dimulai.
+timeline = StartupTimeline()
+timeline.mark("import modul")
+
+# =============================================
+# METRIK LATENSI PER TAHAP
+# =============================================
+# Span capture/marking/predict/postprocess/evidence/db/enqueue/display mengisi
+# histogram yang disajikan endpoint Prometheus (lihat METRICS di settings)
+metrics = MetricsRegistry()
 
 # =============================================
 # KONFIGURASI DATABASE
 # =============================================
-try:
-    db = mysql.connector.connect(
-        host="localhost",
-        user="trafficuser",
-        password="password123",
-        database="traffic_violation_db"
-    )
-    print("✅ Koneksi database berhasil")
-except mysql.connector.Error as e:
-    print(f"❌ Error koneksi database: {e}")
-    exit()
+# Record pelanggaran selalu masuk outbox lokal dulu; replayer mengirimnya ke
+# database saat server tersedia, jadi program tetap jalan walau MySQL mati.
+def connect_database():
+    """Dipanggil di thread replayer: koneksi MySQL tidak menahan startup"""
+    backend = create_db_backend(DB_BACKEND, DB_CONFIG, sqlite_file=DB_SQLITE_FILE, pool_size=DB_POOL_SIZE)
+    timeline.mark_once("koneksi database")
+    return backend
+
+db_outbox = Outbox(DB_OUTBOX['path'], synchronous=DB_OUTBOX['synchronous'])
+db_replayer = OutboxReplayer(db_outbox, connect_database,
+                             batch_size=DB_OUTBOX['batch_size'], retry_interval=DB_OUTBOX['retry_interval'],
+                             metrics=metrics)
+db_replayer.start()
+print(f"📦 Outbox database: {DB_OUTBOX['path']} ({db_outbox.depth()} record tertunda)")
 
 # =============================================
 # KONFIGURASI TRANSFER FILE (SSH/SFTP)
@@ -223,415 +97,284 @@ if not os.path.exists(output_dir):
     os.makedirs(output_dir)
     print(f"📁 Direktori {output_dir} berhasil dibuat")
 
-# File untuk tracking gambar yang sudah dikirim
+# File lama untuk tracking gambar yang sudah dikirim (dimigrasi ke indeks SQLite)
 sent_images_file = os.path.join(output_dir, "sent_images.json")
 
 # =============================================
-# KELAS TRANSFER MANAGER
-# =============================================
-class FileTransferManager:
-    def __init__(self, config):
-        self.config = config
-        self.transfer_queue = Queue()
-        self.sent_images = self.load_sent_images()
-        self.ssh_client = None
-        self.sftp_client = None
-        
-        # Start transfer thread
-        self.transfer_thread = threading.Thread(target=self._transfer_worker, daemon=True)
-        self.transfer_thread.start()
-        print("🚀 File Transfer Manager dimulai")
-    
-    def load_sent_images(self):
-        """Load daftar gambar yang sudah dikirim"""
-        try:
-            if os.path.exists(sent_images_file):
-                with open(sent_images_file, 'r') as f:
-                    return set(json.load(f))
-            return set()
-        except:
-            return set()
-    
-    def save_sent_images(self):
-        """Simpan daftar gambar yang sudah dikirim"""
-        try:
-            with open(sent_images_file, 'w') as f:
-                json.dump(list(self.sent_images), f)
-        except Exception as e:
-            print(f"⚠️ Error saving sent images list: {e}")
-    
-    def get_file_hash(self, filepath):
-        """Generate hash untuk file (untuk deteksi duplikasi)"""
-        try:
-            with open(filepath, 'rb') as f:
-                return hashlib.md5(f.read()).hexdigest()
-        except:
-            return None
-    
-    def connect_ssh(self):
-        """Buat koneksi SSH/SFTP"""
-        try:
-            self.ssh_client = paramiko.SSHClient()
-            self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            
-            # Connect dengan password atau key
-            if 'key_filename' in self.config:
-                self.ssh_client.connect(
-                    hostname=self.config['hostname'],
-                    username=self.config['username'],
-                    key_filename=self.config['key_filename'],
-                    port=self.config['port'],
-                    timeout=self.config['timeout']
-                )
-            else:
-                self.ssh_client.connect(
-                    hostname=self.config['hostname'],
-                    username=self.config['username'],
-                    password=self.config['password'],
-                    port=self.config['port'],
-                    timeout=self.config['timeout']
-                )
-            
-            self.sftp_client = self.ssh_client.open_sftp()
-            return True
-            
-        except Exception as e:
-            print(f"❌ Error koneksi SSH: {e}")
-            return False
-    
-    def disconnect_ssh(self):
-        """Tutup koneksi SSH/SFTP"""
-        try:
-            if self.sftp_client:
-                self.sftp_client.close()
-            if self.ssh_client:
-                self.ssh_client.close()
-        except:
-            pass
-    
-    def add_to_queue(self, image_path, metadata=None):
-        """Tambahkan file ke queue transfer"""
-        if os.path.exists(image_path):
-            file_hash = self.get_file_hash(image_path)
-            filename = os.path.basename(image_path)
-            
-            # Cek apakah file sudah pernah dikirim (berdasarkan hash)
-            if file_hash and file_hash not in self.sent_images:
-                transfer_data = {
-                    'local_path': image_path,
-                    'filename': filename,
-                    'file_hash': file_hash,
-                    'metadata': metadata or {},
-                    'timestamp': datetime.now().isoformat()
-                }
-                self.transfer_queue.put(transfer_data)
-                print(f"📤 File ditambahkan ke queue: {filename}")
-            else:
-                print(f"⚠️ File sudah pernah dikirim: {filename}")
-    
-    def _transfer_worker(self):
-        """Worker thread untuk transfer file"""
-        while True:
-            try:
-                # Ambil dari queue (blocking)
-                transfer_data = self.transfer_queue.get(timeout=1)
-                
-                # Lakukan transfer
-                success = self._transfer_file(transfer_data)
-                
-                if success:
-                    # Tandai sebagai sudah dikirim
-                    self.sent_images.add(transfer_data['file_hash'])
-                    self.save_sent_images()
-                    print(f"✅ Transfer berhasil: {transfer_data['filename']}")
-                else:
-                    print(f"❌ Transfer gagal: {transfer_data['filename']}")
-                
-                # Tandai task selesai
-                self.transfer_queue.task_done()
-                
-            except:
-                # Queue kosong, tunggu sebentar
-                time.sleep(0.1)
-    
-    def _transfer_file(self, transfer_data):
-        """Transfer file ke laptop"""
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                # Buat koneksi jika belum ada
-                if not self.ssh_client or not self.ssh_client.get_transport().is_active():
-                    if not self.connect_ssh():
-                        continue
-                
-                # Transfer file
-                local_path = transfer_data['local_path']
-                remote_path = os.path.join(self.config['remote_path'], transfer_data['filename'])
-                
-                # Buat direktori remote jika belum ada
-                try:
-                    remote_dir = os.path.dirname(remote_path)
-                    self.ssh_client.exec_command(f'mkdir -p {remote_dir}')
-                except:
-                    pass
-                
-                # Upload file
-                self.sftp_client.put(local_path, remote_path)
-                
-                # Juga kirim metadata sebagai file JSON (opsional)
-                if transfer_data['metadata']:
-                    metadata_path = remote_path.replace('.jpg', '_metadata.json')
-                    metadata_content = json.dumps(transfer_data['metadata'], indent=2)
-                    
-                    # Buat temporary file untuk metadata
-                    temp_metadata_path = local_path.replace('.jpg', '_temp_metadata.json')
-                    with open(temp_metadata_path, 'w') as f:
-                        f.write(metadata_content)
-                    
-                    self.sftp_client.put(temp_metadata_path, metadata_path)
-                    os.remove(temp_metadata_path)  # Hapus file temp
-                
-                return True
-                
-            except Exception as e:
-                print(f"❌ Transfer attempt {attempt + 1} failed: {e}")
-                self.disconnect_ssh()
-                time.sleep(2)  # Wait before retry
-        
-        return False
-
-# =============================================
-# VARIABEL GLOBAL
+# STARTUP PARALEL: MODEL DAN TRANSFER MANAGER
 # =============================================
-# Load model YOLO
-model = YOLO("/home/surya/Desktop/PA/models/yolov11n1.pt")
-print("🤖 Model YOLO berhasil dimuat")
+def load_model():
+    """Load model YOLO (satu instance dipakai bersama oleh semua kamera) lalu warm-up sekali"""
+    # Perkiraan kasar: kamera dan transfer manager dibuka bersamaan di thread lain
+    rss_before_model = psutil.Process().memory_info().rss
+    model = create_backend(INFERENCE_BACKEND, BACKEND_MODEL_PATHS[INFERENCE_BACKEND], INFERENCE_THREADS)
+    model_rss_mb = (psutil.Process().memory_info().rss - rss_before_model) / (1024 * 1024)
+    model_mb = max(model_rss_mb, model_memory_mb(getattr(model, 'model', None)))
+    # Inferensi pertama selalu lambat (inisialisasi runtime): lakukan di sini, bukan di frame RED pertama
+    warmup_start = time.perf_counter()
+    model.detect([np.zeros((INFERENCE_IMGSZ, INFERENCE_IMGSZ, 3), np.uint8)], TRACKER_CONFIG['low_thresh'],
+                 INFERENCE_IMGSZ)
+    print(f"🤖 Model YOLO berhasil dimuat (backend: {model.kind}, warm-up "
+          f"{(time.perf_counter() - warmup_start) * 1000:.0f}ms)")
+    return model, model_mb
 
-# Initialize File Transfer Manager
-file_transfer = FileTransferManager(LAPTOP_CONFIG)
+def start_transfer():
+    """Indeks file terkirim, antrian transfer di disk, dan worker SFTP (koneksi dibuat oleh worker)"""
+    sent_index = SentIndex(SENT_INDEX['path'], capacity=SENT_INDEX['capacity'], fp_rate=SENT_INDEX['fp_rate'],
+                           snapshot_every=SENT_INDEX['snapshot_every'], legacy_file=sent_images_file)
+    transfer_queue = TransferQueue(TRANSFER_QUEUE['path'], max_items=TRANSFER_QUEUE['max_items'],
+                                   max_mb=TRANSFER_QUEUE['max_mb'], order=TRANSFER_QUEUE['order'],
+                                   cache_mb=TRANSFER_QUEUE['cache_mb'])
+    return FileTransferManager(LAPTOP_CONFIG, sent_index, transfer_queue, workers=TRANSFER['workers'],
+                               max_retries=TRANSFER['max_retries'], backoff_base=TRANSFER['backoff_base'],
+                               backoff_max=TRANSFER['backoff_max'], batch_size=TRANSFER['batch_size'],
+                               batch_wait=TRANSFER['batch_wait'], preview=TRANSFER_PREVIEW)
 
-# Initialize System Monitor (TAMBAHAN BARU)
-system_monitor = SystemMonitor()
+# Model dimuat di background: capture dan kalibrasi marka sudah berjalan selama menunggu
+model_task = timeline.run("model dimuat", load_model)
+transfer_task = timeline.run("transfer manager siap", start_transfer)
 
-# Kamera
-cap = cv2.VideoCapture(0)
-if not cap.isOpened():
-    print("❌ Kamera gagal dibuka.")
-    exit()
+# Initialize System Monitor (sampling di thread terpisah)
+system_monitor = SystemMonitor(sample_interval=MONITOR_INTERVAL, recent_window=MONITOR_RECENT_WINDOW, gpu=MONITOR_GPU)
+system_monitor.start()
 
 # Set awal timing
 start_cycle = time.time()
 
-# Anti-duplikasi dan caching
-saved_images = set()
-marka_y_history = []
-cached_marka_y = None
-last_marka_time = 0
+# Track ID unik untuk semua kamera
+track_ids = itertools.count(1)
+
+def create_camera(camera_config):
+    """Siapkan capture, detektor marka, tracker, dan motion gate untuk satu kamera"""
+    # Buffer klip diisi langsung dari thread capture (JPEG, berbatas MB)
+    clip_buffer = None
+    if CLIP_BUFFER['enabled']:
+        clip_buffer = ClipBuffer(camera_config['id'], max_mb=CLIP_BUFFER['max_mb'], fps=CLIP_BUFFER['fps'],
+                                 jpeg_quality=CLIP_BUFFER['jpeg_quality'], max_width=CLIP_BUFFER['max_width'],
+                                 pre_seconds=CLIP_BUFFER['pre_seconds'], post_seconds=CLIP_BUFFER['post_seconds'],
+                                 fourcc=CLIP_BUFFER['fourcc'],
+                                 on_clip=lambda clip_path, metadata: file_transfer.add_to_queue(clip_path, metadata))
+
+    # Kamera dibaca di thread terpisah agar frame tidak basi saat YOLO berjalan
+    grabber = FrameGrabber(camera_config['source'], mode=CAPTURE_MODE, buffer_size=CAPTURE_BUFFER_SIZE,
+                           on_frame=clip_buffer.feed if clip_buffer else None)
+    if not grabber.isOpened():
+        return None
+
+    # Detektor garis marka dan kalibrasi statis (kamera terpasang tetap)
+    detector = RoadMarkingDetector(**MARKING_DETECTOR)
+    calibrator = StopLineCalibrator(camera_config['id'], MARKING_CALIBRATION_FILE,
+                                    detector=detector, **MARKING_CALIBRATION)
+
+    # Tracker kendaraan (satu pelanggaran per track)
+    tracker = ViolationTracker(id_source=track_ids, **TRACKER_CONFIG)
+
+    # Motion gate: YOLO hanya dijalankan jika ada gerakan di zona pendekatan
+    motion_gate = None
+    if MOTION_GATE['enabled']:
+        motion_gate = MotionGate(scale=MOTION_GATE['scale'],
+                                 pixel_threshold=MOTION_GATE['pixel_threshold'],
+                                 min_changed_ratio=MOTION_GATE['min_changed_ratio'],
+                                 heartbeat_frames=MOTION_GATE['heartbeat_frames'],
+                                 learning_rate=MOTION_GATE['learning_rate'],
+                                 above=BAND_INFERENCE['above'], below=BAND_INFERENCE['below'])
+
+    return CameraState(camera_config['id'], grabber, detector, calibrator, tracker, motion_gate,
+                       start_cycle=start_cycle, light_offset=camera_config.get('light_offset', 0),
+                       location=camera_config.get('location', 'Traffic Light Camera 1'),
+                       marking_mode=MARKING_MODE,
+                       scheduler_factory=lambda camera_id, cycle: PhaseScheduler(camera_id, cycle, PHASE_PROFILES,
+                                                                                 warmup_lead=WARMUP_LEAD),
+                       clip_buffer=clip_buffer)
+
+def open_camera(camera_config):
+    """Buka satu kamera dan langsung mulai capture (dijalankan paralel per kamera)"""
+    camera = create_camera(camera_config)
+    if camera is not None:
+        if camera.clip_buffer is not None:
+            camera.clip_buffer.start()
+        camera.grabber.start()
+    return camera
+
+camera_tasks = [timeline.run(f"kamera {camera_config['id']} dibuka", open_camera, camera_config)
+                for camera_config in CAMERAS]
+cameras = []
+for camera_config, camera_task in zip(CAMERAS, camera_tasks):
+    camera = camera_task.result()
+    if camera is None:
+        print(f"❌ Kamera {camera_config['id']} gagal dibuka.")
+        exit()
+    cameras.append(camera)
+cameras_by_id = {camera.camera_id: camera for camera in cameras}
 
-# Konfigurasi durasi tiap warna (detik)
-dur_red = 30
-dur_yellow = 3
-dur_green = 7
-cycle_time = dur_red + dur_yellow + dur_green + dur_yellow  # Total 43 detik
+# Transfer manager hanya membuka file lokal (SFTP tersambung di worker), biasanya siap sebelum kamera
+file_transfer = transfer_task.result()
 
 print(f"🚦 Siklus lampu: Merah({dur_red}s) → Kuning({dur_yellow}s) → Hijau({dur_green}s) → Kuning({dur_yellow}s)")
 
 # =============================================
 # FUNGSI CALLBACK DATABASE
 # =============================================
-def save_to_database(label, timestamp, image_path, fps, metadata=None):
-    """Fungsi callback untuk menyimpan data ke database dengan anti-duplikasi"""
-    try:
-        cursor = db.cursor()
-        
-        # Ambil hanya nama file (tanpa path)
-        image_name = os.path.basename(image_path)
-        
-        # Cek apakah gambar sudah ada di database
-        query_check = "SELECT COUNT(*) FROM violations WHERE image_path = %s"
-        cursor.execute(query_check, (image_name,))
-        result = cursor.fetchone()
-        
-        if result[0] == 0:  # Jika belum ada, simpan ke database
-            query_insert = "INSERT INTO violations (label, timestamp, image_path) VALUES (%s, %s, %s)"
-            cursor.execute(query_insert, (label, timestamp, image_name))
-            db.commit()
-            print(f"✅ Data tersimpan: {label}, {timestamp}, {image_name} | FPS: {fps:.2f}")
-            
-            # KIRIM FILE KE LAPTOP SECARA OTOMATIS
-            transfer_metadata = {
-                'label': label,
-                'timestamp': timestamp,
-                'fps': fps,
-                'violation_type': 'red_light_violation',
-                'location': 'Traffic Light Camera 1'
-            }
-            if metadata:
-                transfer_metadata.update(metadata)
-            
-            file_transfer.add_to_queue(image_path, transfer_metadata)
-            
-        else:
-            print(f"⚠️ Duplikasi terdeteksi, tidak menyimpan ulang: {image_name}")
-        
-        cursor.close()
-        
-    except mysql.connector.Error as e:
-        print(f"❌ Error database: {e}")
+def queue_transfer(record):
+    """Dipanggil setelah record di-commit ke database: kirim file ke laptop secara otomatis"""
+    transfer_metadata = {
+        'label': record['label'],
+        'timestamp': record['timestamp'],
+        'fps': record['fps'],
+        'violation_type': 'red_light_violation',
+        'location': 'Traffic Light Camera 1'
+    }
+    if record['metadata']:
+        transfer_metadata.update(record['metadata'])
+
+    with metrics.span("enqueue"):
+        file_transfer.add_to_queue(record['image_path'], transfer_metadata, data=record['image_bytes'])
+
+# Penulis batch ke outbox lokal di thread sendiri (replayer meneruskan ke database)
+db_writer = ViolationWriter(db_outbox, on_committed=queue_transfer, metrics=metrics, **DB_WRITER,
+                            **PIPELINE_STAGES['database'])
 
 # =============================================
-# FUNGSI STATUS LAMPU LOOPING
+# STAGE PIPELINE
 # =============================================
-def get_looping_light_status():
-    """Menentukan status lampu berdasarkan waktu looping"""
-    elapsed = int(time.time() - start_cycle) % cycle_time
-    
-    if elapsed < dur_red:
-        return "RED"
-    elif elapsed < dur_red + dur_yellow:
-        return "YELLOW"
-    elif elapsed < dur_red + dur_yellow + dur_green:
-        return "GREEN"
-    else:
-        return "YELLOW"
+# Marka → inferensi + aturan pelanggaran (utils/detection_stages.py)
+# Model belum tentu selesai dimuat: set_model() dipanggil saat model_task selesai
+detection_stages = DetectionStages(None, TRACKER_CONFIG['low_thresh'], INFERENCE_IMGSZ,
+                                   band=BAND_INFERENCE if BAND_INFERENCE['enabled'] else None, metrics=metrics)
+
+def stage_inference(batch):
+    batch = detection_stages.inference(batch)
+    if detection_stages.predictions and timeline.mark_once("inferensi pertama"):
+        timeline.print_report()
+    return batch
+
+marking_stage = Stage("marking", detection_stages.marking, **PIPELINE_STAGES['marking'])
+inference_stage = Stage("inference", stage_inference, **PIPELINE_STAGES['inference'])
+def on_evidence_saved(record):
+    """Gambar bukti tersimpan: minta klip pelanggaran lalu teruskan ke stage database"""
+    metadata = record['metadata']
+    camera = cameras_by_id[metadata['camera_id']]
+    if camera.clip_buffer is not None:
+        clip_path = os.path.splitext(record['image_path'])[0] + CLIP_BUFFER['extension']
+        # Beberapa pelanggar di frame yang sama berbagi satu klip
+        camera.clip_buffer.request_clip(metadata['frame_time'], clip_path,
+                                        dict(metadata, label=record['label'], timestamp=record['timestamp'],
+                                             clip_for=[os.path.basename(record['image_path'])]),
+                                        key=metadata['frame_id'])
+    db_writer.put(record)
+
+# Stage 3: encode JPEG bukti di pool worker, byte hasil encode diteruskan ke penulis database
+evidence_writer = EvidenceWriter(output_dir, on_saved=on_evidence_saved, metrics=metrics, **EVIDENCE,
+                                 **PIPELINE_STAGES['evidence'])
+# Display dijalankan di main thread (cv2.imshow harus di main thread)
+display_queue = BoundedQueue("display", **PIPELINE_STAGES['display'])
+
+marking_stage.connect(inference_stage)
+inference_stage.connect(evidence_writer, when=lambda batch: any(ctx['violations'] for ctx in batch))
+inference_stage.connect(display_queue)
+
+pipeline = Pipeline([marking_stage, inference_stage, evidence_writer, db_writer])
+pipeline.start()
 
 # =============================================
-# FUNGSI DETEKSI GARIS MARKA
+# GAUGE METRIK DAN ENDPOINT PROMETHEUS
 # =============================================
-def detect_road_marking(frame):
-    """Deteksi garis marka jalan dengan caching dan smoothing"""
-    global cached_marka_y, last_marka_time, marka_y_history
-    
-    # 1️⃣ Ambil setengah bawah frame sebagai ROI
-    roi = frame[frame.shape[0] // 2 :, :]
-    hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
-    
-    # 2️⃣ Deteksi warna putih
-    lower_white = np.array([0, 0, 160])
-    upper_white = np.array([255, 50, 255])
-    mask = cv2.inRange(hsv, lower_white, upper_white)
-    edges = cv2.Canny(mask, 50, 150)
-    
-    # 3️⃣ Deteksi garis putih horizontal dengan HoughLinesP
-    lines = cv2.HoughLinesP(edges, 1, np.pi/180, 100, minLineLength=180, maxLineGap=20)
-    marka_y = None
-    
-    if lines is not None:
-        min_y = float("inf")
-        for line in lines:
-            x1, y1, x2, y2 = line[0]
-            angle = np.arctan2(y2 - y1, x2 - x1) * 180.0 / np.pi
-            length = np.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-            
-            # Filter garis horizontal yang panjang
-            if 0 < abs(angle) < 10 and length > frame.shape[1] // 3:
-                if y1 < min_y:
-                    min_y = y1
-                    marka_y = y1 + frame.shape[0] // 2  # Sesuaikan dengan ROI
-        
-        # 4️⃣ Simpan ke history untuk smoothing
-        if marka_y is not None:
-            marka_y_history.append(marka_y)
-            if len(marka_y_history) > 5:
-                marka_y_history.pop(0)
-            cached_marka_y = int(np.mean(marka_y_history))
-            last_marka_time = time.time()
-    
-    # 5️⃣ Jika tidak terdeteksi, gunakan cache selama ≤ 1.5 detik
-    if marka_y is None and cached_marka_y and (time.time() - last_marka_time < 1.5):
-        marka_y = cached_marka_y
-    
-    return marka_y
+fps = 0
+
+metrics.gauge("traffic_fps", "Throughput pipeline terakhir (frame/detik)", lambda: fps)
+metrics.gauge("traffic_camera_fps", "FPS per kamera", lambda: {camera.camera_id: camera.fps for camera in cameras},
+              label="camera")
+for key, name, help_text in [('cpu_percent', "traffic_cpu_percent", "Pemakaian CPU (%)"),
+                             ('ram_percent', "traffic_ram_percent", "Pemakaian RAM (%)"),
+                             ('gpu_percent', "traffic_gpu_percent", "Pemakaian GPU (%)"),
+                             ('temperature', "traffic_temperature_celsius", "Suhu CPU (°C)"),
+                             ('power_watts', "traffic_power_watts", "Perkiraan daya (W)")]:
+    metrics.gauge(name, help_text, lambda key=key: system_monitor.get_current_stats()[key])
+metrics.gauge("traffic_stage_queue_depth", "Kedalaman antrian per stage pipeline",
+              lambda: {name: stats['queue'] for name, stats in pipeline.get_stats().items()}, label="stage")
+metrics.gauge("traffic_stage_dropped", "Item yang dibuang per stage pipeline",
+              lambda: {name: stats['dropped'] for name, stats in pipeline.get_stats().items()}, label="stage")
+metrics.gauge("traffic_transfer_queue_depth", "File yang belum terkirim ke laptop", file_transfer.pending)
+metrics.gauge("traffic_transfer_pending_bytes", "Ukuran file yang belum terkirim (byte)", file_transfer.pending_bytes)
+metrics.gauge("traffic_outbox_depth", "Record pelanggaran di outbox lokal", db_outbox.depth)
+
+metrics_server = None
+if METRICS['enabled']:
+    metrics_server = MetricsServer(metrics, METRICS['host'], METRICS['port'])
+    metrics_server.start()
 
 # =============================================
-# MAIN LOOP
+# TAMPILAN (JENDELA / PREVIEW MJPEG)
 # =============================================
-print("🚀 Sistem deteksi pelanggaran dimulai...")
-print("📋 Tekan 'q' untuk keluar")
+# Mode headless: tidak ada overlay dan cv2.imshow. Preview MJPEG (opsional)
+# hanya menggambar overlay saat ada klien yang terhubung.
+show_window = not HEADLESS
+preview_server = None
+if PREVIEW_SERVER['enabled']:
+    preview_server = PreviewServer(PREVIEW_SERVER['host'], PREVIEW_SERVER['port'], max_fps=PREVIEW_SERVER['max_fps'],
+                                   max_width=PREVIEW_SERVER['max_width'], jpeg_quality=PREVIEW_SERVER['jpeg_quality'])
+    preview_server.start()
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        print("⚠️ Frame kosong. Cek koneksi kamera.")
-        break
-    
-    start_time = time.time()
-    
-    # 1️⃣ Dapatkan status lampu
-    status = get_looping_light_status()
-    
-    # 2️⃣ Deteksi garis marka
-    marka_y = detect_road_marking(frame)
-    
-    # 3️⃣ Gambar garis marka jika ada
-    if marka_y:
-        cv2.line(frame, (0, marka_y), (frame.shape[1], marka_y), (0, 255, 0), 2)
-    
-    # 4️⃣ Deteksi kendaraan saat lampu merah
-    if status == "RED":
-        print("🚦 Lampu merah, deteksi kendaraan...")
-        
-        # Prediksi dengan model YOLO
-        results = model.predict(source=frame, conf=0.6, imgsz=320, verbose=False)
-        
-        for result in results:
-            for box in result.boxes:
-                cls_id = int(box.cls)
-                label = model.names[cls_id]
-                confidence = float(box.conf[0]) * 100
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                mid_y = (y1 + y2) // 2
-                
-                # 5️⃣ Cek apakah tengah bounding box melewati garis marka
-                if marka_y and mid_y > marka_y:
-                    print(f"🚨 Pelanggaran: {label} melewati marka!")
-                    
-                    # Gambar bounding box merah untuk pelanggaran
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                    cv2.putText(frame, f"{label} {confidence:.1f}%", (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
-                    
-                    # 6️⃣ Simpan gambar dan data pelanggaran
-                    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    filename = f"{label}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jpg"
-                    image_path = os.path.join(output_dir, filename)
-                    
-                    # Hitung FPS untuk callback
-                    fps = 1.0 / (time.time() - start_time) if (time.time() - start_time) > 0 else 0
-                    
-                    # Anti-duplikasi check
-                    if image_path not in saved_images:
-                        # Simpan gambar
-                        cv2.imwrite(image_path, frame)
-                        
-                        # Metadata tambahan untuk transfer
-                        additional_metadata = {
-                            'confidence': confidence,
-                            'bounding_box': [x1, y1, x2, y2],
-                            'vehicle_position': mid_y,
-                            'road_marking_position': marka_y
-                        }
-                        
-                        # Simpan ke database dan kirim ke laptop
-                        save_to_database(label, timestamp, image_path, fps, additional_metadata)
-                        
-                        # Tambah ke set anti-duplikasi
-                        saved_images.add(image_path)
-                    else:
-                        print(f"⚠️ Gambar sudah tersimpan sebelumnya: {filename}")
-    
-    # 7️⃣ Hitung dan update sistem monitoring (TAMBAHAN BARU)
-    fps = 1.0 / (time.time() - start_time) if (time.time() - start_time) > 0 else 0
-    system_monitor.update_stats(status, fps)
-    current_stats = system_monitor.get_current_stats()
-    
-    # 8️⃣ Display info di frame (DIPERLUAS DENGAN MONITORING)
+# Ctrl+C / SIGTERM (systemd) menghentikan loop dengan cleanup normal
+stop_requested = threading.Event()
+
+def request_stop(signum, frame):
+    print(f"🛑 Sinyal {signal.Signals(signum).name} diterima, sistem dihentikan")
+    stop_requested.set()
+
+signal.signal(signal.SIGINT, request_stop)
+signal.signal(signal.SIGTERM, request_stop)
+
+def on_model_loaded(task):
+    """Dipanggil di thread loader saat model selesai dimuat (atau gagal)"""
+    try:
+        model, model_mb = task.result()
+    except Exception as e:
+        print(f"❌ Model gagal dimuat: {e}")
+        stop_requested.set()
+        return
+    detection_stages.set_model(model)
+    if len(cameras) > 1:
+        print(f"💾 Satu model untuk {len(cameras)} kamera: hemat ~{model_mb * (len(cameras) - 1):.1f} MB "
+              f"dibanding satu model per kamera ({model_mb:.1f} MB/model)")
+
+model_task.add_done_callback(on_model_loaded)
+
+def wait_for_exit(wait_ms):
+    """Tunggu wait_ms; return True jika user menekan 'q' atau ada sinyal berhenti"""
+    if show_window:
+        if cv2.waitKey(wait_ms) & 0xFF == ord('q'):
+            print("🛑 Sistem dihentikan oleh user")
+            return True
+    else:
+        stop_requested.wait(wait_ms / 1000)
+    return stop_requested.is_set()
+
+def draw_overlay(batch, fps, current_stats, queue_text):
+    """Gabungkan frame semua kamera dan gambar info monitoring; return frame baru untuk ditampilkan"""
+    # Jangan menimpa frame yang masih dipakai stage evidence
+    frames = []
+    for ctx in batch:
+        frame = ctx['frame'].copy() if ctx['violations'] else ctx['frame']
+        if len(batch) > 1:
+            # Label kamera, status lampu, dan FPS per kamera
+            frame = cv2.resize(frame, (640, 480))
+            cv2.putText(frame, f"{ctx['camera'].camera_id} | {ctx['status']} | {ctx['camera'].fps:.1f} FPS",
+                        (10, frame.shape[0] - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+        frames.append(frame)
+    frame = frames[0] if len(frames) == 1 else cv2.hconcat(frames)
+
+    # Info monitoring
     y_pos = 30
     cv2.putText(frame, f"FPS: {fps:.2f}", (10, y_pos),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
     y_pos += 30
-    cv2.putText(frame, f"Lampu: {status}", (10, y_pos),
+    cv2.putText(frame, f"Lampu: {batch[0]['status']}", (10, y_pos),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+    if detection_stages.model is None:
+        y_pos += 30
+        cv2.putText(frame, "Model: memuat...", (10, y_pos),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
     y_pos += 30
     cv2.putText(frame, f"CPU: {current_stats['cpu_percent']:.1f}%", (10, y_pos),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
@@ -647,30 +390,122 @@ while True:
     y_pos += 25
     cv2.putText(frame, f"Power: {current_stats['power_watts']:.1f}W", (10, y_pos),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
-    
+
     # Tampilkan status transfer
-    queue_size = file_transfer.transfer_queue.qsize()
     y_pos += 30
-    cv2.putText(frame, f"Queue: {queue_size}", (10, y_pos),
+    cv2.putText(frame, queue_text, (10, y_pos),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 255), 2)
-    
+
+    # Tampilkan status capture (frame dibuang dan latensi capture)
+    capture_stats = cameras[0].grabber.get_stats()
+    y_pos += 30
+    cv2.putText(frame, f"Drop: {capture_stats['dropped']} | Lag: {capture_stats['latency_ms']:.0f}ms", (10, y_pos),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 255), 2)
+
     # Tampilkan waktu siklus
-    elapsed = int(time.time() - start_cycle) % cycle_time
+    elapsed = int(time.time() - cameras[0].start_cycle) % cycle_time
     y_pos += 30
     cv2.putText(frame, f"Siklus: {elapsed}s", (10, y_pos),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+    return frame
+
+# =============================================
+# MAIN LOOP
+# =============================================
+print("🚀 Sistem deteksi pelanggaran dimulai...")
+print("📋 Tekan 'q' untuk keluar" if show_window else "📋 Mode headless, tekan Ctrl+C untuk keluar")
+
+last_display_time = time.time()
+
+while not stop_requested.is_set():
+    # 1️⃣ Ambil frame terbaru dari setiap kamera jika sudah waktunya menurut profil fase lampu
+    now = time.time()
+    wakeup = min(camera.scheduler.next_wakeup(now) for camera in cameras)
+    if wakeup <= now:
+        batch = []
+        for camera in cameras:
+            ret, frame = camera.grabber.read()
+            if not ret:
+                break
+            ctx = {
+                'camera': camera,
+                'frame': frame,
+                'frame_id': camera.grabber.last_frame_id,
+                'frame_time': camera.grabber.last_frame_time,
+                'start_time': time.time()
+            }
+            # Umur frame dari capture sampai masuk pipeline
+            metrics.observe("capture", ctx['start_time'] - ctx['frame_time'])
+            # Status lampu, warm-up, dan jadwal deteksi marka dari timeline fase
+            ctx.update(camera.scheduler.on_frame())
+            batch.append(ctx)
+        if len(batch) < len(cameras):
+            print("⚠️ Frame kosong. Cek koneksi kamera.")
+            break
+        
+        # Kirim ke pipeline
+        marking_stage.put(batch)
+        if timeline.mark_once("frame pertama"):
+            print(f"🎬 Frame pertama masuk pipeline {timeline.elapsed('frame pertama'):.2f}s setelah proses dimulai "
+                  f"(model {'siap' if detection_stages.model is not None else 'masih dimuat'})")
+        wait_ms = 1
+    else:
+        # Di luar fase merah: tunggu slot berikutnya atau batas fase sambil tetap melayani jendela
+        wait_ms = max(1, min(50, int((wakeup - now) * 1000)))
+    
+    # 2️⃣ Ambil hasil terbaru yang sudah selesai diproses
+    batch = display_queue.get_latest()
+    if batch is None:
+        if wait_for_exit(wait_ms):
+            break
+        continue
+    
+    status = batch[0]['status']
+    marka_y = batch[0]['marka_y']
+    
+    # 3️⃣ Hitung throughput pipeline dan update sistem monitoring
+    now = time.time()
+    fps = 1.0 / (now - last_display_time) if (now - last_display_time) > 0 else 0
+    last_display_time = now
+    system_monitor.update_stats(status, fps)
+    current_stats = system_monitor.get_current_stats()
     
-    # 9️⃣ Tampilkan hasil
-    cv2.imshow("Sistem Deteksi Pelanggaran - Raspberry Pi", frame)
+    queue_size = file_transfer.pending()
+    queue_eta = file_transfer.drain_eta()
+    eta_text = f"~{int(queue_eta // 60)}m{int(queue_eta % 60):02d}s" if queue_eta is not None else "?"
+    queue_text = f"Queue: {queue_size} ({file_transfer.pending_bytes() / (1024 * 1024):.1f}MB, {eta_text})"
+    
+    # 4️⃣ Overlay hanya digambar jika ada yang melihat (jendela atau klien preview)
+    send_preview = preview_server is not None and preview_server.wants_frame()
+    if show_window or send_preview:
+        display_start = time.perf_counter()
+        frame = draw_overlay(batch, fps, current_stats, queue_text)
+        # 5️⃣ Tampilkan hasil
+        if show_window:
+            cv2.imshow("Sistem Deteksi Pelanggaran - Raspberry Pi", frame)
+        if send_preview:
+            preview_server.submit(frame)
+        metrics.observe("display", time.perf_counter() - display_start)
     
     # Print status ke terminal setiap 30 frame (untuk tidak spam)
     if int(time.time() * 2) % 30 == 0:  # Setiap ~15 detik
-        print(f"🔄 Status: {status} | FPS: {fps:.2f} | Marka: {'✓' if marka_y else '✗'} | Queue: {queue_size}")
+        print(f"🔄 Status: {status} | FPS: {fps:.2f} | Marka: {'✓' if marka_y else '✗'} | {queue_text}")
         print(f"📊 CPU: {current_stats['cpu_percent']:.1f}% | RAM: {current_stats['ram_percent']:.1f}% | Temp: {current_stats['temperature']:.1f}°C | Power: {current_stats['power_watts']:.1f}W")
+        pipeline.print_stats()
+        outbox_stats = db_replayer.get_stats()
+        print(f"📦 Outbox DB: {outbox_stats['depth']} tertunda (tertua {outbox_stats['oldest_age']:.0f}s) | "
+              f"{outbox_stats['replayed']} terkirim | {outbox_stats['rate']:.0f} record/s | "
+              f"{'terhubung' if outbox_stats['connected'] and not outbox_stats['last_error'] else 'tidak terhubung'}")
+        for camera in cameras:
+            capture_stats = camera.grabber.get_stats()
+            print(f"🎥 [{camera.camera_id}] FPS: {camera.fps:.2f} | Captured: {capture_stats['captured']} | Dropped: {capture_stats['dropped']} | Lag: {capture_stats['latency_ms']:.1f}ms (max {capture_stats['max_latency_ms']:.1f}ms)")
+            if camera.motion_gate is not None:
+                gate_stats = camera.motion_gate.get_stats()
+                print(f"💤 [{camera.camera_id}] Motion gate: {gate_stats['skipped']} inferensi dilewati dari {gate_stats['checked']} frame merah "
+                      f"({gate_stats['saved_percent']:.1f}% hemat, {gate_stats['heartbeats']} heartbeat)")
     
     # Exit condition
-    if cv2.waitKey(1) & 0xFF == ord('q'):
-        print("🛑 Sistem dihentikan oleh user")
+    if wait_for_exit(wait_ms):
         break
 
 # =============================================
@@ -678,20 +513,62 @@ while True:
 # =============================================
 print("🧹 Membersihkan resource...")
 
+# Kuras pipeline agar semua pelanggaran yang tertunda tersimpan
+for camera in cameras:
+    camera.grabber.release()
+pipeline.stop()
+print("🔗 Statistik pipeline:")
+pipeline.print_stats()
+
+# Tulis klip pelanggaran yang masih menunggu
+for camera in cameras:
+    if camera.clip_buffer is not None:
+        camera.clip_buffer.stop()
+        clip_stats = camera.clip_buffer.get_stats()
+        print(f"🎬 [{camera.camera_id}] Buffer klip: {clip_stats['clips']} klip | {clip_stats['frames']} frame "
+              f"({clip_stats['memory_mb']:.1f} MB, {clip_stats['seconds']:.1f}s) | {clip_stats['evicted']} frame dibuang | "
+              f"{clip_stats['skipped']} dilewati encoder")
+timeline.print_report()
+if detection_stages.frames_without_model:
+    print(f"⏳ {detection_stages.frames_without_model} frame merah diproses sebelum model selesai dimuat")
+for camera in cameras:
+    print(f"🎥 [{camera.camera_id}] {camera.frames_processed} frame diproses | FPS terakhir: {camera.fps:.2f}")
+    camera.scheduler.print_report()
+    if camera.motion_gate is not None:
+        gate_stats = camera.motion_gate.get_stats()
+        print(f"💤 [{camera.camera_id}] Motion gate: {gate_stats['inferences']} inferensi YOLO, {gate_stats['skipped']} dilewati "
+              f"({gate_stats['saved_percent']:.1f}% hemat)")
+
 # Tunggu transfer queue kosong
 print("⏳ Menunggu transfer selesai...")
-file_transfer.transfer_queue.join()
+if not file_transfer.join(timeout=TRANSFER['join_timeout']):
+    print(f"⚠️ {file_transfer.pending()} file belum terkirim (akan dicoba lagi saat program berikutnya)")
+transfer_stats = file_transfer.get_stats()
+print(f"📤 Transfer: {transfer_stats['sent']} file ({transfer_stats['bytes_sent'] / (1024 * 1024):.1f} MB) | "
+      f"{transfer_stats['previews']} preview | {transfer_stats['failures']} gagal | "
+      f"{transfer_stats['given_up']} menyerah | {transfer_stats['evicted']} dikeluarkan dari antrian")
 file_transfer.disconnect_ssh()
 
-cap.release()
-cv2.destroyAllWindows()
+if show_window:
+    cv2.destroyAllWindows()
+if preview_server is not None:
+    preview_server.stop()
+system_monitor.stop()
+if metrics_server is not None:
+    metrics_server.stop()
 
 # CETAK LAPORAN AKHIR SISTEM MONITORING (TAMBAHAN BARU)
 system_monitor.print_final_report()
 
-# Tutup koneksi database
+# Kirim sisa outbox ke database (jika tersedia) lalu tutup koneksi
+db_replayer.stop(drain_timeout=DB_OUTBOX['drain_timeout'])
+outbox_stats = db_replayer.get_stats()
+print(f"📦 Outbox database: {outbox_stats['replayed']} record terkirim | {outbox_stats['depth']} tertunda | "
+      f"{outbox_stats['rate']:.0f} record/s")
 try:
-    db.close()
+    if db_replayer.backend is not None:
+        db_replayer.backend.close()
+    db_outbox.close()
     print("✅ Koneksi database ditutup")
 except:
     print("⚠️ Error saat menutup database")
@@ -0,0 +1,94 @@
+# =============================================
+# RECEIVER ARSIP BATCH DI LAPTOP TUJUAN
+# =============================================
+# Dijalankan di laptop penerima (folder yang sama dengan remote_path di LAPTOP_CONFIG).
+# Setiap batch_*.tar dibongkar: gambar/klip disimpan di folder tujuan, metadata
+# ditulis sebagai {nama}_metadata.json (sama seperti mode per file), dan satu
+# baris per file ditambahkan ke received_index.jsonl.
+#
+# Contoh:
+#   python receive_batches.py D:/PA/Koding/traffic_violation_detection/detections
+#   python receive_batches.py ./detections --once --keep
+
+import os
+import glob
+import json
+import time
+import shutil
+import tarfile
+import argparse
+from datetime import datetime
+from transfer.file_transfer import content_hash, ARCHIVE_MANIFEST
+from utils.evidence import write_atomic
+
+def unpack_archive(archive_path, target_dir):
+    """Bongkar satu arsip; return jumlah file yang disimpan"""
+    batch_name = os.path.basename(archive_path)
+    with tarfile.open(archive_path, mode='r') as tar:
+        manifest = json.load(tar.extractfile(ARCHIVE_MANIFEST))
+        entries = []
+        for item in manifest:
+            # Hanya nama file, tanpa path (arsip tidak boleh menulis di luar folder tujuan)
+            filename = os.path.basename(item['filename'])
+            data = tar.extractfile(item['filename']).read()
+            if item.get('file_hash') and content_hash(data) != item['file_hash']:
+                print(f"⚠️ Hash tidak cocok, file dilewati: {filename} ({batch_name})")
+                continue
+
+            write_atomic(os.path.join(target_dir, filename), data)
+            if item.get('metadata'):
+                metadata_path = os.path.join(target_dir, os.path.splitext(filename)[0] + "_metadata.json")
+                write_atomic(metadata_path, json.dumps(item['metadata'], indent=2).encode())
+
+            entries.append(json.dumps({
+                'filename': filename,
+                'file_hash': item.get('file_hash'),
+                'batch': batch_name,
+                'queued_at': item.get('queued_at'),
+                'received_at': datetime.now().isoformat(),
+                'metadata': item.get('metadata')
+            }))
+
+    if entries:
+        with open(os.path.join(target_dir, "received_index.jsonl"), 'a') as f:
+            f.write("\n".join(entries) + "\n")
+    return len(entries)
+
+def process_pending(target_dir, keep):
+    processed = 0
+    # .part belum selesai diupload, jadi hanya .tar yang diproses
+    for archive_path in sorted(glob.glob(os.path.join(target_dir, "batch_*.tar"))):
+        try:
+            count = unpack_archive(archive_path, target_dir)
+        except (tarfile.TarError, KeyError, ValueError, OSError) as e:
+            print(f"❌ Arsip tidak bisa dibongkar: {os.path.basename(archive_path)} ({e})")
+            shutil.move(archive_path, archive_path + ".bad")
+            continue
+
+        if keep:
+            processed_dir = os.path.join(target_dir, "processed")
+            os.makedirs(processed_dir, exist_ok=True)
+            shutil.move(archive_path, os.path.join(processed_dir, os.path.basename(archive_path)))
+        else:
+            os.remove(archive_path)
+        processed += 1
+        print(f"📦 {os.path.basename(archive_path)}: {count} file disimpan")
+    return processed
+
+def main():
+    parser = argparse.ArgumentParser(description="Bongkar arsip batch pelanggaran yang dikirim Raspberry Pi")
+    parser.add_argument("target_dir", help="Folder tujuan (remote_path di LAPTOP_CONFIG)")
+    parser.add_argument("--interval", type=float, default=2.0, help="Interval pengecekan arsip baru (detik)")
+    parser.add_argument("--once", action="store_true", help="Proses arsip yang ada lalu keluar")
+    parser.add_argument("--keep", action="store_true", help="Pindahkan arsip ke processed/ alih-alih dihapus")
+    args = parser.parse_args()
+
+    print(f"📥 Menunggu arsip batch di {args.target_dir}")
+    while True:
+        process_pending(args.target_dir, args.keep)
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+if __name__ == "__main__":
+    main()
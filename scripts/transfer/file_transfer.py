@@ -1,67 +1,485 @@
 # ========================================================
 # 📂 PENGIRIMAN FILE HASIL PELANGGARAN KE SERVER/LAPTOP
 # ========================================================
+# Beberapa worker, masing-masing dengan sesi SSH/SFTP yang dipakai terus
+# (tidak connect ulang per file). Direktori remote yang sudah dibuat
+# disimpan di cache sehingga tidak ada mkdir per file. File yang gagal
+# dijadwalkan ulang dengan exponential backoff per item tanpa menahan
+# antrian: worker langsung lanjut ke file berikutnya.
+#
+# Antrian ada di disk dan berprioritas (transfer_queue.py): pelanggaran
+# terbaru dikirim lebih dulu. Jika kecepatan upload terukur rendah, gambar
+# dikirim sebagai preview kecil dulu; resolusi penuh menyusul setelah antrian lain.
+#
+# Mode batch (batch_size > 1): beberapa file + satu manifest.json dikirim
+# sebagai satu arsip tar dari memori untuk menghemat round-trip per file.
+# Di laptop tujuan arsip dibongkar oleh receive_batches.py.
 
+import io
 import os
-import threading
+import json
 import time
-import queue
-import paramiko
-from scp import SCPClient
+import random
+import tarfile
+import hashlib
+import posixpath
+import threading
+import itertools
+from datetime import datetime
+
+HASH_CHUNK_SIZE = 1024 * 1024
+ARCHIVE_MANIFEST = "manifest.json"
+
+def content_hash(data=None, path=None):
+    """Hash BLAKE2b isi file: langsung dari byte di memori, atau dibaca bertahap dari disk (klip besar)"""
+    hasher = hashlib.blake2b(digest_size=16)
+    if data is not None:
+        hasher.update(data)
+    else:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class SFTPSession:
+    """Satu koneksi SSH + SFTP yang dipakai ulang oleh satu worker"""
 
-class FileTransferManager:
     def __init__(self, config):
-        self.queue_lock = threading.Lock()
-        self.transfer_queue = queue.Queue()
-        self.ssh_client = self.connect_ssh(config)
         self.config = config
+        self.ssh_client = None
+        self.sftp_client = None
 
-        self.transfer_thread = threading.Thread(target=self.process_queue)
-        self.transfer_thread.daemon = True
-        self.transfer_thread.start()
+    def is_active(self):
+        if not self.ssh_client or not self.sftp_client:
+            return False
+        transport = self.ssh_client.get_transport()
+        return transport is not None and transport.is_active()
 
-    def connect_ssh(self, config):
+    def connect(self):
+        import paramiko
+        self.close()
+        self.ssh_client = paramiko.SSHClient()
+        self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+
+        # Connect dengan password atau key
+        credentials = {'key_filename': self.config['key_filename']} if 'key_filename' in self.config \
+            else {'password': self.config['password']}
+        self.ssh_client.connect(
+            hostname=self.config['hostname'],
+            username=self.config['username'],
+            port=self.config['port'],
+            timeout=self.config['timeout'],
+            banner_timeout=self.config.get('banner_timeout'),
+            auth_timeout=self.config.get('auth_timeout'),
+            **credentials
+        )
+        if self.config.get('keepalive_interval'):
+            self.ssh_client.get_transport().set_keepalive(self.config['keepalive_interval'])
+        self.sftp_client = self.ssh_client.open_sftp()
+        # Upload yang macet (jaringan putus) gagal setelah timeout, tidak menggantung worker selamanya
+        self.sftp_client.get_channel().settimeout(self.config['timeout'])
+
+    def ensure_connected(self):
+        if not self.is_active():
+            self.connect()
+        return self.sftp_client
+
+    def close(self):
         try:
-            ssh = paramiko.SSHClient()
-            ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            ssh.connect(config['host'], port=config['port'], username=config['username'], password=config['password'])
-            print(f"🔌 Terhubung SSH ke {config['host']}")
-            return ssh
-        except Exception as e:
-            print(f"❌ Gagal terhubung SSH: {e}")
+            if self.sftp_client:
+                self.sftp_client.close()
+            if self.ssh_client:
+                self.ssh_client.close()
+        except:
+            pass
+        self.sftp_client = None
+        self.ssh_client = None
+
+
+class FileTransferManager:
+    def __init__(self, config, sent_index, transfer_queue, workers=2, max_retries=5, backoff_base=1.0,
+                 backoff_max=60.0, batch_size=1, batch_wait=5.0, preview=None):
+        self.config = config
+        # Antrian berprioritas di disk (transfer/transfer_queue.py)
+        self.transfer_queue = transfer_queue
+        # Indeks hash file yang sudah dikirim (transfer/sent_index.py)
+        self.sent_index = sent_index
+        self.lock = threading.Lock()
+
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # Mode batch: batch_size > 1 mengirim beberapa file dalam satu arsip tar
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait
+        self.archive_sequence = itertools.count(1)
+
+        # Preview saat bandwidth rendah: {'enabled', 'below_kbps', 'width', 'jpeg_quality'}
+        self.preview = preview or {}
+        # Kecepatan upload per sesi (EMA byte/detik), None sampai ada upload yang berhasil
+        self.link_rate = None
+
+        # Cache direktori remote yang sudah pasti ada (dipakai bersama semua sesi)
+        self.remote_dirs = set()
+        self.stopped = False
+        # closed: antrian dan indeks di disk sudah ditutup. Semua tulis hasil transfer ke disk
+        # dilakukan di bawah state_lock dan dilewati jika closed (item tetap di antrian disk)
+        self.closed = False
+        self.state_lock = threading.Lock()
+
+        # Statistik
+        self.files_sent = 0
+        self.bytes_sent = 0
+        self.previews_sent = 0
+        self.failures = 0
+        self.given_up = 0
+
+        # Pool worker, satu sesi SFTP persisten per worker
+        self.sessions = [SFTPSession(config) for _ in range(max(1, workers))]
+        self.threads = [threading.Thread(target=self._transfer_worker, args=(session,), daemon=True)
+                        for session in self.sessions]
+        for thread in self.threads:
+            thread.start()
+        print(f"🚀 File Transfer Manager dimulai ({len(self.sessions)} sesi SFTP)")
+
+    def add_to_queue(self, image_path, metadata=None, data=None):
+        """
+        Tambahkan file ke queue transfer (data = byte JPEG yang sudah di-encode, jika ada).
+        Tidak ada I/O disk di thread pemanggil: penulisan antrian, hash dan cek
+        "sudah pernah dikirim" dilakukan oleh thread antrian dan worker transfer.
+        """
+        transfer_data = {
+            'local_path': image_path,
+            'data': data,
+            'filename': os.path.basename(image_path),
+            'file_hash': None,
+            'metadata': metadata or {},
+            'timestamp': datetime.now().isoformat()
+        }
+        self.transfer_queue.put(transfer_data)
+        print(f"📤 File ditambahkan ke queue: {transfer_data['filename']}")
+
+    def pending(self):
+        """Jumlah file yang belum terkirim (termasuk yang menunggu retry)"""
+        return self.transfer_queue.depth()
+
+    def pending_bytes(self):
+        return self.transfer_queue.pending_bytes()
+
+    def drain_eta(self):
+        """Perkiraan detik sampai antrian kosong dengan kecepatan upload terakhir; None jika belum terukur"""
+        if not self.link_rate:
             return None
+        return self.pending_bytes() / (self.link_rate * len(self.sessions))
+
+    def _next_batch(self):
+        """Ambil item prioritas tertinggi; dalam mode batch kumpulkan sampai batch_size item atau batch_wait detik"""
+        batch = self.transfer_queue.get(limit=self.batch_size, timeout=1)
+        if not batch:
+            return []
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size and not self.stopped:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            more = self.transfer_queue.get(limit=self.batch_size - len(batch), timeout=remaining)
+            if not more:
+                break
+            batch.extend(more)
+        return batch
+
+    def _prepare(self, transfer_data):
+        """Hitung hash (sekali, di worker) dan cek apakah file sudah pernah dikirim"""
+        if transfer_data['file_hash'] is None:
+            try:
+                # Dari memori, atau streaming dari file untuk klip besar
+                transfer_data['file_hash'] = content_hash(transfer_data['data'], transfer_data['local_path'])
+            except OSError as e:
+                # File lokal sudah tidak ada: tidak perlu dicoba ulang
+                print(f"❌ File tidak bisa dibaca, transfer dibatalkan: {transfer_data['filename']} ({e})")
+                return False
+        with self.state_lock:
+            if self.closed:
+                return False
+            already_sent = transfer_data['file_hash'] in self.sent_index
+        if already_sent:
+            print(f"⚠️ File sudah pernah dikirim: {transfer_data['filename']}")
+            return False
+        return True
 
-    def transfer_file(self, local_path, remote_path=None):
-        if not self.ssh_client:
-            print("⚠️ Tidak ada koneksi SSH.")
+    def _settle(self, func, *args):
+        """Tulis hasil item ke antrian/indeks di disk; False jika manager sudah ditutup"""
+        with self.state_lock:
+            if self.closed:
+                return False
+            func(*args)
+            return True
+
+    def _use_preview(self, transfer_data):
+        """Bandwidth terukur rendah: kirim preview dulu, resolusi penuh menyusul setelah antrian lain"""
+        return (self.preview.get('enabled') and not transfer_data['preview_sent']
+                and transfer_data['filename'].lower().endswith(('.jpg', '.jpeg'))
+                and self.link_rate is not None and self.link_rate < self.preview['below_kbps'] * 1024)
+
+    def _make_preview(self, transfer_data):
+        """Versi kecil gambar sebagai item upload terpisah; item asli jika gambar tidak bisa dibaca"""
+        import cv2
+        import numpy as np
+        from utils.evidence import downscale
+
+        if transfer_data['data'] is not None:
+            image = cv2.imdecode(np.frombuffer(transfer_data['data'], np.uint8), cv2.IMREAD_COLOR)
+        else:
+            image = cv2.imread(transfer_data['local_path'])
+        if image is None:
+            return transfer_data
+        success, encoded = cv2.imencode('.jpg', downscale(image, self.preview['width']),
+                                        [cv2.IMWRITE_JPEG_QUALITY, self.preview['jpeg_quality']])
+        if not success:
+            return transfer_data
+
+        data = encoded.tobytes()
+        stem = os.path.splitext(transfer_data['filename'])[0]
+        return dict(transfer_data, filename=f"{stem}_preview.jpg", data=data, file_hash=content_hash(data),
+                    metadata=dict(transfer_data['metadata'], preview=True, full_filename=transfer_data['filename']))
+
+    def _update_link_rate(self, size, elapsed):
+        if elapsed <= 0:
             return
+        rate = size / elapsed
+        with self.lock:
+            self.link_rate = rate if self.link_rate is None else 0.3 * rate + 0.7 * self.link_rate
+
+    def _transfer_worker(self, session):
+        """Worker thread untuk transfer file (satu per satu, atau beberapa file dalam satu arsip)"""
+        errors = 0
+        while not self.stopped:
+            batch = []
+            try:
+                batch = self._next_batch()
+                if not self._transfer_batch(session, batch):
+                    return
+                errors = 0
+            except Exception as e:
+                # Error di luar upload (mis. SQLite terkunci/penuh): worker tidak boleh mati,
+                # item dilepas agar bisa diambil lagi dan worker menunggu sebentar
+                errors += 1
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (errors - 1))
+                print(f"⚠️ Worker transfer error: {e}, lanjut lagi dalam {delay:.0f}s")
+                self.transfer_queue.release(batch)
+                deadline = time.monotonic() + delay
+                while not self.stopped and time.monotonic() < deadline:
+                    time.sleep(min(0.5, delay))
+
+    def _transfer_batch(self, session, batch):
+        """Proses satu batch dari antrian; False jika manager sudah ditutup"""
+        if not batch:
+            return True
 
-        if remote_path is None:
-            remote_path = os.path.join(self.config['remote_dir'], os.path.basename(local_path))
+        ready = []
+        for transfer_data in batch:
+            if self._prepare(transfer_data):
+                ready.append(transfer_data)
+            elif not self._settle(self.transfer_queue.ack, transfer_data):
+                return False
+        if not ready:
+            return True
 
+        # Item upload: preview untuk gambar jika bandwidth rendah, selain itu file aslinya
+        uploads = [self._make_preview(transfer_data) if self._use_preview(transfer_data) else transfer_data
+                   for transfer_data in ready]
+        start = time.perf_counter()
         try:
-            with SCPClient(self.ssh_client.get_transport()) as scp:
-                scp.put(local_path, remote_path)
-                print(f"✅ File terkirim ke server: {remote_path}")
+            if len(uploads) == 1:
+                self._transfer_file(session, uploads[0])
+            else:
+                self._transfer_archive(session, uploads)
         except Exception as e:
-            print(f"⚠️ Gagal mengirim file: {e}")
+            session.close()
+            for transfer_data in ready:
+                if not self._settle(self._schedule_retry, transfer_data, e):
+                    return False
+            return True
+        self._update_link_rate(sum(upload['size'] for upload in uploads), time.perf_counter() - start)
 
-    def add_to_queue(self, local_path):
-        self.transfer_queue.put(local_path)
-        print(f"📥 Ditambahkan ke antrian transfer: {local_path}")
+        if not self._settle(self._record_sent, ready, uploads):
+            # Sudah ditutup: file terkirim tetapi belum tercatat, akan dikirim ulang (tidak hilang)
+            return False
+        names = uploads[0]['filename'] if len(uploads) == 1 else f"{len(uploads)} file dalam satu arsip"
+        print(f"✅ Transfer berhasil: {names}")
+        return True
 
-    def process_queue(self):
-        while True:
-            try:
-                file_path = self.transfer_queue.get()
-                if file_path:
-                    self.transfer_file(file_path)
-                self.transfer_queue.task_done()
-            except Exception as e:
-                print(f"⚠️ Error saat memproses antrian: {e}")
-            time.sleep(1)
+    def _record_sent(self, ready, uploads):
+        """Catat item terkirim di indeks dan lepaskan dari antrian (dipanggil lewat _settle)"""
+        for transfer_data, upload in zip(ready, uploads):
+            with self.lock:
+                self.bytes_sent += upload['size']
+            if upload is not transfer_data:
+                # Preview terkirim: file resolusi penuh tetap di antrian dengan prioritas terendah
+                self.transfer_queue.defer(transfer_data)
+                with self.lock:
+                    self.previews_sent += 1
+                continue
+            # Tandai sebagai sudah dikirim (satu append durable, bukan tulis ulang seluruh daftar)
+            self.sent_index.add(transfer_data['file_hash'], transfer_data['filename'])
+            self.transfer_queue.ack(transfer_data)
+            with self.lock:
+                self.files_sent += 1
+
+    def _schedule_retry(self, transfer_data, error):
+        """Jadwalkan ulang satu item dengan exponential backoff (+ jitter), worker tidak ikut menunggu"""
+        with self.lock:
+            self.failures += 1
+        transfer_data['attempt'] += 1
+        if transfer_data['attempt'] > self.max_retries:
+            with self.lock:
+                self.given_up += 1
+            self.transfer_queue.ack(transfer_data)
+            print(f"❌ Transfer gagal setelah {self.max_retries} percobaan: {transfer_data['filename']} ({error})")
+            return
+
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (transfer_data['attempt'] - 1))
+        delay *= random.uniform(0.8, 1.2)
+        print(f"❌ Transfer attempt {transfer_data['attempt']} failed: {transfer_data['filename']} ({error}), "
+              f"coba lagi dalam {delay:.1f}s")
+        self.transfer_queue.retry(transfer_data, delay)
 
-    def disconnect_ssh(self):
-        if self.ssh_client:
-            self.ssh_client.close()
-            print("🔌 Koneksi SSH ditutup")
+    def _ensure_remote_dir(self, sftp, remote_dir):
+        """Buat direktori remote lewat SFTP (tanpa exec mkdir); hanya dicek sekali per direktori"""
+        if remote_dir in self.remote_dirs:
+            return
+        try:
+            sftp.stat(remote_dir)
+        except IOError:
+            # Buat parent yang belum ada satu per satu (lewati root dan drive Windows, mis. "D:").
+            # Path absolut POSIX diawali satu "/" saja ("/home", bukan "//home")
+            path = "/" if remote_dir.startswith("/") else ""
+            for part in remote_dir.split("/"):
+                if not part:
+                    continue
+                path = posixpath.join(path, part) if path else part
+                if path.endswith(":"):
+                    continue
+                try:
+                    sftp.stat(path)
+                except IOError:
+                    try:
+                        sftp.mkdir(path)
+                    except IOError:
+                        # Bisa saja sudah dibuat sesi lain
+                        sftp.stat(path)
+        self.remote_dirs.add(remote_dir)
+
+    def _transfer_file(self, session, transfer_data):
+        """Transfer file (dan metadata JSON) ke laptop memakai sesi milik worker"""
+        sftp = session.ensure_connected()
+        remote_path = posixpath.join(self.config['remote_path'], transfer_data['filename'])
+        self._ensure_remote_dir(sftp, posixpath.dirname(remote_path))
+
+        # Upload file (langsung dari memori jika byte hasil encode tersedia)
+        if transfer_data['data'] is not None:
+            sftp.putfo(io.BytesIO(transfer_data['data']), remote_path)
+            transfer_data['size'] = len(transfer_data['data'])
+        else:
+            sftp.put(transfer_data['local_path'], remote_path)
+            transfer_data['size'] = os.path.getsize(transfer_data['local_path'])
+
+        # Juga kirim metadata sebagai file JSON (langsung dari memori)
+        if transfer_data['metadata']:
+            metadata_path = posixpath.splitext(remote_path)[0] + '_metadata.json'
+            metadata_content = json.dumps(transfer_data['metadata'], indent=2).encode()
+            sftp.putfo(io.BytesIO(metadata_content), metadata_path)
+
+    def _transfer_archive(self, session, items):
+        """
+        Kirim beberapa file + satu manifest.json sebagai satu arsip tar lewat putfo dari memori.
+        Arsip diupload sebagai .part lalu di-rename, jadi receiver tidak pernah membaca arsip setengah jadi.
+        """
+        sftp = session.ensure_connected()
+        remote_dir = self.config['remote_path']
+        self._ensure_remote_dir(sftp, remote_dir)
+
+        archive = io.BytesIO()
+        manifest = []
+        with tarfile.open(fileobj=archive, mode='w') as tar:
+            for transfer_data in items:
+                if transfer_data['data'] is not None:
+                    info = tarfile.TarInfo(transfer_data['filename'])
+                    info.size = len(transfer_data['data'])
+                    info.mtime = time.time()
+                    tar.addfile(info, io.BytesIO(transfer_data['data']))
+                    transfer_data['size'] = info.size
+                else:
+                    tar.add(transfer_data['local_path'], arcname=transfer_data['filename'])
+                    transfer_data['size'] = os.path.getsize(transfer_data['local_path'])
+                manifest.append({
+                    'filename': transfer_data['filename'],
+                    'file_hash': transfer_data['file_hash'],
+                    'queued_at': transfer_data['timestamp'],
+                    'metadata': transfer_data['metadata']
+                })
+
+            manifest_content = json.dumps(manifest, indent=2).encode()
+            info = tarfile.TarInfo(ARCHIVE_MANIFEST)
+            info.size = len(manifest_content)
+            info.mtime = time.time()
+            tar.addfile(info, io.BytesIO(manifest_content))
+
+        name = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{next(self.archive_sequence)}.tar"
+        remote_path = posixpath.join(remote_dir, name)
+        archive.seek(0)
+        sftp.putfo(archive, remote_path + ".part")
+        try:
+            sftp.posix_rename(remote_path + ".part", remote_path)
+        except IOError:
+            # Server tanpa ekstensi posix-rename (mis. OpenSSH Windows)
+            sftp.rename(remote_path + ".part", remote_path)
+
+    def join(self, timeout=None):
+        """Tunggu semua file terkirim (termasuk yang menunggu retry); return False jika timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending() > 0:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.1)
+        return True
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'pending': self.pending(),
+                'pending_bytes': self.pending_bytes(),
+                'eta': self.drain_eta(),
+                'sent': self.files_sent,
+                'bytes_sent': self.bytes_sent,
+                'previews': self.previews_sent,
+                'evicted': self.transfer_queue.evicted,
+                'link_kbps': (self.link_rate or 0) / 1024,
+                'failures': self.failures,
+                'given_up': self.given_up,
+                'sessions': sum(1 for session in self.sessions if session.is_active())
+            }
+
+    def disconnect_ssh(self, timeout=None):
+        """
+        Hentikan worker dan tutup semua sesi SSH/SFTP (item yang belum terkirim tetap di antrian disk).
+        Worker menyelesaikan item yang sedang dikirim (operasi SFTP dibatasi config['timeout']);
+        antrian dan indeks hanya ditutup jika semua worker sudah berhenti.
+        """
+        self.stopped = True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        alive = sum(1 for thread in self.threads if thread.is_alive())
+        if alive:
+            # Jangan tutup SQLite di bawah worker yang masih upload; proses keluar menutupnya
+            print(f"⚠️ {alive} worker transfer masih berjalan, antrian dan indeks tidak ditutup")
+            return
+        with self.state_lock:
+            self.closed = True
+            for session in self.sessions:
+                session.close()
+            self.transfer_queue.close()
+            self.sent_index.close()
@@ -0,0 +1,182 @@
+# ========================================================
+# 📒 INDEKS FILE YANG SUDAH DIKIRIM (SQLITE + BLOOM FILTER)
+# ========================================================
+# Pengganti sent_images.json: setiap file terkirim ditambahkan sebagai satu
+# baris SQLite (WAL, synchronous=FULL) sehingga O(1) per upload dan tetap
+# utuh walaupun listrik mati di tengah penulisan. Bloom filter di depannya
+# menjawab "belum pernah dikirim" tanpa query ke disk; hanya jawaban
+# "mungkin" yang dicek ke SQLite.
+#
+# Bloom filter disimpan sebagai snapshot (atomik) beserta rowid terakhir yang
+# sudah tercakup, jadi saat startup cukup memuat snapshot lalu menambahkan
+# baris yang lebih baru. Snapshot yang rusak/tidak cocok dibangun ulang dari tabel.
+
+import os
+import json
+import math
+import time
+import struct
+import sqlite3
+import hashlib
+import threading
+
+class BloomFilter:
+    def __init__(self, capacity, fp_rate):
+        self.capacity = max(1, int(capacity))
+        self.fp_rate = fp_rate
+        self.size = max(8, int(-self.capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k posisi dari dua hash 64-bit
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class SentIndex:
+    def __init__(self, path, capacity=100000, fp_rate=0.01, snapshot_every=500, legacy_file=None):
+        self.path = path
+        self.snapshot_path = path + ".bloom"
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.snapshot_every = snapshot_every
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sent (
+                file_hash TEXT PRIMARY KEY,
+                filename TEXT,
+                sent_at REAL NOT NULL
+            )""")
+        self.conn.commit()
+
+        # Statistik
+        self.lookups = 0
+        self.bloom_negatives = 0
+        self.added_since_snapshot = 0
+
+        start = time.perf_counter()
+        if legacy_file:
+            self._migrate_legacy(legacy_file)
+        self.bloom, source = self._load_bloom()
+        print(f"📒 Indeks file terkirim: {len(self)} entri ({source}, {(time.perf_counter() - start) * 1000:.0f}ms)")
+
+    def _migrate_legacy(self, legacy_file):
+        """Pindahkan isi sent_images.json lama ke tabel (sekali saja)"""
+        if not os.path.exists(legacy_file):
+            return
+        try:
+            with open(legacy_file, 'r') as f:
+                hashes = json.load(f)
+        except Exception as e:
+            print(f"⚠️ sent_images.json lama tidak bisa dibaca, dilewati: {e}")
+            return
+        now = time.time()
+        self.conn.executemany("INSERT OR IGNORE INTO sent (file_hash, filename, sent_at) VALUES (?, NULL, ?)",
+                              [(file_hash, now) for file_hash in hashes])
+        self.conn.commit()
+        os.replace(legacy_file, legacy_file + ".migrated")
+        print(f"📒 {len(hashes)} hash dari {os.path.basename(legacy_file)} dipindahkan ke indeks")
+
+    def _new_bloom(self, rows):
+        return BloomFilter(max(self.capacity, rows * 2), self.fp_rate)
+
+    def _load_bloom(self):
+        """Muat snapshot bloom + baris sesudahnya; bangun ulang jika snapshot tidak bisa dipakai"""
+        rows = len(self)
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                header = json.loads(f.readline())
+                bits = f.read()
+            bloom = BloomFilter(header['capacity'], header['fp_rate'])
+            if len(bits) != len(bloom.bits) or header['rows'] > rows or rows > bloom.capacity:
+                raise ValueError("snapshot tidak cocok")
+            bloom.bits = bytearray(bits)
+            bloom.count = header['rows']
+            newer = self.conn.execute("SELECT file_hash FROM sent WHERE rowid > ?", (header['last_rowid'],))
+            for (file_hash,) in newer:
+                bloom.add(file_hash)
+            return bloom, "snapshot"
+        except (OSError, ValueError, KeyError):
+            bloom = self._new_bloom(rows)
+            for (file_hash,) in self.conn.execute("SELECT file_hash FROM sent"):
+                bloom.add(file_hash)
+            return bloom, "dibangun ulang"
+
+    def snapshot(self):
+        """Tulis bloom filter ke disk secara atomik (tulis file sementara, fsync, rename)"""
+        with self.lock:
+            last_rowid = self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM sent").fetchone()[0]
+            header = {'capacity': self.bloom.capacity, 'fp_rate': self.bloom.fp_rate,
+                      'rows': self.bloom.count, 'last_rowid': last_rowid}
+            bits = bytes(self.bloom.bits)
+            self.added_since_snapshot = 0
+        temp_path = self.snapshot_path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            f.write(bits)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+    def __contains__(self, file_hash):
+        with self.lock:
+            self.lookups += 1
+            if file_hash not in self.bloom:
+                self.bloom_negatives += 1
+                return False
+            return self.conn.execute("SELECT 1 FROM sent WHERE file_hash = ?", (file_hash,)).fetchone() is not None
+
+    def add(self, file_hash, filename=None):
+        """Catat satu file terkirim (durable setelah return)"""
+        with self.lock:
+            cursor = self.conn.execute("INSERT OR IGNORE INTO sent (file_hash, filename, sent_at) VALUES (?, ?, ?)",
+                                       (file_hash, filename, time.time()))
+            self.conn.commit()
+            if cursor.rowcount:
+                self.bloom.add(file_hash)
+                self.added_since_snapshot += 1
+            grow = self.bloom.count > self.bloom.capacity
+        if grow:
+            # Bloom penuh: bangun ulang dengan kapasitas dua kali lipat
+            with self.lock:
+                self.bloom = self._new_bloom(self._count())
+                for (existing,) in self.conn.execute("SELECT file_hash FROM sent"):
+                    self.bloom.add(existing)
+            self.snapshot()
+        elif self.added_since_snapshot >= self.snapshot_every:
+            self.snapshot()
+
+    def _count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM sent").fetchone()[0]
+
+    def __len__(self):
+        with self.lock:
+            return self._count()
+
+    def get_stats(self):
+        return {
+            'entries': len(self),
+            'lookups': self.lookups,
+            'bloom_negatives': self.bloom_negatives,
+            'bloom_kb': len(self.bloom.bits) / 1024
+        }
+
+    def close(self):
+        self.snapshot()
+        with self.lock:
+            self.conn.close()
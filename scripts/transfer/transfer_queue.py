@@ -0,0 +1,284 @@
+# ========================================================
+# 📥 ANTRIAN TRANSFER BERPRIORITAS DI DISK (SQLITE)
+# ========================================================
+# Pengganti Queue di memori: item transfer disimpan di SQLite sehingga memori
+# tidak tumbuh saat jaringan putus lama, dan antrian tetap ada setelah restart.
+# Item diambil berdasarkan prioritas (terbaru dulu, atau confidence tertinggi),
+# jadi pelanggaran baru tidak menunggu di belakang backlog berjam-jam.
+#
+# Hanya referensi file yang disimpan di disk (gambar sudah ada di folder
+# detections). Byte hasil encode disimpan di cache memori kecil supaya item
+# baru tetap bisa dikirim dari memori tanpa membaca ulang file.
+#
+# put() hanya menaruh item di staging memori; penulisan SQLite dilakukan thread
+# ingest milik antrian, jadi pemanggil tidak pernah menunggu I/O disk. Query dan
+# commit memakai lock terpisah dari state memori, sehingga put()/depth() dari
+# thread capture/UI tidak ikut menunggu fsync.
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+ORDER_NEWEST = "newest"
+ORDER_CONFIDENCE = "confidence"
+
+# Item yang preview-nya sudah terkirim turun ke bawah semua item lain
+DEFERRED_OFFSET = 1e13
+
+def json_default(value):
+    """Metadata berisi skalar NumPy (mis. np.int32 posisi marka) tetap bisa disimpan sebagai JSON"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+class TransferQueue:
+    def __init__(self, path, max_items=5000, max_mb=1024, order=ORDER_NEWEST, cache_mb=16):
+        if order not in (ORDER_NEWEST, ORDER_CONFIDENCE):
+            raise ValueError(f"Urutan antrian transfer tidak dikenal: {order}")
+        self.path = path
+        self.max_items = max_items
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.order = order
+        self.cache_bytes_max = int(cache_mb * 1024 * 1024)
+
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                priority REAL NOT NULL,
+                filename TEXT NOT NULL,
+                local_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                file_hash TEXT,
+                metadata TEXT,
+                queued_at TEXT,
+                attempt INTEGER NOT NULL DEFAULT 0,
+                not_before REAL NOT NULL DEFAULT 0,
+                preview_sent INTEGER NOT NULL DEFAULT 0
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_items_priority ON items (priority DESC, id DESC)")
+        self.conn.commit()
+
+        # Dua lock: db_lock untuk semua akses SQLite (commit bisa menunggu fsync kartu SD),
+        # condition hanya untuk state memori (staging, ringkasan, sewa, cache) dan notifikasi.
+        # Urutan: db_lock boleh memegang condition sebentar, tidak pernah sebaliknya.
+        self.db_lock = threading.Lock()
+        self.condition = threading.Condition()
+        self.staged = []
+        self.leased = set()
+        self.cache = OrderedDict()  # id -> byte hasil encode
+        self.cache_bytes = 0
+        self.version = 0            # naik setiap isi antrian berubah (get() tidak melewatkan notifikasi)
+        self.stopped = False
+
+        # Ringkasan antrian (diperbarui setiap ada perubahan, dibaca UI tanpa query)
+        self.count, self.total_bytes = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM items").fetchone()
+        self.evicted = 0
+        if self.count:
+            print(f"📥 Antrian transfer: {self.count} file tertunda dari sesi sebelumnya "
+                  f"({self.total_bytes / (1024 * 1024):.1f} MB)")
+
+        self.thread = threading.Thread(target=self._ingest_loop, name="transfer-queue", daemon=True)
+        self.thread.start()
+
+    def _priority(self, item):
+        queued = item['metadata'].get('frame_time') or time.time()
+        if self.order == ORDER_CONFIDENCE:
+            return float(item['metadata'].get('confidence') or 0) * 1e10 + queued
+        return queued
+
+    def put(self, item):
+        """Masukkan item (dict) tanpa I/O disk di thread pemanggil"""
+        with self.condition:
+            self.staged.append(item)
+            self.condition.notify_all()
+
+    def _ingest_loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.staged or self.stopped, 0.5)
+                items, self.staged = self.staged, []
+                stopped = self.stopped
+            if items:
+                self._ingest(items)
+            if stopped:
+                break
+
+    def _ingest(self, items):
+        """Tulis item ke SQLite (ukuran file dihitung di sini, bukan di thread pemanggil)"""
+        inserted = []
+        with self.db_lock:
+            for item in items:
+                try:
+                    if item['data'] is not None:
+                        size = len(item['data'])
+                    else:
+                        try:
+                            size = os.path.getsize(item['local_path'])
+                        except OSError:
+                            size = 0
+                    cursor = self.conn.execute(
+                        "INSERT INTO items (priority, filename, local_path, size, file_hash, metadata, queued_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (self._priority(item), item['filename'], item['local_path'], size, item['file_hash'],
+                         json.dumps(item['metadata'], default=json_default), item['timestamp']))
+                except Exception as e:
+                    # Satu item rusak tidak boleh menghentikan thread ingest (file lokal tetap ada)
+                    print(f"❌ Item transfer dilewati, gagal masuk antrian: {item.get('filename')} ({e})")
+                    continue
+                inserted.append((cursor.lastrowid, size, item['data']))
+            self.conn.commit()
+
+            with self.condition:
+                for item_id, size, data in inserted:
+                    self.count += 1
+                    self.total_bytes += size
+                    if data is not None:
+                        self._cache_put(item_id, data)
+            self._enforce_bounds()
+
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def _cache_put(self, item_id, data):
+        self.cache[item_id] = data
+        self.cache_bytes += len(data)
+        while self.cache_bytes > self.cache_bytes_max and self.cache:
+            _, old = self.cache.popitem(last=False)
+            self.cache_bytes -= len(old)
+
+    def _cache_pop(self, item_id):
+        data = self.cache.pop(item_id, None)
+        if data is not None:
+            self.cache_bytes -= len(data)
+
+    def _enforce_bounds(self):
+        """Antrian penuh: buang item prioritas terendah (file lokal tetap ada di disk). Dipanggil dengan db_lock"""
+        while True:
+            with self.condition:
+                if self.count <= self.max_items and self.total_bytes <= self.max_bytes:
+                    break
+                leased = tuple(self.leased)
+            row = self.conn.execute(
+                f"SELECT id, filename, size FROM items WHERE id NOT IN ({','.join('?' * len(leased))}) "
+                "ORDER BY priority ASC, id ASC LIMIT 1", leased).fetchone()
+            if row is None:
+                break
+            self.conn.execute("DELETE FROM items WHERE id = ?", (row[0],))
+            with self.condition:
+                self._forget(row[0], row[2])
+                self.evicted += 1
+            print(f"⚠️ Antrian transfer penuh, {row[1]} dikeluarkan dari antrian (file lokal tetap disimpan)")
+        self.conn.commit()
+
+    def _forget(self, item_id, size):
+        """Lepaskan item dari ringkasan, sewa, dan cache (dipanggil dengan condition)"""
+        self.count -= 1
+        self.total_bytes -= size
+        self.leased.discard(item_id)
+        self._cache_pop(item_id)
+
+    def get(self, limit=1, timeout=1.0):
+        """Sewa sampai `limit` item siap kirim dengan prioritas tertinggi; [] jika timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.condition:
+                leased = tuple(self.leased)
+                version = self.version
+            with self.db_lock:
+                if self.stopped:
+                    return []
+                rows = self.conn.execute(
+                    "SELECT id, filename, local_path, size, file_hash, metadata, queued_at, attempt, preview_sent "
+                    f"FROM items WHERE not_before <= ? AND id NOT IN ({','.join('?' * len(leased))}) "
+                    "ORDER BY priority DESC, id DESC LIMIT ?", (time.time(), *leased, limit)).fetchall()
+
+            with self.condition:
+                # Worker lain bisa menyewa item yang sama selama query
+                rows = [row for row in rows if row[0] not in self.leased]
+                if rows:
+                    return [self._lease(row) for row in rows]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.stopped:
+                    return []
+                if self.version == version:
+                    self.condition.wait(remaining)
+
+    def _lease(self, row):
+        """Tandai item sedang dikirim dan bentuk dict item (dipanggil dengan condition)"""
+        self.leased.add(row[0])
+        return {
+            'id': row[0],
+            'filename': row[1],
+            'local_path': row[2],
+            'queued_size': row[3],
+            'file_hash': row[4],
+            'metadata': json.loads(row[5]) if row[5] else {},
+            'timestamp': row[6],
+            'attempt': row[7],
+            'preview_sent': bool(row[8]),
+            'data': self.cache.get(row[0])
+        }
+
+    def _release(self, item_id):
+        with self.condition:
+            self.leased.discard(item_id)
+            self.version += 1
+            self.condition.notify_all()
+
+    def release(self, items):
+        """Lepas sewa tanpa mengubah item di disk (worker gagal di tengah jalan); item siap diambil lagi"""
+        with self.condition:
+            for item in items:
+                self.leased.discard(item['id'])
+            self.version += 1
+            self.condition.notify_all()
+
+    def ack(self, item):
+        """Item selesai (terkirim, sudah pernah dikirim, atau dibatalkan): hapus dari antrian"""
+        with self.db_lock:
+            self.conn.execute("DELETE FROM items WHERE id = ?", (item['id'],))
+            self.conn.commit()
+        with self.condition:
+            self._forget(item['id'], item['queued_size'])
+            self.version += 1
+            self.condition.notify_all()
+
+    def retry(self, item, delay):
+        """Kembalikan item dengan jadwal kirim ulang (backoff per item, item lain tidak tertahan)"""
+        with self.db_lock:
+            self.conn.execute("UPDATE items SET attempt = ?, not_before = ?, file_hash = ? WHERE id = ?",
+                              (item['attempt'], time.time() + delay, item['file_hash'], item['id']))
+            self.conn.commit()
+        self._release(item['id'])
+
+    def defer(self, item):
+        """Preview sudah terkirim: versi resolusi penuh dikirim setelah semua item lain"""
+        with self.db_lock:
+            self.conn.execute("UPDATE items SET preview_sent = 1, priority = priority - ?, file_hash = ? WHERE id = ?",
+                              (DEFERRED_OFFSET, item['file_hash'], item['id']))
+            self.conn.commit()
+        self._release(item['id'])
+
+    def depth(self):
+        """Jumlah item belum selesai (termasuk staging dan yang sedang dikirim)"""
+        with self.condition:
+            return self.count + len(self.staged)
+
+    def pending_bytes(self):
+        return self.total_bytes
+
+    def close(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        self.thread.join()
+        with self.db_lock:
+            self.conn.close()
@@ -0,0 +1,86 @@
+# =============================================
+# INFERENSI PADA PITA SEKITAR GARIS MARKA
+# =============================================
+
+import numpy as np
+
+STRIDE = 32
+
+def round_to_stride(value, stride=STRIDE):
+    """Bulatkan ke atas ke kelipatan stride model"""
+    return int(np.ceil(value / stride) * stride)
+
+def band_bounds(frame_height, marka_y, above, below):
+    """Batas atas/bawah pita (y0, y1) di sekitar garis marka"""
+    y0 = max(0, marka_y - above)
+    y1 = min(frame_height, marka_y + below)
+    return y0, y1
+
+def predict_full_frame(backend, frame, conf, imgsz):
+    """Inferensi seluruh frame; return array Nx6 [x1, y1, x2, y2, conf, cls]"""
+    return backend.detect([frame], conf, imgsz)[0]
+
+def predict_band(backend, frame, marka_y, conf, imgsz=320, above=160, below=120, max_imgsz=640):
+    """
+    Inferensi hanya pada pita horizontal di sekitar garis marka dengan resolusi asli crop,
+    lalu kembalikan box ke koordinat frame. Tanpa garis marka: inferensi seluruh frame.
+    """
+    if not marka_y:
+        return predict_full_frame(backend, frame, conf, imgsz)
+
+    y0, y1 = band_bounds(frame.shape[0], marka_y, above, below)
+    if y1 - y0 < STRIDE:
+        return predict_full_frame(backend, frame, conf, imgsz)
+    band = frame[y0:y1, :]
+
+    # Ukuran input = ukuran crop (kelipatan 32), dibatasi max_imgsz agar biaya tetap terkendali
+    band_imgsz = [min(round_to_stride(band.shape[0]), max_imgsz),
+                  min(round_to_stride(band.shape[1]), max_imgsz)]
+    detections = backend.detect([band], conf, band_imgsz)[0]
+
+    # Geser koordinat y kembali ke frame penuh
+    if len(detections):
+        detections = detections.copy()
+        detections[:, [1, 3]] += y0
+    return detections
+
+def predict_batch(backend, frames, marka_ys, conf, imgsz=320, band=None):
+    """
+    Satu panggilan predict untuk banyak kamera. Return list array Nx6 per frame
+    (urutan sama dengan input). band: dict above/below/max_imgsz atau None untuk seluruh frame.
+    """
+    if len(frames) == 1:
+        if band:
+            return [predict_band(backend, frames[0], marka_ys[0], conf, imgsz=imgsz, above=band['above'],
+                                 below=band['below'], max_imgsz=band['max_imgsz'])]
+        return [predict_full_frame(backend, frames[0], conf, imgsz)]
+
+    sources, offsets, cropped = [], [], []
+    for frame, marka_y in zip(frames, marka_ys):
+        if band and marka_y:
+            y0, y1 = band_bounds(frame.shape[0], marka_y, band['above'], band['below'])
+            if y1 - y0 >= STRIDE:
+                sources.append(frame[y0:y1, :])
+                offsets.append(y0)
+                cropped.append(True)
+                continue
+        sources.append(frame)
+        offsets.append(0)
+        cropped.append(False)
+
+    if all(cropped):
+        # Semua kamera memakai pita: ukuran input mengikuti crop terbesar
+        batch_imgsz = [min(round_to_stride(max(s.shape[0] for s in sources)), band['max_imgsz']),
+                       min(round_to_stride(max(s.shape[1] for s in sources)), band['max_imgsz'])]
+    else:
+        batch_imgsz = imgsz
+
+    results = backend.detect(sources, conf, batch_imgsz)
+
+    outputs = []
+    for detections, offset in zip(results, offsets):
+        if offset and len(detections):
+            detections = detections.copy()
+            detections[:, [1, 3]] += offset
+        outputs.append(detections)
+    return outputs
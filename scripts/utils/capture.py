@@ -0,0 +1,134 @@
+# =============================================
+# CAPTURE KAMERA DI THREAD TERPISAH (RING BUFFER)
+# =============================================
+
+import time
+import threading
+from collections import deque
+import cv2
+
+MODE_LATEST = "latest"  # Hanya frame terbaru, frame lama dibuang
+MODE_ALL = "all"        # Semua frame diproses berurutan (untuk video rekaman)
+
+class FrameGrabber:
+    def __init__(self, source=0, mode=MODE_LATEST, buffer_size=4, on_frame=None):
+        if mode not in (MODE_LATEST, MODE_ALL):
+            raise ValueError(f"Mode capture tidak dikenal: {mode}")
+
+        self.source = source
+        self.mode = mode
+        # Callback opsional (frame, waktu_capture_wall) di thread capture, sebelum frame dipakai consumer
+        self.on_frame = on_frame
+        self.cap = cv2.VideoCapture(source)
+        # Isi: (frame_id, waktu_capture_monotonic, waktu_capture_wall, frame)
+        self.buffer = deque(maxlen=max(1, buffer_size))
+        self.condition = threading.Condition()
+        self.stopped = False
+
+        # Info frame terakhir yang diberikan ke consumer
+        self.last_frame_id = -1
+        self.last_frame_time = None
+
+        # Statistik
+        self.frames_captured = 0
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+        self.latency_history = deque(maxlen=100)
+        self.max_latency = 0.0
+
+        self.capture_thread = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def start(self):
+        """Mulai thread pembaca kamera"""
+        self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.capture_thread.start()
+        print(f"🎥 Frame grabber dimulai (mode: {self.mode}, buffer: {self.buffer.maxlen})")
+        return self
+
+    def _capture_loop(self):
+        """Baca frame terus-menerus ke ring buffer"""
+        while not self.stopped:
+            ret, frame = self.cap.read()
+            if not ret:
+                print("⚠️ Frame grabber: sumber video habis atau kamera terputus")
+                break
+
+            packet = (self.frames_captured, time.monotonic(), time.time(), frame)
+            self.frames_captured += 1
+
+            if self.on_frame is not None:
+                try:
+                    self.on_frame(frame, packet[2])
+                except Exception as e:
+                    print(f"⚠️ Frame grabber: error di callback on_frame: {e}")
+
+            with self.condition:
+                if self.mode == MODE_ALL:
+                    # Tunggu consumer; tidak ada frame yang dibuang
+                    while len(self.buffer) == self.buffer.maxlen and not self.stopped:
+                        self.condition.wait(0.1)
+                elif len(self.buffer) == self.buffer.maxlen:
+                    # deque(maxlen) membuang frame tertua secara otomatis
+                    self.frames_dropped += 1
+                self.buffer.append(packet)
+                self.condition.notify_all()
+
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+    def read(self, timeout=1.0):
+        """Ambil frame berikutnya, kompatibel dengan cv2.VideoCapture.read()"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while not self.buffer:
+                remaining = deadline - time.monotonic()
+                if self.stopped or remaining <= 0:
+                    return False, None
+                self.condition.wait(remaining)
+
+            if self.mode == MODE_LATEST:
+                # Buang semua frame yang belum sempat dibaca kecuali yang terbaru
+                self.frames_dropped += len(self.buffer) - 1
+                packet = self.buffer.pop()
+                self.buffer.clear()
+            else:
+                packet = self.buffer.popleft()
+            self.condition.notify_all()
+
+        frame_id, captured_mono, captured_wall, frame = packet
+        latency = time.monotonic() - captured_mono
+        self.latency_history.append(latency)
+        self.max_latency = max(self.max_latency, latency)
+        self.frames_delivered += 1
+        self.last_frame_id = frame_id
+        self.last_frame_time = captured_wall
+        return True, frame
+
+    def get_stats(self):
+        """Statistik capture: jumlah frame, frame dibuang, dan latensi (ms)"""
+        history = list(self.latency_history)
+        avg_latency = sum(history) / len(history) if history else 0.0
+        return {
+            'captured': self.frames_captured,
+            'delivered': self.frames_delivered,
+            'dropped': self.frames_dropped,
+            'buffered': len(self.buffer),
+            'latency_ms': avg_latency * 1000,
+            'max_latency_ms': self.max_latency * 1000
+        }
+
+    def release(self):
+        """Hentikan thread dan lepaskan kamera"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if self.capture_thread:
+            self.capture_thread.join(timeout=2)
+        self.cap.release()
+        stats = self.get_stats()
+        print(f"🎥 Frame grabber berhenti | Captured: {stats['captured']} | "
+              f"Dropped: {stats['dropped']} | Latency rata-rata: {stats['latency_ms']:.1f}ms")
@@ -0,0 +1,207 @@
+# =============================================
+# BUFFER KLIP SEBELUM/SESUDAH PELANGGARAN
+# =============================================
+# Frame terbaru disimpan dalam bentuk JPEG di ring buffer berbatas memori (MB).
+# Saat pelanggaran terjadi, klip N detik sebelum dan M detik sesudah kejadian
+# dirakit dan di-encode ke video oleh worker terpisah (bukan di hot path).
+# Thread capture hanya memperkecil frame ke max_width lalu menaruhnya di slot
+# tunggal; encode JPEG dilakukan thread encoder milik buffer. Jika encoder tertinggal, frame di slot
+# diganti yang terbaru (dihitung sebagai `skipped`), capture tidak pernah menunggu.
+
+import os
+import time
+import threading
+from collections import deque, OrderedDict
+import cv2
+import numpy as np
+
+class ClipBuffer:
+    def __init__(self, camera_id, max_mb=32, fps=10, jpeg_quality=70, max_width=640,
+                 pre_seconds=3.0, post_seconds=2.0, fourcc="mp4v", on_clip=None):
+        self.camera_id = camera_id
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.interval = 1.0 / fps if fps else 0.0
+        self.fps = fps
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+        self.max_width = max_width
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self.fourcc = fourcc
+        self.on_clip = on_clip
+
+        # Isi: (waktu_capture, byte JPEG). Eviction cukup popleft referensi,
+        # tidak ada data frame yang disalin.
+        self.frames = deque()
+        self.total_bytes = 0
+        self.last_feed = 0.0
+        self.condition = threading.Condition()
+
+        # Slot tunggal (frame kecil, waktu_capture) dari thread capture ke thread encoder
+        self.slot = None
+        self.slot_condition = threading.Condition()
+        self.encoder_stopped = False
+
+        # Klip yang menunggu frame sesudah kejadian: (waktu_kejadian, path, metadata)
+        self.pending = []
+        # Metadata klip per key terakhir (beberapa pelanggar di frame yang sama = satu klip)
+        self.requested = OrderedDict()
+        self.stopped = False
+        self.thread = None
+        self.encoder_thread = None
+
+        # Statistik
+        self.evicted = 0
+        self.skipped = 0
+        self.clips_written = 0
+
+    def feed(self, frame, frame_time):
+        """Dipanggil dari thread capture: serahkan frame kecil (dengan batas fps) ke thread encoder"""
+        if frame_time - self.last_feed < self.interval:
+            return
+        self.last_feed = frame_time
+        # cv2.resize menghasilkan array baru; frame yang sudah kecil tetap disalin karena
+        # stage pipeline menggambar garis/box pada frame yang sama. INTER_LINEAR dipakai
+        # karena INTER_AREA (~7ms untuk 1080p) terlalu mahal di thread capture.
+        height, width = frame.shape[:2]
+        if self.max_width and width > self.max_width:
+            size = (self.max_width, max(1, int(height * self.max_width / width)))
+            small = cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR)
+        else:
+            small = frame.copy()
+        with self.slot_condition:
+            if self.slot is not None:
+                self.skipped += 1
+            self.slot = (small, frame_time)
+            self.slot_condition.notify()
+
+    def _encode_loop(self):
+        """Thread encoder: kompres frame dari slot ke ring buffer JPEG"""
+        while True:
+            with self.slot_condition:
+                self.slot_condition.wait_for(lambda: self.slot is not None or self.encoder_stopped)
+                if self.slot is None:
+                    return
+                (frame, frame_time), self.slot = self.slot, None
+            self._append(frame, frame_time)
+
+    def _append(self, frame, frame_time):
+        ok, buffer = cv2.imencode(".jpg", frame, self.encode_params)
+        if not ok:
+            return
+        data = buffer.tobytes()
+
+        with self.condition:
+            self.frames.append((frame_time, data))
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes and len(self.frames) > 1:
+                _, old = self.frames.popleft()
+                self.total_bytes -= len(old)
+                self.evicted += 1
+            if self.pending:
+                self.condition.notify_all()
+
+    def request_clip(self, event_time, clip_path, metadata=None, key=None):
+        """
+        Minta klip di sekitar event_time; ditulis setelah frame sesudah kejadian tersedia.
+        Permintaan dengan key yang sama (mis. frame_id) hanya menghasilkan satu klip; list
+        'clip_for' di metadata digabung. Return False jika klip untuk key itu sudah diminta.
+        """
+        metadata = dict(metadata or {})
+        with self.condition:
+            if key is not None:
+                existing = self.requested.get(key)
+                if existing is not None:
+                    existing.setdefault('clip_for', []).extend(metadata.get('clip_for', []))
+                    return False
+                self.requested[key] = metadata
+                while len(self.requested) > 64:
+                    self.requested.popitem(last=False)
+            self.pending.append((event_time, clip_path, metadata))
+            self.condition.notify_all()
+        return True
+
+    def start(self):
+        self.encoder_thread = threading.Thread(target=self._encode_loop, name=f"clip-encode-{self.camera_id}",
+                                               daemon=True)
+        self.encoder_thread.start()
+        self.thread = threading.Thread(target=self._run, name=f"clip-{self.camera_id}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Encode frame terakhir di slot, tulis semua klip yang tertunda, lalu hentikan worker"""
+        with self.slot_condition:
+            self.encoder_stopped = True
+            self.slot_condition.notify_all()
+        if self.encoder_thread:
+            self.encoder_thread.join()
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait(0.5)
+                newest = self.frames[-1][0] if self.frames else 0.0
+                ready = [item for item in self.pending
+                         if self.stopped or newest >= item[0] + self.post_seconds
+                         or time.time() > item[0] + self.post_seconds + 5.0]
+                self.pending = [item for item in self.pending if item not in ready]
+                clips = [(item, self._collect(item[0])) for item in ready]
+                stopped = self.stopped
+
+            for (event_time, clip_path, metadata), frames in clips:
+                try:
+                    self._write_clip(frames, clip_path, metadata)
+                except Exception as e:
+                    print(f"⚠️ Error menulis klip [{self.camera_id}]: {e}")
+
+            if stopped:
+                break
+
+    def _collect(self, event_time):
+        """Referensi JPEG dalam jendela [kejadian - pre, kejadian + post] (dipanggil dengan lock)"""
+        start, end = event_time - self.pre_seconds, event_time + self.post_seconds
+        return [data for frame_time, data in self.frames if start <= frame_time <= end]
+
+    def _write_clip(self, frames, clip_path, metadata):
+        if not frames:
+            print(f"⚠️ Klip [{self.camera_id}] kosong, frame sudah tidak ada di buffer: {os.path.basename(clip_path)}")
+            return
+
+        # Tulis ke file sementara (ekstensi tetap agar container dikenali) lalu rename
+        directory, filename = os.path.split(clip_path)
+        temp_path = os.path.join(directory, f".tmp_{filename}")
+        writer = None
+        for data in frames:
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if writer is None:
+                height, width = image.shape[:2]
+                writer = cv2.VideoWriter(temp_path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps or 10,
+                                         (width, height))
+            writer.write(image)
+        writer.release()
+        os.replace(temp_path, clip_path)
+
+        self.clips_written += 1
+        duration = len(frames) / (self.fps or 10)
+        print(f"🎬 Klip [{self.camera_id}] tersimpan: {filename} ({len(frames)} frame, {duration:.1f}s)")
+        if self.on_clip is not None:
+            self.on_clip(clip_path, dict(metadata, frames=len(frames), duration=duration))
+
+    def get_stats(self):
+        with self.condition:
+            frames = len(self.frames)
+            span = self.frames[-1][0] - self.frames[0][0] if frames > 1 else 0.0
+        return {
+            'frames': frames,
+            'memory_mb': self.total_bytes / (1024 * 1024),
+            'seconds': span,
+            'evicted': self.evicted,
+            'skipped': self.skipped,
+            'pending': len(self.pending),
+            'clips': self.clips_written
+        }
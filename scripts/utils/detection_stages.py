@@ -0,0 +1,135 @@
+# =============================================
+# STAGE DETEKSI: MARKA, INFERENSI, DAN ATURAN PELANGGARAN
+# =============================================
+# Dipakai bersama oleh main.py (kamera live) dan bench_replay.py (video rekaman)
+# sehingga keduanya menjalankan logika pelanggaran yang sama persis.
+# Setiap item pipeline adalah list ctx, satu ctx per kamera.
+
+import time
+import cv2
+from utils.band_inference import predict_batch
+from utils.metrics import NULL_METRICS
+
+class DetectionStages:
+    def __init__(self, model, conf, imgsz, band=None, metrics=None):
+        # model boleh None selama masih dimuat (set_model() setelah selesai): frame tetap
+        # mengalir lewat pipeline dan kalibrasi marka berjalan, hanya tanpa deteksi kendaraan
+        self.model = model
+        self.conf = conf          # confidence minimum (rendah, disaring lagi oleh tracker)
+        self.imgsz = imgsz
+        self.band = band          # konfigurasi inferensi pita, None = frame penuh
+        self.metrics = metrics or NULL_METRICS
+
+        # Statistik
+        self.predictions = 0      # jumlah inferensi model (termasuk warm-up)
+        self.frames_without_model = 0
+
+    def set_model(self, model):
+        self.model = model
+
+    def marking(self, batch):
+        """Stage 1: deteksi garis marka per kamera (interval cache/verifikasi memakai waktu frame)"""
+        for ctx in batch:
+            if ctx['run_marking']:
+                with self.metrics.span("marking"):
+                    ctx['marka_y'] = ctx['camera'].get_marka_y(ctx['frame'], ctx['frame_time'])
+            else:
+                # Di luar fase merah marka tidak dideteksi tiap frame
+                ctx['marka_y'] = ctx['camera'].last_marka_y
+        return batch
+
+    def inference(self, batch):
+        """Stage 2: satu inferensi batch untuk semua kamera yang lampunya merah, lalu cek pelanggaran"""
+        band = self.band
+        model = self.model
+
+        # Warm-up model sesaat sebelum RED dengan frame dan ukuran input yang sama
+        to_warm = [ctx for ctx in batch if ctx['warmup']] if model is not None else []
+        if to_warm:
+            warmup_start = time.perf_counter()
+            predict_batch(model, [ctx['frame'] for ctx in to_warm], [ctx['marka_y'] for ctx in to_warm],
+                          self.conf, imgsz=self.imgsz, band=band)
+            self.predictions += 1
+            warmup_ms = (time.perf_counter() - warmup_start) * 1000
+            for ctx in to_warm:
+                ctx['camera'].scheduler.record_warmup(ctx, warmup_ms)
+
+        to_infer = []
+        for ctx in batch:
+            camera = ctx['camera']
+            frame = ctx['frame']
+            marka_y = ctx['marka_y']
+            ctx['violations'] = []
+            ctx['tracks'] = []
+            ctx['new_violations'] = []
+
+            # Gambar garis marka jika ada
+            if marka_y:
+                cv2.line(frame, (0, marka_y), (frame.shape[1], marka_y), (0, 255, 0), 2)
+
+            if ctx['status'] == "RED" and model is None:
+                # Model masih dimuat saat startup: frame merah ini tidak bisa diperiksa
+                self.frames_without_model += 1
+            elif ctx['status'] == "RED":
+                # Lewati YOLO jika tidak ada gerakan di dekat garis marka (kecuali heartbeat)
+                if camera.motion_gate is None or camera.motion_gate.should_infer(frame, marka_y):
+                    to_infer.append(ctx)
+                else:
+                    # Tidak ada gerakan: posisi track terakhir tetap berlaku
+                    ctx['tracks'] = [t for t in camera.tracker.tracks if t.time_since_update == 0]
+            elif camera.tracker.tracks:
+                # Fase merah selesai, track lama dan background gerakan tidak berlaku lagi
+                camera.tracker.reset()
+                if camera.motion_gate is not None:
+                    camera.motion_gate.reset()
+
+        detections_per_camera = []
+        if to_infer:
+            # Prediksi dengan model YOLO (confidence rendah ikut dipakai tracker).
+            # Dengan pita aktif hanya area sekitar garis marka yang diproses.
+            with self.metrics.span("predict"):
+                detections_per_camera = predict_batch(model, [ctx['frame'] for ctx in to_infer],
+                                                      [ctx['marka_y'] for ctx in to_infer],
+                                                      self.conf, imgsz=self.imgsz, band=band)
+            self.predictions += 1
+
+        postprocess_start = time.perf_counter()
+        # Track ID persisten: satu event pelanggaran per kendaraan
+        for ctx, detections in zip(to_infer, detections_per_camera):
+            ctx['tracks'], ctx['new_violations'] = ctx['camera'].tracker.update(detections, ctx['marka_y'])
+
+        for ctx in batch:
+            frame = ctx['frame']
+            for track in ctx['tracks']:
+                if not track.violated:
+                    continue
+                label = model.names.get(track.cls_id, str(track.cls_id))
+                confidence = track.confidence * 100
+                x1, y1, x2, y2 = map(int, track.box)
+
+                # Gambar bounding box merah untuk kendaraan yang melanggar
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+                cv2.putText(frame, f"#{track.track_id} {label} {confidence:.1f}%", (x1, y1 - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
+
+            for track in ctx['new_violations']:
+                label = model.names.get(track.cls_id, str(track.cls_id))
+                x1, y1, x2, y2 = map(int, track.box)
+                print(f"🚨 Pelanggaran [{ctx['camera'].camera_id}]: {label} #{track.track_id} melewati marka!")
+
+                ctx['violations'].append({
+                    'track_id': track.track_id,
+                    'label': label,
+                    'confidence': track.confidence * 100,
+                    'bounding_box': [x1, y1, x2, y2],
+                    'vehicle_position': int(track.center_y)
+                })
+
+            # FPS berdasarkan latensi frame dari capture sampai selesai inferensi
+            elapsed = time.time() - ctx['start_time']
+            ctx['fps'] = 1.0 / elapsed if elapsed > 0 else 0
+            ctx['camera'].tick()
+            if ctx['first_red'] and model is not None:
+                ctx['camera'].scheduler.record_first_red(ctx)
+        self.metrics.observe("postprocess", time.perf_counter() - postprocess_start)
+        return batch
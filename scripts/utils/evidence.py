@@ -0,0 +1,186 @@
+# =============================================
+# ENCODER BUKTI PELANGGARAN DI POOL WORKER
+# =============================================
+# Stage inferensi hanya memasukkan referensi frame (ctx) ke antrian.
+# Worker meng-encode JPEG satu kali per frame, menulis file secara atomik
+# (tulis ke file sementara lalu rename), lalu meneruskan byte hasil encode
+# ke stage database/transfer sehingga file tidak perlu dibaca ulang dari disk.
+
+import os
+import time
+import threading
+from collections import deque
+from datetime import datetime
+import cv2
+from utils.pipeline import BoundedQueue, POLICY_BLOCK
+from utils.metrics import NULL_METRICS
+
+_STOP = object()
+
+def crop_box(frame, box, margin):
+    """Potong area kendaraan dengan margin relatif terhadap ukuran box"""
+    height, width = frame.shape[:2]
+    x1, y1, x2, y2 = box
+    pad_x, pad_y = int((x2 - x1) * margin), int((y2 - y1) * margin)
+    x1, y1 = max(0, x1 - pad_x), max(0, y1 - pad_y)
+    x2, y2 = min(width, x2 + pad_x), min(height, y2 + pad_y)
+    if x2 <= x1 or y2 <= y1:
+        return frame
+    return frame[y1:y2, x1:x2]
+
+def downscale(image, max_width):
+    """Perkecil gambar ke lebar maksimum (rasio tetap); gambar kecil tidak diubah"""
+    if not max_width or image.shape[1] <= max_width:
+        return image
+    ratio = max_width / image.shape[1]
+    return cv2.resize(image, (max_width, max(1, int(image.shape[0] * ratio))), interpolation=cv2.INTER_AREA)
+
+def write_atomic(path, data):
+    """Tulis ke file sementara di folder yang sama lalu rename (tidak ada file setengah jadi)"""
+    directory, filename = os.path.split(path)
+    temp_path = os.path.join(directory, f".{filename}.tmp")
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+class EvidenceWriter:
+    """
+    Pool worker untuk encode dan simpan gambar bukti. Bisa dipasang langsung
+    sebagai target Stage.connect() dan sebagai anggota Pipeline (start/stop/get_stats).
+    """
+
+    def __init__(self, output_dir, on_saved, workers=2, jpeg_quality=90, crop=False, crop_margin=0.25,
+                 max_width=None, maxsize=64, policy=POLICY_BLOCK, name="evidence", metrics=None):
+        self.name = name
+        self.metrics = metrics or NULL_METRICS
+        self.output_dir = output_dir
+        self.on_saved = on_saved
+        self.workers = max(1, workers)
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+        self.crop = crop
+        self.crop_margin = crop_margin
+        self.max_width = max_width
+
+        self.input = BoundedQueue(name, maxsize, policy)
+        self.threads = []
+
+        # Anti-duplikasi nama file antar worker
+        self.saved_images = set()
+        self.lock = threading.Lock()
+
+        # Statistik
+        self.processed = 0
+        self.encoded = 0
+        self.errors = 0
+        self.bytes_written = 0
+        self.max_time = 0.0
+        self.recent_times = deque(maxlen=100)
+
+    def put(self, batch):
+        """Masukkan referensi frame (list ctx); tidak ada encode di thread pemanggil"""
+        return self.input.put(batch)
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"{self.name}-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Selesaikan semua item di antrian lalu hentikan worker"""
+        for _ in self.threads:
+            self.input.put(_STOP, force_block=True)
+        for thread in self.threads:
+            thread.join()
+
+    def _run(self):
+        while True:
+            batch = self.input.get()
+            if batch is _STOP:
+                break
+            start = time.perf_counter()
+            for ctx in batch:
+                if not ctx['violations']:
+                    continue
+                try:
+                    with self.metrics.span(self.name):
+                        self._save(ctx)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"⚠️ Error encode bukti [{ctx['camera'].camera_id}]: {e}")
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.processed += 1
+                self.max_time = max(self.max_time, elapsed)
+                self.recent_times.append(elapsed)
+
+    def _encode(self, image):
+        ok, buffer = cv2.imencode(".jpg", downscale(image, self.max_width), self.encode_params)
+        if not ok:
+            raise RuntimeError("cv2.imencode gagal")
+        with self.lock:
+            self.encoded += 1
+        return buffer.tobytes()
+
+    def _save(self, ctx):
+        # Gunakan waktu capture frame, bukan waktu selesai inferensi
+        frame_datetime = datetime.fromtimestamp(ctx['frame_time'])
+        timestamp = frame_datetime.strftime('%Y-%m-%d %H:%M:%S')
+
+        # Full frame cukup di-encode sekali untuk semua kendaraan di frame ini
+        frame_bytes = None
+        for violation in ctx['violations']:
+            label = violation['label']
+            filename = f"{label}_{frame_datetime.strftime('%Y%m%d_%H%M%S')}_{violation['track_id']}.jpg"
+            image_path = os.path.join(self.output_dir, filename)
+
+            with self.lock:
+                if image_path in self.saved_images:
+                    print(f"⚠️ Gambar sudah tersimpan sebelumnya: {filename}")
+                    continue
+                self.saved_images.add(image_path)
+
+            if self.crop:
+                image_bytes = self._encode(crop_box(ctx['frame'], violation['bounding_box'], self.crop_margin))
+            else:
+                if frame_bytes is None:
+                    frame_bytes = self._encode(ctx['frame'])
+                image_bytes = frame_bytes
+
+            write_atomic(image_path, image_bytes)
+            with self.lock:
+                self.bytes_written += len(image_bytes)
+
+            self.on_saved({
+                'label': label,
+                'timestamp': timestamp,
+                'image_path': image_path,
+                'image_bytes': image_bytes,
+                'fps': ctx['fps'],
+                'metadata': {
+                    'confidence': violation['confidence'],
+                    'track_id': violation['track_id'],
+                    'camera_id': ctx['camera'].camera_id,
+                    'location': ctx['camera'].location,
+                    'frame_id': ctx['frame_id'],
+                    'frame_time': ctx['frame_time'],
+                    'bounding_box': violation['bounding_box'],
+                    'vehicle_position': violation['vehicle_position'],
+                    'road_marking_position': ctx['marka_y']
+                }
+            })
+
+    def get_stats(self):
+        recent = list(self.recent_times)
+        return {
+            'queue': self.input.qsize(),
+            'max_queue': self.input.max_depth,
+            'dropped': self.input.dropped,
+            'processed': self.processed,
+            'errors': self.errors,
+            'avg_ms': (sum(recent) / len(recent) * 1000) if recent else 0.0,
+            'max_ms': self.max_time * 1000,
+            'encoded': self.encoded,
+            'bytes_written': self.bytes_written
+        }
@@ -0,0 +1,175 @@
+# =============================================
+# BACKEND INFERENSI: PYTORCH / ONNX RUNTIME / OPENVINO
+# =============================================
+# Semua backend punya interface yang sama:
+#   detect(frames, conf, imgsz) -> list array Nx6 [x1, y1, x2, y2, conf, cls] per frame
+#   names                       -> dict {cls_id: label}
+
+import os
+import ast
+import cv2
+import numpy as np
+
+class UltralyticsBackend:
+    """Jalur lama: bobot PyTorch lewat ultralytics.YOLO"""
+
+    def __init__(self, model_path):
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+        self.kind = "pytorch"
+
+    def detect(self, frames, conf, imgsz=320):
+        source = frames[0] if len(frames) == 1 else frames
+        results = self.model.predict(source=source, conf=conf, imgsz=imgsz, verbose=False)
+        return [result.boxes.data.cpu().numpy() for result in results]
+
+
+def letterbox(frame, shape):
+    """Resize dengan rasio tetap lalu padding ke shape (h, w); return gambar, rasio, padding"""
+    height, width = frame.shape[:2]
+    ratio = min(shape[0] / height, shape[1] / width)
+    new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+    pad_x, pad_y = (shape[1] - new_w) / 2, (shape[0] - new_h) / 2
+
+    if (new_w, new_h) != (width, height):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return frame, ratio, (left, top)
+
+def preprocess(frames, shape):
+    """Letterbox semua frame lalu ubah ke tensor NCHW float32 RGB [0, 1]"""
+    images, transforms = [], []
+    for frame in frames:
+        image, ratio, pad = letterbox(frame, shape)
+        images.append(image)
+        transforms.append((ratio, pad, frame.shape[:2]))
+    blob = cv2.dnn.blobFromImages(images, scalefactor=1 / 255.0, swapRB=True)
+    return blob, transforms
+
+def postprocess(output, transforms, conf, iou=0.45, max_det=300):
+    """Decode output YOLOv8/YOLO11 (B, 4 + nc, N) + NMS per kelas, kembali ke koordinat frame"""
+    results = []
+    for prediction, (ratio, (pad_x, pad_y), (height, width)) in zip(output, transforms):
+        prediction = prediction.T
+        scores = prediction[:, 4:]
+        cls_ids = scores.argmax(axis=1)
+        confidences = scores[np.arange(len(scores)), cls_ids]
+        keep = confidences >= conf
+        if not keep.any():
+            results.append(np.zeros((0, 6), dtype=np.float32))
+            continue
+
+        boxes_xywh = prediction[keep, :4]
+        confidences = confidences[keep]
+        cls_ids = cls_ids[keep]
+
+        # NMS per kelas: geser box tiap kelas agar tidak saling tumpang tindih
+        offset = cls_ids[:, None] * 4096.0
+        nms_boxes = np.column_stack([boxes_xywh[:, 0] - boxes_xywh[:, 2] / 2 + offset[:, 0],
+                                     boxes_xywh[:, 1] - boxes_xywh[:, 3] / 2 + offset[:, 0],
+                                     boxes_xywh[:, 2], boxes_xywh[:, 3]])
+        indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), confidences.tolist(), conf, iou, top_k=max_det)
+        # NMSBoxes memakai skor > conf (ketat): box dengan skor tepat = conf bisa tidak tersisa
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        if len(indices) == 0:
+            results.append(np.zeros((0, 6), dtype=np.float32))
+            continue
+
+        xyxy = np.column_stack([boxes_xywh[:, 0] - boxes_xywh[:, 2] / 2,
+                                boxes_xywh[:, 1] - boxes_xywh[:, 3] / 2,
+                                boxes_xywh[:, 0] + boxes_xywh[:, 2] / 2,
+                                boxes_xywh[:, 1] + boxes_xywh[:, 3] / 2])[indices]
+        xyxy[:, [0, 2]] = np.clip((xyxy[:, [0, 2]] - pad_x) / ratio, 0, width)
+        xyxy[:, [1, 3]] = np.clip((xyxy[:, [1, 3]] - pad_y) / ratio, 0, height)
+        results.append(np.column_stack([xyxy, confidences[indices], cls_ids[indices]]).astype(np.float32))
+    return results
+
+def input_shape(imgsz, static_shape):
+    """Shape input (h, w): pakai shape model jika statis, jika tidak pakai imgsz"""
+    if static_shape is not None:
+        return static_shape
+    if isinstance(imgsz, (list, tuple)):
+        return int(imgsz[0]), int(imgsz[1])
+    return int(imgsz), int(imgsz)
+
+
+class OnnxRuntimeBackend:
+    """Model hasil export ONNX (FP32 atau INT8) di ONNX Runtime CPU"""
+
+    def __init__(self, model_path, threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.kind = "onnx"
+
+        # Shape statis (h, w) jika model tidak diexport dengan dynamic=True
+        shape = self.session.get_inputs()[0].shape
+        self.static_shape = tuple(shape[2:]) if all(isinstance(s, int) for s in shape[2:]) else None
+        self.static_batch = shape[0] if isinstance(shape[0], int) else None
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata['names']) if 'names' in metadata else {}
+
+    def detect(self, frames, conf, imgsz=320):
+        shape = input_shape(imgsz, self.static_shape)
+        if self.static_batch == 1 and len(frames) > 1:
+            # Model batch statis: jalankan satu per satu
+            return [self.detect([frame], conf, imgsz)[0] for frame in frames]
+        blob, transforms = preprocess(frames, shape)
+        output = self.session.run(None, {self.input_name: blob})[0]
+        return postprocess(output, transforms, conf)
+
+
+class OpenVinoBackend:
+    """Model hasil export OpenVINO (FP32/FP16 atau INT8) di CPU"""
+
+    def __init__(self, model_path, threads=None):
+        import openvino as ov
+        core = ov.Core()
+        if os.path.isdir(model_path):
+            model_path = next(os.path.join(model_path, f) for f in os.listdir(model_path) if f.endswith(".xml"))
+        model = core.read_model(model_path)
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        self.compiled = core.compile_model(model, "CPU", config)
+        self.kind = "openvino"
+
+        partial_shape = model.inputs[0].get_partial_shape()
+        self.static_shape = None
+        if partial_shape[2].is_static and partial_shape[3].is_static:
+            self.static_shape = (partial_shape[2].get_length(), partial_shape[3].get_length())
+        self.static_batch = partial_shape[0].get_length() if partial_shape[0].is_static else None
+
+        self.names = {}
+        metadata_file = os.path.join(os.path.dirname(model_path), "metadata.yaml")
+        if os.path.exists(metadata_file):
+            import yaml
+            with open(metadata_file, 'r') as f:
+                self.names = yaml.safe_load(f).get('names', {})
+
+    def detect(self, frames, conf, imgsz=320):
+        shape = input_shape(imgsz, self.static_shape)
+        if self.static_batch == 1 and len(frames) > 1:
+            return [self.detect([frame], conf, imgsz)[0] for frame in frames]
+        blob, transforms = preprocess(frames, shape)
+        output = self.compiled(blob)[0]
+        return postprocess(output, transforms, conf)
+
+
+def create_backend(kind, model_path, threads=None):
+    """Buat backend sesuai konfigurasi; library runtime hanya diimport jika dipakai"""
+    if kind == "pytorch":
+        return UltralyticsBackend(model_path)
+    if kind == "onnx":
+        return OnnxRuntimeBackend(model_path, threads)
+    if kind == "openvino":
+        return OpenVinoBackend(model_path, threads)
+    raise ValueError(f"Backend inferensi tidak dikenal: {kind}")
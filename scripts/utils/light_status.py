@@ -5,9 +5,10 @@
 from config.settings import dur_red, dur_yellow, dur_green, cycle_time
 import time
 
-def get_looping_light_status(start_cycle):
-    """Menentukan status lampu berdasarkan waktu looping"""
-    elapsed = int(time.time() - start_cycle) % cycle_time
+def get_looping_light_status(start_cycle, now=None):
+    """Menentukan status lampu berdasarkan waktu looping (now = jam simulasi, default time.time())"""
+    now = time.time() if now is None else now
+    elapsed = int(now - start_cycle) % cycle_time
 
     if elapsed < dur_red:
         return "RED"
@@ -17,3 +18,24 @@ def get_looping_light_status(start_cycle):
         return "GREEN"
     else:
         return "YELLOW"
+
+def get_phase_timeline(start_cycle, now=None):
+    """
+    Posisi di siklus lampu: (status, detik menuju pergantian fase berikutnya,
+    detik menuju awal RED berikutnya). Batas fase sama dengan get_looping_light_status.
+    """
+    now = time.time() if now is None else now
+    elapsed = (now - start_cycle) % cycle_time
+    boundaries = [
+        (dur_red, "RED"),
+        (dur_red + dur_yellow, "YELLOW"),
+        (dur_red + dur_yellow + dur_green, "GREEN"),
+        (cycle_time, "YELLOW")
+    ]
+    whole = int(elapsed)
+    for end, status in boundaries:
+        if whole < end:
+            until_next = end - elapsed
+            break
+    until_red = 0.0 if status == "RED" else cycle_time - elapsed
+    return status, until_next, until_red
@@ -0,0 +1,171 @@
+# =============================================
+# METRIK LATENSI PER TAHAP + ENDPOINT PROMETHEUS
+# =============================================
+# Setiap tahap (capture, marking, predict, postprocess, evidence, db, enqueue,
+# display) dicatat sebagai span bernama yang mengisi histogram. MetricsServer
+# menyajikan histogram tersebut beserta gauge (CPU/RAM/suhu, kedalaman antrian)
+# dalam format teks Prometheus di http://<host>:<port>/metrics, sehingga
+# regresi per tahap bisa dilihat dari jauh tanpa profiler.
+#
+# Contoh:
+#   metrics = MetricsRegistry()
+#   with metrics.span("predict"):
+#       ...
+#   metrics.gauge("traffic_cpu_percent", "CPU (%)", lambda: monitor.current_stats['cpu_percent'])
+#   MetricsServer(metrics, "127.0.0.1", 9108).start()
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Batas bucket histogram dalam detik (1ms .. 5s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+SPAN_METRIC = "traffic_span_seconds"
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # bucket terakhir = +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        """(bucket kumulatif, sum, count) untuk ditampilkan"""
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = []
+        running = 0
+        for bucket_count in counts:
+            running += bucket_count
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.spans = {}
+        self.gauges = []  # (nama, keterangan, label, fungsi)
+        self.lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        """Catat durasi satu span yang sudah diukur di tempat lain"""
+        histogram = self.spans.get(name)
+        if histogram is None:
+            with self.lock:
+                histogram = self.spans.setdefault(name, Histogram(self.buckets))
+        histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def gauge(self, name, help_text, func, label=None):
+        """
+        Daftarkan gauge yang dibaca saat endpoint diakses.
+        func() mengembalikan angka, atau dict {nilai_label: angka} jika `label` diisi.
+        """
+        with self.lock:
+            self.gauges.append((name, help_text, label, func))
+
+    def render(self):
+        """Semua metrik dalam format teks Prometheus"""
+        lines = [f"# HELP {SPAN_METRIC} Durasi span per tahap pipeline (detik)",
+                 f"# TYPE {SPAN_METRIC} histogram"]
+        with self.lock:
+            spans = sorted(self.spans.items())
+            gauges = list(self.gauges)
+
+        for name, histogram in spans:
+            cumulative, total, count = histogram.snapshot()
+            for bound, value in zip(histogram.buckets, cumulative):
+                lines.append(f'{SPAN_METRIC}_bucket{{span="{name}",le="{bound}"}} {value}')
+            lines.append(f'{SPAN_METRIC}_bucket{{span="{name}",le="+Inf"}} {cumulative[-1]}')
+            lines.append(f'{SPAN_METRIC}_sum{{span="{name}"}} {total}')
+            lines.append(f'{SPAN_METRIC}_count{{span="{name}"}} {count}')
+
+        for name, help_text, label, func in gauges:
+            try:
+                value = func()
+            except Exception as e:
+                print(f"⚠️ Gauge {name} gagal dibaca: {e}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            if label is None:
+                lines.append(f"{name} {float(value)}")
+            else:
+                for label_value, item in value.items():
+                    lines.append(f'{name}{{{label}="{label_value}"}} {float(item)}')
+        return "\n".join(lines) + "\n"
+
+
+class NullMetrics:
+    """Pengganti MetricsRegistry saat metrik tidak dipakai (semua panggilan no-op)"""
+
+    def observe(self, name, seconds):
+        pass
+
+    def span(self, name):
+        return nullcontext()
+
+
+NULL_METRICS = NullMetrics()
+
+
+class MetricsServer:
+    """Endpoint HTTP kecil (thread sendiri) yang menyajikan registry di /metrics"""
+
+    def __init__(self, registry, host="127.0.0.1", port=9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Jangan spam terminal setiap kali Prometheus scrape
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+        self.thread.start()
+        print(f"📈 Endpoint metrik: http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,83 @@
+# =============================================
+# MOTION GATE: LEWATI YOLO SAAT JALUR KOSONG
+# =============================================
+
+import cv2
+import numpy as np
+from utils.band_inference import band_bounds
+
+class MotionGate:
+    def __init__(self, scale=0.25, pixel_threshold=25, min_changed_ratio=0.002,
+                 heartbeat_frames=15, learning_rate=0.05, above=160, below=120):
+        self.scale = scale
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.heartbeat_frames = heartbeat_frames
+        self.learning_rate = learning_rate
+        self.above = above
+        self.below = below
+
+        self.background = None
+        self.frames_since_inference = 0
+        self.last_changed_ratio = 0.0
+
+        # Statistik
+        self.frames_checked = 0
+        self.inferences = 0
+        self.heartbeats = 0
+        self.skipped = 0
+
+    def reset(self):
+        """Buang model background (misal saat fase merah berakhir)"""
+        self.background = None
+        self.frames_since_inference = 0
+
+    def _approach_roi(self, frame, marka_y):
+        """ROI zona pendekatan (pita sekitar marka, atau setengah bawah) dalam grayscale kecil"""
+        if marka_y:
+            y0, y1 = band_bounds(frame.shape[0], marka_y, self.above, self.below)
+        else:
+            y0, y1 = frame.shape[0] // 2, frame.shape[0]
+        roi = cv2.resize(frame[y0:y1, :], None, fx=self.scale, fy=self.scale,
+                         interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def should_infer(self, frame, marka_y):
+        """True jika ada perubahan piksel di dekat garis marka atau waktunya heartbeat"""
+        self.frames_checked += 1
+        gray = self._approach_roi(frame, marka_y)
+
+        if self.background is None or self.background.shape != gray.shape:
+            # Background baru (awal fase merah atau garis marka bergeser)
+            self.background = gray.astype(np.float32)
+            motion = True
+        else:
+            diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+            changed = np.count_nonzero(diff > self.pixel_threshold)
+            self.last_changed_ratio = changed / diff.size
+            motion = self.last_changed_ratio >= self.min_changed_ratio
+            # Background diperbarui bertahap (running average)
+            cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        heartbeat = self.frames_since_inference + 1 >= self.heartbeat_frames
+        if motion or heartbeat:
+            if not motion:
+                self.heartbeats += 1
+            self.inferences += 1
+            self.frames_since_inference = 0
+            return True
+
+        self.skipped += 1
+        self.frames_since_inference += 1
+        return False
+
+    def get_stats(self):
+        saved = (self.skipped / self.frames_checked * 100) if self.frames_checked else 0.0
+        return {
+            'checked': self.frames_checked,
+            'inferences': self.inferences,
+            'heartbeats': self.heartbeats,
+            'skipped': self.skipped,
+            'saved_percent': saved
+        }
@@ -0,0 +1,62 @@
+# =============================================
+# STATE PER KAMERA UNTUK MODE MULTI-KAMERA
+# =============================================
+
+import time
+from utils.light_status import get_looping_light_status
+
+class CameraState:
+    """Semua state milik satu kamera: capture, garis marka, tracker, motion gate, dan lampu"""
+
+    def __init__(self, camera_id, grabber, detector, calibrator, tracker, motion_gate=None,
+                 start_cycle=None, light_offset=0, location="Traffic Light Camera 1", marking_mode="static",
+                 scheduler_factory=None, clip_buffer=None):
+        self.camera_id = camera_id
+        self.grabber = grabber
+        self.detector = detector
+        self.calibrator = calibrator
+        self.tracker = tracker
+        self.motion_gate = motion_gate
+        self.clip_buffer = clip_buffer
+        self.location = location
+        self.marking_mode = marking_mode
+
+        # Siklus lampu tiap kamera bisa digeser dengan light_offset (detik)
+        self.start_cycle = (start_cycle or time.time()) - light_offset
+        self.scheduler = scheduler_factory(camera_id, self.start_cycle) if scheduler_factory else None
+        self.last_marka_y = None
+
+        # FPS per kamera (dihitung di stage inferensi)
+        self.fps = 0.0
+        self.frames_processed = 0
+        self.last_tick = None
+
+    def get_status(self, now=None):
+        return get_looping_light_status(self.start_cycle, now)
+
+    def get_marka_y(self, frame, now=None):
+        if self.marking_mode == "static":
+            self.last_marka_y = self.calibrator.get_marka_y(frame, now)
+        else:
+            self.last_marka_y = self.detector.detect(frame, now)
+        return self.last_marka_y
+
+    def tick(self):
+        """Catat satu frame selesai diproses dan perbarui FPS (smoothing eksponensial)"""
+        now = time.time()
+        if self.last_tick is not None and now > self.last_tick:
+            instant = 1.0 / (now - self.last_tick)
+            self.fps = instant if self.fps == 0 else 0.9 * self.fps + 0.1 * instant
+        self.last_tick = now
+        self.frames_processed += 1
+
+
+def model_memory_mb(model):
+    """Perkiraan memori bobot model (parameter + buffer) dalam MB"""
+    try:
+        module = model.model
+        total = sum(p.numel() * p.element_size() for p in module.parameters())
+        total += sum(b.numel() * b.element_size() for b in module.buffers())
+        return total / (1024 * 1024)
+    except Exception:
+        return 0.0
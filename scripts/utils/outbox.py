@@ -0,0 +1,185 @@
+# =============================================
+# OUTBOX LOKAL (SQLITE WAL) SAAT MYSQL TIDAK TERSEDIA
+# =============================================
+# Semua record pelanggaran selalu ditulis dulu ke outbox lokal (kecepatan disk
+# lokal, tidak bergantung jaringan). Replayer di thread terpisah mengirim isi
+# outbox ke MySQL per batch setelah server tersedia, lalu menandai batch itu
+# sebagai terkirim (ack) dengan menghapusnya dari outbox.
+#
+# Jika program mati di antara commit MySQL dan ack lokal, batch terakhir akan
+# dikirim ulang, tetapi INSERT IGNORE pada image_path membuatnya tidak ganda.
+
+import time
+import sqlite3
+import threading
+from collections import deque
+from utils.metrics import NULL_METRICS
+
+class Outbox:
+    """Outbox append-only; punya interface insert_many() yang sama dengan backend database"""
+
+    def __init__(self, path, synchronous="FULL"):
+        self.path = path
+        self.kind = "outbox"
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.appended = threading.Event()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(f"PRAGMA synchronous={synchronous}")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    label TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    image_path TEXT NOT NULL UNIQUE,
+                    created_at REAL NOT NULL
+                )""")
+            self.conn.commit()
+        self.total_appended = 0
+        self.total_acked = 0
+
+    def insert_many(self, rows):
+        """Tambahkan record (label, timestamp, image_path); return jumlah baris baru"""
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.executemany(
+                "INSERT OR IGNORE INTO outbox (label, timestamp, image_path, created_at) VALUES (?, ?, ?, ?)",
+                [tuple(row) + (now,) for row in rows])
+            self.conn.commit()
+            inserted = cursor.rowcount
+        self.total_appended += inserted
+        self.appended.set()
+        return inserted
+
+    def peek(self, limit):
+        """Batch tertua yang belum di-ack: (id_terakhir, rows)"""
+        with self.lock:
+            records = self.conn.execute(
+                "SELECT id, label, timestamp, image_path FROM outbox ORDER BY id LIMIT ?", (limit,)).fetchall()
+        if not records:
+            return None, []
+        return records[-1][0], [record[1:] for record in records]
+
+    def ack(self, last_id):
+        """Batch sampai last_id sudah di-commit di MySQL; hapus dari outbox"""
+        with self.lock:
+            cursor = self.conn.execute("DELETE FROM outbox WHERE id <= ?", (last_id,))
+            self.conn.commit()
+        self.total_acked += cursor.rowcount
+
+    def depth(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def oldest_age(self):
+        """Umur record tertua yang belum terkirim (detik)"""
+        with self.lock:
+            oldest = self.conn.execute("SELECT MIN(created_at) FROM outbox").fetchone()[0]
+        return time.time() - oldest if oldest else 0.0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class OutboxReplayer:
+    """Thread yang menguras outbox ke database tujuan per batch"""
+
+    def __init__(self, outbox, backend_factory, batch_size=200, retry_interval=5.0, metrics=None):
+        self.outbox = outbox
+        self.metrics = metrics or NULL_METRICS
+        self.backend_factory = backend_factory
+        self.batch_size = max(1, batch_size)
+        self.retry_interval = retry_interval
+        self.backend = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+        # Statistik
+        self.replayed = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_error = None
+        self.replay_time = 0.0
+        self.recent = deque(maxlen=20)  # (jumlah record, detik) per batch
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="outbox-replayer", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, drain_timeout=10.0):
+        """Coba kuras sisa outbox (maksimal drain_timeout detik) lalu berhenti"""
+        self.stopped.set()
+        self.outbox.appended.set()
+        if self.thread:
+            self.thread.join()
+        deadline = time.monotonic() + drain_timeout
+        while time.monotonic() < deadline and self._replay_once():
+            pass
+
+    def _connect(self):
+        if self.backend is not None:
+            return True
+        try:
+            self.backend = self.backend_factory()
+            print(f"✅ Koneksi database tersedia ({self.backend.kind}), outbox: {self.outbox.depth()} record tertunda")
+            return True
+        except Exception as e:
+            self.failures += 1
+            if str(e) != self.last_error:
+                # Dicetak sekali per jenis error, bukan setiap percobaan ulang
+                print(f"❌ Koneksi database gagal, record tetap di outbox: {e}")
+            self.last_error = str(e)
+            return False
+
+    def _replay_once(self):
+        """Kirim satu batch; return True jika ada record yang terkirim"""
+        if not self._connect():
+            return False
+        last_id, rows = self.outbox.peek(self.batch_size)
+        if not rows:
+            return False
+        start = time.perf_counter()
+        try:
+            self.backend.insert_many(rows)
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"❌ Replay outbox gagal ({len(rows)} record tetap di outbox): {e}")
+            return False
+        elapsed = time.perf_counter() - start
+        self.metrics.observe("db_replay", elapsed)
+        self.outbox.ack(last_id)
+        self.last_error = None
+
+        self.replayed += len(rows)
+        self.batches += 1
+        self.replay_time += elapsed
+        self.recent.append((len(rows), elapsed))
+        return True
+
+    def _run(self):
+        while not self.stopped.is_set():
+            self.outbox.appended.clear()
+            if self._replay_once():
+                continue
+            # Outbox kosong: tunggu record baru; gagal: coba lagi setelah retry_interval
+            failed = self.backend is None or self.last_error is not None
+            self.outbox.appended.wait(self.retry_interval if failed else None)
+
+    def get_stats(self):
+        count = sum(n for n, _ in self.recent)
+        seconds = sum(t for _, t in self.recent)
+        return {
+            'depth': self.outbox.depth(),
+            'oldest_age': self.outbox.oldest_age(),
+            'appended': self.outbox.total_appended,
+            'replayed': self.replayed,
+            'batches': self.batches,
+            'failures': self.failures,
+            'connected': self.backend is not None,
+            'rate': count / seconds if seconds > 0 else 0.0,
+            'last_error': self.last_error
+        }
@@ -0,0 +1,163 @@
+# =============================================
+# PIPELINE BERTAHAP DENGAN ANTRIAN TERBATAS
+# =============================================
+
+import time
+import threading
+from collections import deque
+
+POLICY_BLOCK = "block"              # Producer menunggu sampai ada slot (tidak ada data hilang)
+POLICY_DROP_OLDEST = "drop_oldest"  # Buang item tertua, simpan yang terbaru
+POLICY_DROP_NEWEST = "drop_newest"  # Tolak item baru saat antrian penuh
+
+_STOP = object()
+
+class BoundedQueue:
+    def __init__(self, name, maxsize=2, policy=POLICY_DROP_OLDEST):
+        if policy not in (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_DROP_NEWEST):
+            raise ValueError(f"Policy antrian tidak dikenal: {policy}")
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.policy = policy
+        self.items = deque()
+        self.condition = threading.Condition()
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, item, force_block=False):
+        """Masukkan item sesuai policy; return False jika item dibuang"""
+        with self.condition:
+            if len(self.items) >= self.maxsize:
+                if self.policy == POLICY_BLOCK or force_block:
+                    while len(self.items) >= self.maxsize:
+                        self.condition.wait()
+                elif self.policy == POLICY_DROP_OLDEST:
+                    self.items.popleft()
+                    self.dropped += 1
+                else:
+                    self.dropped += 1
+                    return False
+            self.items.append(item)
+            self.max_depth = max(self.max_depth, len(self.items))
+            self.condition.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Ambil item tertua; return None jika timeout"""
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.items, timeout):
+                return None
+            item = self.items.popleft()
+            self.condition.notify_all()
+            return item
+
+    def get_latest(self):
+        """Ambil item terbaru tanpa menunggu, item lama dibuang"""
+        with self.condition:
+            if not self.items:
+                return None
+            item = self.items.pop()
+            self.dropped += len(self.items)
+            self.items.clear()
+            self.condition.notify_all()
+            return item
+
+    def qsize(self):
+        return len(self.items)
+
+
+class Stage:
+    def __init__(self, name, func, maxsize=2, policy=POLICY_DROP_OLDEST):
+        self.name = name
+        self.func = func
+        self.input = BoundedQueue(name, maxsize, policy)
+        self.outputs = []
+        self.thread = None
+
+        # Statistik waktu proses per item
+        self.processed = 0
+        self.errors = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.recent_times = deque(maxlen=100)
+
+    def connect(self, target, when=None):
+        """Teruskan hasil stage ini ke target (Stage atau BoundedQueue)"""
+        queue = target.input if isinstance(target, Stage) else target
+        self.outputs.append((queue, when))
+        return target
+
+    def put(self, item):
+        return self.input.put(item)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Kirim sinyal berhenti setelah semua item di antrian selesai diproses"""
+        self.input.put(_STOP, force_block=True)
+        if self.thread:
+            self.thread.join()
+
+    def _run(self):
+        while True:
+            item = self.input.get()
+            if item is _STOP:
+                break
+
+            start = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Error di stage {self.name}: {e}")
+                continue
+            finally:
+                elapsed = time.perf_counter() - start
+                self.processed += 1
+                self.total_time += elapsed
+                self.max_time = max(self.max_time, elapsed)
+                self.recent_times.append(elapsed)
+
+            if result is None:
+                continue
+            for queue, when in self.outputs:
+                if when is None or when(result):
+                    queue.put(result)
+
+    def get_stats(self):
+        recent = list(self.recent_times)
+        return {
+            'queue': self.input.qsize(),
+            'max_queue': self.input.max_depth,
+            'dropped': self.input.dropped,
+            'processed': self.processed,
+            'errors': self.errors,
+            'avg_ms': (sum(recent) / len(recent) * 1000) if recent else 0.0,
+            'max_ms': self.max_time * 1000
+        }
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = stages
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        print("🔗 Pipeline dimulai: " + " → ".join(stage.name for stage in self.stages))
+
+    def stop(self):
+        """Hentikan stage berurutan dari hulu ke hilir sehingga antrian terkuras"""
+        for stage in self.stages:
+            stage.stop()
+
+    def get_stats(self):
+        return {stage.name: stage.get_stats() for stage in self.stages}
+
+    def print_stats(self):
+        for name, stats in self.get_stats().items():
+            print(f"   {name:<10}: queue {stats['queue']} (max {stats['max_queue']}) | "
+                  f"{stats['avg_ms']:.1f}ms/item (max {stats['max_ms']:.1f}ms) | "
+                  f"processed {stats['processed']} | dropped {stats['dropped']}")
@@ -0,0 +1,142 @@
+# =============================================
+# PREVIEW MJPEG LEWAT HTTP (UNTUK UNIT TANPA MONITOR)
+# =============================================
+# Server HTTP kecil yang mengalirkan frame beranotasi sebagai MJPEG
+# (multipart/x-mixed-replace) di http://<host>:<port>/. Dibuka dari browser
+# atau VLC untuk pengecekan jarak jauh.
+#
+# Hemat CPU:
+# - wants_frame() False jika tidak ada klien, jadi main loop tidak menggambar overlay
+# - rate dibatasi max_fps, resolusi dibatasi max_width
+# - encode JPEG di thread sendiri; main loop hanya menyerahkan referensi frame
+
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+from utils.evidence import downscale
+
+BOUNDARY = "frame"
+
+class PreviewServer:
+    def __init__(self, host="0.0.0.0", port=8080, max_fps=5, max_width=640, jpeg_quality=70):
+        self.host = host
+        self.port = port
+        self.frame_interval = 1.0 / max_fps
+        self.max_width = max_width
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+
+        self.condition = threading.Condition()
+        self.pending_frame = None   # frame terbaru yang belum di-encode
+        self.jpeg = None            # hasil encode terbaru untuk semua klien
+        self.sequence = 0
+        self.clients = 0
+        self.last_submit = 0.0
+        self.stopped = False
+
+        # Statistik
+        self.encoded = 0
+        self.encode_time = 0.0
+
+        self.server = None
+        self.threads = []
+
+    def has_clients(self):
+        return self.clients > 0
+
+    def wants_frame(self):
+        """True jika ada klien dan sudah waktunya frame berikutnya (cek murah, tanpa lock)"""
+        return self.clients > 0 and time.monotonic() - self.last_submit >= self.frame_interval
+
+    def submit(self, frame):
+        """Serahkan frame beranotasi; frame tidak boleh diubah lagi oleh pemanggil"""
+        with self.condition:
+            self.pending_frame = frame
+            self.last_submit = time.monotonic()
+            self.condition.notify_all()
+
+    def _encode_loop(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending_frame is not None or self.stopped)
+                if self.stopped:
+                    return
+                frame, self.pending_frame = self.pending_frame, None
+
+            start = time.perf_counter()
+            success, encoded = cv2.imencode('.jpg', downscale(frame, self.max_width), self.encode_params)
+            if not success:
+                continue
+            self.encode_time += time.perf_counter() - start
+            self.encoded += 1
+            with self.condition:
+                self.jpeg = encoded.tobytes()
+                self.sequence += 1
+                self.condition.notify_all()
+
+    def _stream(self, handler):
+        """Kirim frame baru ke satu klien sampai koneksi putus"""
+        with self.condition:
+            self.clients += 1
+        try:
+            handler.send_response(200)
+            handler.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+            handler.send_header("Cache-Control", "no-cache")
+            handler.end_headers()
+            sequence = 0
+            while True:
+                with self.condition:
+                    self.condition.wait_for(lambda: self.sequence != sequence or self.stopped, timeout=5.0)
+                    if self.stopped:
+                        return
+                    if self.sequence == sequence:
+                        continue
+                    jpeg, sequence = self.jpeg, self.sequence
+                handler.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                    f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                handler.wfile.write(jpeg)
+                handler.wfile.write(b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self.condition:
+                self.clients -= 1
+
+    def start(self):
+        preview = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/stream"):
+                    self.send_error(404)
+                    return
+                preview._stream(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.threads = [threading.Thread(target=self.server.serve_forever, name="preview-server", daemon=True),
+                        threading.Thread(target=self._encode_loop, name="preview-encoder", daemon=True)]
+        for thread in self.threads:
+            thread.start()
+        print(f"📺 Preview MJPEG: http://{self.host}:{self.port}/ (maks {1 / self.frame_interval:.0f} FPS, "
+              f"lebar {self.max_width}px)")
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def get_stats(self):
+        return {
+            'clients': self.clients,
+            'encoded': self.encoded,
+            'avg_encode_ms': self.encode_time / self.encoded * 1000 if self.encoded else 0.0
+        }
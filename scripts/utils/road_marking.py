@@ -2,6 +2,8 @@
 # FUNGSI DETEKSI GARIS MARKA JALAN
 # =============================================
 
+import os
+import json
 import cv2
 import numpy as np
 import time
@@ -9,19 +11,26 @@ import time
 cached_marka_y = None
 last_marka_time = 0
 
-def detect_road_marking(frame, marka_y_history):
-    """Deteksi garis marka jalan dengan caching dan smoothing"""
+LOWER_WHITE = np.array([0, 0, 160])
+UPPER_WHITE = np.array([255, 50, 255])
 
-    global cached_marka_y, last_marka_time
+# Detektor fast: segmen dianggap horizontal jika |sudut| < MAX_LINE_ANGLE derajat.
+# Berbeda dengan versi loop, garis yang tepat 0° juga ikut dihitung.
+MAX_LINE_ANGLE = 10
+
+def white_mask(bgr):
+    """Mask piksel putih (marka) pada gambar BGR"""
+    hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+    return cv2.inRange(hsv, LOWER_WHITE, UPPER_WHITE)
+
+def find_marking_line(frame):
+    """Cari posisi y garis marka horizontal tanpa caching (None jika tidak ada)"""
 
     # 1?? Ambil bagian bawah frame (ROI)
     roi = frame[frame.shape[0] // 2 :, :]
-    hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
 
     # 2?? Deteksi warna putih
-    lower_white = np.array([0, 0, 160])
-    upper_white = np.array([255, 50, 255])
-    mask = cv2.inRange(hsv, lower_white, upper_white)
+    mask = white_mask(roi)
     edges = cv2.Canny(mask, 50, 150)
 
     # 3?? Deteksi garis horizontal menggunakan Hough Transform
@@ -41,16 +50,278 @@ def detect_road_marking(frame, marka_y_history):
                     min_y = y1
                     marka_y = y1 + frame.shape[0] // 2
 
-        # 4?? Simpan history untuk smoothing
-        if marka_y is not None:
-            marka_y_history.append(marka_y)
-            if len(marka_y_history) > 5:
-                marka_y_history.pop(0)
-            cached_marka_y = int(np.mean(marka_y_history))
-            last_marka_time = time.time()
+    return marka_y
+
+def detect_road_marking(frame, marka_y_history):
+    """Deteksi garis marka jalan dengan caching dan smoothing"""
+
+    global cached_marka_y, last_marka_time
+
+    marka_y = find_marking_line(frame)
+
+    # 4?? Simpan history untuk smoothing
+    if marka_y is not None:
+        marka_y_history.append(marka_y)
+        if len(marka_y_history) > 5:
+            marka_y_history.pop(0)
+        cached_marka_y = int(np.mean(marka_y_history))
+        last_marka_time = time.time()
 
     # 5?? Jika gagal deteksi, gunakan cache sebelumnya = 1.5 detik
     if marka_y is None and cached_marka_y and (time.time() - last_marka_time < 1.5):
         marka_y = cached_marka_y
 
     return marka_y
+
+# =============================================
+# DETEKTOR MARKA CEPAT (DOWNSCALE + VEKTORISASI)
+# =============================================
+
+def find_marking_line_fast(frame, scale=1.0):
+    """
+    Versi cepat find_marking_line: filter garis sekaligus dengan NumPy, ROI opsional di-downscale.
+    scale < 1.0 lebih cepat tetapi hasilnya TIDAK sama dengan versi lama (segmen Hough berubah
+    setelah downscale); cek dulu dengan bench_road_marking.py sebelum dipakai.
+    """
+    half = frame.shape[0] // 2
+    roi = frame[half:, :]
+    if scale != 1.0:
+        roi = cv2.resize(roi, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    mask = white_mask(roi)
+    edges = cv2.Canny(mask, 50, 150)
+
+    # Parameter Hough ikut diskalakan agar setara dengan resolusi penuh
+    lines = cv2.HoughLinesP(edges, 1, np.pi/180, max(1, int(100 * scale)),
+                            minLineLength=180 * scale, maxLineGap=max(1, int(20 * scale)))
+    if lines is None:
+        return None
+
+    segments = lines.reshape(-1, 4).astype(np.float32)
+    dx = segments[:, 2] - segments[:, 0]
+    dy = segments[:, 3] - segments[:, 1]
+    angle = np.abs(np.degrees(np.arctan2(dy, dx)))
+    length = np.hypot(dx, dy) / scale
+
+    # Filter garis horizontal yang panjang
+    keep = (angle < MAX_LINE_ANGLE) & (length > frame.shape[1] // 3)
+    if not keep.any():
+        return None
+    return int(round(segments[keep, 1].min() / scale)) + half
+
+
+class MarkaRingBuffer:
+    """Ring buffer ukuran tetap untuk smoothing posisi marka (rata-rata O(1))"""
+
+    def __init__(self, size=5):
+        self.values = np.zeros(size, dtype=np.float64)
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+
+    def append(self, value):
+        if self.count == len(self.values):
+            self.total -= self.values[self.index]
+        else:
+            self.count += 1
+        self.values[self.index] = value
+        self.total += value
+        self.index = (self.index + 1) % len(self.values)
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def __len__(self):
+        return self.count
+
+
+class RoadMarkingDetector:
+    def __init__(self, fast=True, scale=1.0, history_size=5, cache_seconds=1.5):
+        self.fast = fast
+        self.scale = scale
+        self.cache_seconds = cache_seconds
+        self.history = MarkaRingBuffer(history_size)
+        self.cached_marka_y = None
+        self.last_marka_time = 0
+
+    def find(self, frame):
+        """Deteksi mentah tanpa smoothing (int Python, aman untuk metadata JSON)"""
+        if self.fast:
+            return find_marking_line_fast(frame, self.scale)
+        marka_y = find_marking_line(frame)
+        # Versi lama mengembalikan numpy.int32 dari HoughLinesP
+        return None if marka_y is None else int(marka_y)
+
+    def detect(self, frame, now=None):
+        """
+        Deteksi dengan smoothing ring buffer dan cache (pengganti detect_road_marking).
+        now = waktu frame (jam simulasi saat replay), default time.time()
+        """
+        now = time.time() if now is None else now
+        marka_y = self.find(frame)
+
+        if marka_y is not None:
+            self.history.append(marka_y)
+            self.cached_marka_y = int(self.history.mean())
+            self.last_marka_time = now
+        elif self.cached_marka_y and (now - self.last_marka_time < self.cache_seconds):
+            marka_y = self.cached_marka_y
+
+        return marka_y
+
+# =============================================
+# KALIBRASI GARIS MARKA STATIS (KAMERA TETAP)
+# =============================================
+
+class StopLineCalibrator:
+    def __init__(self, camera_id, calibration_file, detector=None, burst_frames=30, verify_interval=60.0,
+                 band_height=6, drift_threshold=0.6, drift_retry=1.0, move_tolerance=8):
+        self.camera_id = str(camera_id)
+        self.detector = detector or RoadMarkingDetector()
+        self.calibration_file = calibration_file
+        self.burst_frames = burst_frames
+        self.verify_interval = verify_interval
+        self.band_height = band_height
+        self.drift_threshold = drift_threshold
+        self.drift_retry = drift_retry
+        self.move_tolerance = move_tolerance
+
+        self.marka_y = None
+        self.reference_band = None
+        self.frame_shape = None
+        self.burst = []
+        self.last_verify = 0          # None = kalibrasi dari disk, dihitung mulai frame pertama
+        self.last_drift_check_failed = 0
+
+        # Statistik
+        self.redetections = 0
+        self.drift_failures = 0
+
+        self.load()
+
+    def load(self):
+        """Muat hasil kalibrasi kamera ini dari disk"""
+        try:
+            if not os.path.exists(self.calibration_file):
+                return False
+            with open(self.calibration_file, 'r') as f:
+                entry = json.load(f).get(self.camera_id)
+            if not entry:
+                return False
+            self.marka_y = entry['marka_y']
+            self.frame_shape = tuple(entry['frame_shape'])
+            self.reference_band = np.array(entry['reference_band'], dtype=np.float32)
+            self.last_verify = None
+            print(f"📐 Kalibrasi marka kamera {self.camera_id} dimuat: y={self.marka_y}")
+            return True
+        except Exception as e:
+            print(f"⚠️ Gagal memuat kalibrasi marka: {e}")
+            return False
+
+    def save(self):
+        """Simpan hasil kalibrasi per kamera (write-then-rename agar atomik)"""
+        try:
+            data = {}
+            if os.path.exists(self.calibration_file):
+                with open(self.calibration_file, 'r') as f:
+                    data = json.load(f)
+            data[self.camera_id] = {
+                'marka_y': int(self.marka_y),
+                'frame_shape': list(self.frame_shape),
+                'reference_band': self.reference_band.tolist(),
+                'calibrated_at': time.strftime('%Y-%m-%d %H:%M:%S')
+            }
+            temp_path = self.calibration_file + ".tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.calibration_file)
+        except Exception as e:
+            print(f"⚠️ Gagal menyimpan kalibrasi marka: {e}")
+
+    def recalibrate(self):
+        """Buang hasil kalibrasi dan kumpulkan burst frame baru"""
+        self.marka_y = None
+        self.reference_band = None
+        self.burst = []
+
+    def is_calibrated(self):
+        return self.marka_y is not None
+
+    def _band_profile(self, frame, marka_y):
+        """Mask putih di pita tipis sekitar garis, di-downscale 4x horizontal"""
+        top = max(0, marka_y - self.band_height)
+        bottom = min(frame.shape[0], marka_y + self.band_height + 1)
+        band = white_mask(frame[top:bottom, ::4])
+        return (band > 0).astype(np.float32)
+
+    def drift_score(self, frame):
+        """Korelasi mask pita saat ini terhadap referensi (1.0 = identik)"""
+        current = self._band_profile(frame, self.marka_y)
+        if current.shape != self.reference_band.shape:
+            return 0.0
+        a = current - current.mean()
+        b = self.reference_band - self.reference_band.mean()
+        denom = np.sqrt((a * a).sum() * (b * b).sum())
+        if denom == 0:
+            return 1.0 if np.array_equal(current, self.reference_band) else 0.0
+        return float((a * b).sum() / denom)
+
+    def _set_line(self, frame, marka_y, now, persist=True):
+        self.marka_y = int(marka_y)
+        self.frame_shape = frame.shape[:2]
+        self.reference_band = self._band_profile(frame, self.marka_y)
+        self.last_verify = now
+        if persist:
+            self.save()
+
+    def _collect_burst(self, frame, now):
+        """Kumpulkan deteksi dari burst frame lalu ambil median"""
+        marka_y = self.detector.find(frame)
+        self.burst.append(marka_y)
+
+        if len(self.burst) >= self.burst_frames:
+            found = [y for y in self.burst if y is not None]
+            if len(found) >= self.burst_frames // 2:
+                self._set_line(frame, int(np.median(found)), now)
+                print(f"📐 Kalibrasi marka selesai: y={self.marka_y} "
+                      f"({len(found)}/{len(self.burst)} frame terdeteksi)")
+            else:
+                print(f"⚠️ Kalibrasi marka gagal ({len(found)}/{len(self.burst)} frame), mengulang...")
+            self.burst = []
+        return marka_y
+
+    def _redetect(self, frame, now):
+        """Jalur drift: deteksi ulang dengan smoothing dan cache 1.5 detik"""
+        self.redetections += 1
+        self.last_verify = now
+        marka_y = self.detector.detect(frame, now)
+        if marka_y is None:
+            return
+
+        moved = abs(marka_y - self.marka_y) > self.move_tolerance
+        if moved:
+            print(f"📐 Garis marka bergeser: {self.marka_y} → {marka_y}")
+        # Referensi pita diperbarui (misal perubahan cahaya), disk hanya ditulis jika bergeser
+        self._set_line(frame, marka_y, now, persist=moved)
+
+    def get_marka_y(self, frame, now=None):
+        """Posisi garis marka untuk frame ini (now = waktu frame, default time.time())"""
+        now = time.time() if now is None else now
+        if self.marka_y is None or frame.shape[:2] != self.frame_shape:
+            if self.marka_y is not None:
+                # Resolusi kamera berubah: kalibrasi lama tidak berlaku
+                self.recalibrate()
+            return self._collect_burst(frame, now)
+
+        if self.last_verify is None:
+            self.last_verify = now
+        if now - self.last_verify >= self.verify_interval:
+            self._redetect(frame, now)
+        elif self.drift_score(frame) < self.drift_threshold:
+            self.drift_failures += 1
+            # Batasi deteksi ulang saat garis tertutup kendaraan
+            if now - self.last_drift_check_failed >= self.drift_retry:
+                self.last_drift_check_failed = now
+                self._redetect(frame, now)
+
+        return self.marka_y
@@ -1,58 +1,229 @@
 # =============================================
-# FUNGSI SIMPAN DATA KE DATABASE
+# PENYIMPANAN DATA PELANGGARAN KE DATABASE (BATCH)
 # =============================================
+# Baris pelanggaran dikumpulkan lalu disimpan dengan satu executemany + commit
+# saat batch penuh atau interval waktu habis. Anti-duplikasi memakai UNIQUE
+# KEY pada image_path (INSERT IGNORE), bukan SELECT COUNT(*) sebelum INSERT.
+#
+# Backend MySQL dan SQLite punya interface yang sama:
+#   insert_many(rows) -> jumlah baris baru (rows: list (label, timestamp, image_path))
+#   close()
 
 import os
-import mysql.connector
-from config.settings import DB_CONFIG
-
-# Koneksi database global
-try:
-    db = mysql.connector.connect(**DB_CONFIG)
-    print("? Koneksi database berhasil (utils/save_db.py)")
-except mysql.connector.Error as e:
-    print(f"? Gagal koneksi database: {e}")
-    db = None
-
-def save_to_database(label, timestamp, image_path, fps, metadata, file_transfer):
-    """Simpan data pelanggaran ke database dan kirim ke laptop"""
-
-    if db is None:
-        print("?? Tidak ada koneksi database aktif")
-        return
-
-    try:
-        cursor = db.cursor()
-        image_name = os.path.basename(image_path)
-
-        # Cek apakah gambar sudah ada
-        query_check = "SELECT COUNT(*) FROM violations WHERE image_path = %s"
-        cursor.execute(query_check, (image_name,))
-        result = cursor.fetchone()
-
-        if result[0] == 0:
-            # Simpan ke database
-            query_insert = "INSERT INTO violations (label, timestamp, image_path) VALUES (%s, %s, %s)"
-            cursor.execute(query_insert, (label, timestamp, image_name))
-            db.commit()
-            print(f"? Data tersimpan: {label}, {timestamp}, {image_name} | FPS: {fps:.2f}")
-
-            # Kirim file ke laptop
-            transfer_metadata = {
-                'label': label,
-                'timestamp': timestamp,
-                'fps': fps,
-                'violation_type': 'red_light_violation',
-                'location': 'Traffic Light Camera 1'
-            }
-            if metadata:
-                transfer_metadata.update(metadata)
-
-            file_transfer.add_to_queue(image_path, transfer_metadata)
-        else:
-            print(f"?? Duplikasi: {image_name} sudah ada di database")
-
-        cursor.close()
-
-    except mysql.connector.Error as e:
-        print(f"? Error saat menyimpan ke database: {e}")
+import time
+import sqlite3
+import threading
+from collections import deque
+from utils.pipeline import BoundedQueue, POLICY_BLOCK
+from utils.metrics import NULL_METRICS
+
+_STOP = object()
+
+class MySQLBackend:
+    """MySQL dengan connection pool kecil"""
+
+    def __init__(self, config, pool_size=2):
+        import mysql.connector
+        from mysql.connector import pooling
+        self.errors = mysql.connector.Error
+        self.pool = pooling.MySQLConnectionPool(pool_name="violations", pool_size=pool_size, **config)
+        self.kind = "mysql"
+        self.ensure_schema()
+
+    def ensure_schema(self):
+        """Pastikan tabel dan UNIQUE KEY image_path ada (dibutuhkan INSERT IGNORE)"""
+        conn = self.pool.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS violations (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    label VARCHAR(100) NOT NULL,
+                    timestamp DATETIME NOT NULL,
+                    image_path VARCHAR(255) NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE KEY uq_image_path (image_path)
+                )""")
+            try:
+                cursor.execute("ALTER TABLE violations ADD UNIQUE KEY uq_image_path (image_path)")
+            except self.errors as e:
+                if e.errno == 1062:
+                    # Tanpa UNIQUE KEY, INSERT IGNORE diam-diam berhenti mencegah record ganda
+                    raise RuntimeError(
+                        "Tabel violations berisi image_path ganda, UNIQUE KEY uq_image_path tidak bisa dibuat. "
+                        "Hapus duplikat dulu, mis.: DELETE v1 FROM violations v1 JOIN violations v2 "
+                        "ON v1.image_path = v2.image_path AND v1.id > v2.id; lalu jalankan ulang program"
+                    ) from e
+                if e.errno != 1061:  # 1061: key sudah ada
+                    raise
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+
+    def insert_many(self, rows):
+        conn = self.pool.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany("INSERT IGNORE INTO violations (label, timestamp, image_path) VALUES (%s, %s, %s)", rows)
+            inserted = cursor.rowcount
+            conn.commit()
+            cursor.close()
+            return inserted
+        finally:
+            # Kembalikan koneksi ke pool
+            conn.close()
+
+    def close(self):
+        pass
+
+
+class SQLiteBackend:
+    """SQLite lokal dengan skema yang sama (untuk uji coba dan benchmark tanpa MySQL)"""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.kind = "sqlite"
+        with self.lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS violations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    label TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    image_path TEXT NOT NULL UNIQUE,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )""")
+            self.conn.commit()
+
+    def insert_many(self, rows):
+        with self.lock:
+            cursor = self.conn.executemany("INSERT OR IGNORE INTO violations (label, timestamp, image_path) VALUES (?, ?, ?)", rows)
+            self.conn.commit()
+            return cursor.rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def create_db_backend(kind, config=None, sqlite_file=None, pool_size=2):
+    if kind == "mysql":
+        return MySQLBackend(config, pool_size)
+    if kind == "sqlite":
+        return SQLiteBackend(sqlite_file)
+    raise ValueError(f"Backend database tidak dikenal: {kind}")
+
+
+class ViolationWriter:
+    """
+    Thread penulis database: put(record) tidak pernah menunggu database.
+    Bisa dipasang sebagai anggota Pipeline (start/stop/get_stats).
+
+    record: dict dengan label, timestamp, image_path (+ data lain untuk on_committed)
+    on_committed(record) dipanggil untuk setiap record setelah batch-nya di-commit.
+    """
+
+    def __init__(self, backend, on_committed=None, batch_size=50, flush_interval=1.0, retry_interval=5.0,
+                 maxsize=1024, policy=POLICY_BLOCK, name="database", metrics=None):
+        self.name = name
+        self.metrics = metrics or NULL_METRICS
+        self.backend = backend
+        self.on_committed = on_committed
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retry_interval = retry_interval
+
+        self.input = BoundedQueue(name, maxsize, policy)
+        self.pending = []
+        self.thread = None
+
+        # Statistik
+        self.processed = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.flushes = 0
+        self.errors = 0
+        self.max_time = 0.0
+        self.recent_times = deque(maxlen=100)
+
+    def put(self, record):
+        return self.input.put(record)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Simpan semua record yang tertunda lalu hentikan thread"""
+        self.input.put(_STOP, force_block=True)
+        if self.thread:
+            self.thread.join()
+
+    def _run(self):
+        deadline = None
+        retry_at = 0.0
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            record = self.input.get(timeout)
+            if record is _STOP:
+                break
+            if record is not None:
+                self.pending.append(record)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            now = time.monotonic()
+            if self.pending and now >= retry_at and (len(self.pending) >= self.batch_size or now >= deadline):
+                if self.flush():
+                    deadline = None
+                else:
+                    retry_at = now + self.retry_interval
+                    deadline = retry_at
+
+        if self.pending:
+            self.flush()
+
+    def flush(self):
+        """Simpan record tertunda dalam batch; return False jika database gagal (record disimpan untuk dicoba lagi)"""
+        while self.pending:
+            batch = self.pending[:self.batch_size]
+            rows = [(r['label'], r['timestamp'], os.path.basename(r['image_path'])) for r in batch]
+            start = time.perf_counter()
+            try:
+                inserted = self.backend.insert_many(rows)
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Error database ({len(self.pending)} record tertunda): {e}")
+                return False
+            elapsed = time.perf_counter() - start
+            self.metrics.observe("db", elapsed)
+
+            del self.pending[:len(batch)]
+            self.processed += len(batch)
+            self.inserted += inserted
+            self.duplicates += len(batch) - inserted
+            self.flushes += 1
+            self.max_time = max(self.max_time, elapsed)
+            self.recent_times.append(elapsed)
+            print(f"✅ {inserted} pelanggaran tersimpan ke {self.backend.kind} ({len(batch) - inserted} duplikat) | {elapsed * 1000:.1f}ms")
+
+            if self.on_committed is not None:
+                for record in batch:
+                    self.on_committed(record)
+        return True
+
+    def get_stats(self):
+        recent = list(self.recent_times)
+        return {
+            'queue': self.input.qsize() + len(self.pending),
+            'max_queue': self.input.max_depth,
+            'dropped': self.input.dropped,
+            'processed': self.processed,
+            'errors': self.errors,
+            'avg_ms': (sum(recent) / len(recent) * 1000) if recent else 0.0,
+            'max_ms': self.max_time * 1000,
+            'inserted': self.inserted,
+            'duplicates': self.duplicates,
+            'flushes': self.flushes
+        }
@@ -0,0 +1,110 @@
+# =============================================
+# SCHEDULER BERDASARKAN FASE LAMPU
+# =============================================
+
+import time
+from utils.light_status import get_phase_timeline
+from config.settings import cycle_time
+
+class PhaseScheduler:
+    """
+    Memakai timeline lampu yang sudah diketahui untuk: menurunkan rate capture dan
+    deteksi marka di luar fase merah, warm-up model tepat sebelum RED, dan mencatat
+    latensi frame RED pertama di setiap pergantian fase.
+    """
+
+    def __init__(self, camera_id, start_cycle, profiles, warmup_lead=1.0):
+        self.camera_id = camera_id
+        self.start_cycle = start_cycle
+        self.profiles = profiles
+        self.warmup_lead = warmup_lead
+
+        self.phase = None
+        self.phase_started = None
+        self.frames_in_phase = 0
+        self.last_frame_time = 0
+        # Flag warm-up dan frame RED pertama baru dilepas setelah stage inferensi
+        # benar-benar menjalankannya (batch bisa dibuang atau model belum dimuat)
+        self.warmed_cycle = None
+        self.red_pending = False
+
+        # Laporan transisi fase
+        self.warmup_ms = None
+        self.reports = []
+
+    def profile(self, phase=None):
+        return self.profiles[phase or self.phase or "RED"]
+
+    def next_wakeup(self, now=None):
+        """Waktu frame berikutnya perlu diproses: slot rate profil atau batas fase, mana yang lebih dulu"""
+        now = time.time() if now is None else now
+        status, until_next, _ = get_phase_timeline(self.start_cycle, now)
+        capture_fps = self.profiles[status]['capture_fps']
+        if not capture_fps:
+            return now
+        return min(self.last_frame_time + 1.0 / capture_fps, now + until_next)
+
+    def frame_due(self, now=None):
+        now = time.time() if now is None else now
+        return self.next_wakeup(now) <= now
+
+    def on_frame(self, now=None):
+        """Daftarkan frame yang akan diproses; return info penjadwalan untuk ctx"""
+        now = time.time() if now is None else now
+        status, _, until_red = get_phase_timeline(self.start_cycle, now)
+        self.last_frame_time = now
+
+        if status != self.phase:
+            if self.phase is not None:
+                print(f"🚦 [{self.camera_id}] {self.phase} → {status}")
+            self.red_pending = status == "RED"
+            self.phase = status
+            self.phase_started = now
+            self.frames_in_phase = 0
+        self.frames_in_phase += 1
+
+        # Warm-up sekali per siklus, warmup_lead detik sebelum RED (diulang sampai tercatat)
+        cycle_index = int((now - self.start_cycle) // cycle_time)
+        warmup = status != "RED" and until_red <= self.warmup_lead and self.warmed_cycle != cycle_index
+
+        marking_every = self.profile(status)['marking_every']
+        return {
+            'status': status,
+            'first_red': status == "RED" and self.red_pending,
+            'warmup': warmup,
+            'cycle': cycle_index,
+            'until_red': until_red,
+            'run_marking': (self.frames_in_phase - 1) % marking_every == 0
+        }
+
+    def record_warmup(self, ctx, elapsed_ms):
+        """Warm-up untuk frame ctx sudah dijalankan; siklus ini tidak perlu warm-up lagi"""
+        if self.warmed_cycle == ctx['cycle']:
+            return
+        self.warmed_cycle = ctx['cycle']
+        self.warmup_ms = elapsed_ms
+        print(f"🔥 [{self.camera_id}] Warm-up model {elapsed_ms:.1f}ms, {ctx['until_red']:.2f}s sebelum RED")
+
+    def record_first_red(self, ctx):
+        """Catat latensi frame RED pertama yang diinferensi (capture → selesai inferensi)"""
+        if not self.red_pending:
+            return
+        self.red_pending = False
+        latency_ms = (time.time() - ctx['start_time']) * 1000
+        report = {
+            'camera_id': self.camera_id,
+            'latency_ms': latency_ms,
+            'warmup_ms': self.warmup_ms,
+            'phase_offset_ms': (ctx['frame_time'] - self.phase_started) * 1000 if self.phase_started else 0
+        }
+        self.reports.append(report)
+        warmup = f"warm-up {self.warmup_ms:.1f}ms" if self.warmup_ms is not None else "tanpa warm-up"
+        print(f"🚦 [{self.camera_id}] Frame RED pertama: {latency_ms:.1f}ms ({warmup})")
+        self.warmup_ms = None
+
+    def print_report(self):
+        if not self.reports:
+            return
+        latencies = [r['latency_ms'] for r in self.reports]
+        print(f"🚦 [{self.camera_id}] Latensi frame RED pertama: rata-rata {sum(latencies) / len(latencies):.1f}ms | "
+              f"min {min(latencies):.1f}ms | max {max(latencies):.1f}ms | {len(latencies)} fase merah")
@@ -0,0 +1,95 @@
+# =============================================
+# TIMELINE STARTUP DAN LANGKAH STARTUP PARALEL
+# =============================================
+# Setelah reboot/restart, kamera "buta" sampai semua langkah startup selesai.
+# Langkah yang saling bebas (koneksi database, load model, transfer manager,
+# buka kamera) dijalankan bersamaan di thread masing-masing lewat run(), dan
+# setiap langkah dicatat relatif terhadap waktu proses dimulai (termasuk
+# waktu interpreter dan import modul), sehingga time-to-first-frame dan
+# time-to-first-inference bisa dibandingkan antar versi.
+#
+# Contoh:
+#   timeline = StartupTimeline()
+#   model_task = timeline.run("model dimuat", create_backend, "onnx", path)
+#   ...
+#   timeline.mark_once("frame pertama")
+#   model = model_task.result()
+
+import time
+import threading
+from concurrent.futures import Future
+import psutil
+
+def process_start_time():
+    """Waktu proses dimulai (epoch); waktu sekarang jika tidak bisa dibaca"""
+    try:
+        return psutil.Process().create_time()
+    except Exception:
+        return time.time()
+
+
+class StartupTimeline:
+    def __init__(self, start=None):
+        self.start = process_start_time() if start is None else start
+        self.events = []  # (detik sejak start, nama, durasi langkah atau None)
+        self.marked = set()
+        self.lock = threading.Lock()
+
+    def mark(self, name, duration=None):
+        """Catat satu kejadian startup; return detik sejak proses dimulai"""
+        elapsed = time.time() - self.start
+        with self.lock:
+            self.events.append((elapsed, name, duration))
+            self.marked.add(name)
+        return elapsed
+
+    def mark_once(self, name):
+        """Seperti mark(), tetapi hanya kejadian pertama yang dicatat; return True jika baru dicatat"""
+        with self.lock:
+            if name in self.marked:
+                return False
+            self.marked.add(name)
+        self.mark(name)
+        return True
+
+    def elapsed(self, name):
+        """Detik sejak start saat kejadian `name` dicatat; None jika belum terjadi"""
+        with self.lock:
+            for elapsed, event, _ in self.events:
+                if event == name:
+                    return elapsed
+        return None
+
+    def run(self, name, func, *args, **kwargs):
+        """
+        Jalankan func di thread sendiri dan catat durasinya dengan nama `name`.
+        Return Future: result() menunggu hasil (exception dari func dilempar ulang).
+        """
+        future = Future()
+
+        def worker():
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                self.mark(f"{name} GAGAL", time.perf_counter() - started)
+                future.set_exception(e)
+                return
+            self.mark(name, time.perf_counter() - started)
+            future.set_result(result)
+
+        future.set_running_or_notify_cancel()
+        threading.Thread(target=worker, name=f"startup-{name}", daemon=True).start()
+        return future
+
+    def print_report(self, first_frame="frame pertama", first_inference="inferensi pertama"):
+        with self.lock:
+            events = sorted(self.events)
+        print("⏱️ Timeline startup (detik sejak proses dimulai):")
+        for elapsed, name, duration in events:
+            took = f"  (langkah {duration:.2f}s)" if duration is not None else ""
+            print(f"   {elapsed:7.2f}s  {name}{took}")
+        frame_at = self.elapsed(first_frame)
+        inference_at = self.elapsed(first_inference)
+        print(f"   ⏩ time-to-first-frame: {f'{frame_at:.2f}s' if frame_at is not None else '-'} | "
+              f"time-to-first-inference: {f'{inference_at:.2f}s' if inference_at is not None else '-'}")
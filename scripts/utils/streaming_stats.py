@@ -0,0 +1,188 @@
+# =============================================
+# STATISTIK STREAMING DENGAN MEMORI KONSTAN
+# =============================================
+# Pengganti list yang terus bertambah untuk laporan FPS/CPU/RAM/suhu:
+# - RunningStats   : count, mean dan variance (Welford), min, max
+# - QuantileSketch : sketch kuantil berbasis bucket logaritmik (error relatif
+#                    terbatas, seperti DDSketch) sehingga p50/p95/p99 bisa
+#                    dihitung tanpa menyimpan sampel; dua sketch bisa digabung
+# - StreamingStats : gabungan keduanya
+# - RollingStats   : jendela bergulir (mis. 1 jam terakhir) sebagai ring slot
+#                    StreamingStats; slot kedaluwarsa diganti, bukan dihapus per sampel
+#
+# Semua struktur punya merge(), jadi statistik per fase lampu/per jendela
+# dapat digabung untuk laporan tanpa membaca ulang data.
+
+import math
+import time
+
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Gabungkan statistik lain (algoritma paralel Chan dkk.)"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """
+    Sketch kuantil dengan error relatif `relative_accuracy` (nilai >= 0).
+    Nilai dipetakan ke bucket logaritmik; jumlah bucket dibatasi max_buckets
+    (bucket terkecil digabung jika penuh, jadi kuantil atas tetap akurat).
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_buckets=2048, min_value=1e-3):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.inverse_log_gamma = 1 / math.log(self.gamma)
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value, count=1):
+        self.count += count
+        if value <= self.min_value:
+            self.zero_count += count
+            return
+        key = math.ceil(math.log(value) * self.inverse_log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def _collapse(self):
+        # Gabungkan dua bucket terkecil
+        lowest, second = sorted(self.buckets)[:2]
+        self.buckets[second] += self.buckets.pop(lowest)
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("Sketch dengan akurasi berbeda tidak bisa digabung")
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        while len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def quantile(self, q):
+        """Perkiraan kuantil q (0..1); None jika sketch kosong"""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                # Titik tengah bucket (gamma^(key-1), gamma^key]
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class StreamingStats:
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.running = RunningStats()
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def add(self, value):
+        self.running.add(value)
+        self.sketch.add(value)
+
+    def merge(self, other):
+        self.running.merge(other.running)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def count(self):
+        return self.running.count
+
+    def quantile(self, q):
+        value = self.sketch.quantile(q)
+        # Titik tengah bucket bisa sedikit di luar rentang data asli
+        return None if value is None else min(max(value, self.running.min), self.running.max)
+
+    def summary(self):
+        """Ringkasan O(jumlah bucket) untuk laporan; None jika belum ada sampel"""
+        if self.running.count == 0:
+            return None
+        return {
+            'count': self.running.count,
+            'mean': self.running.mean,
+            'std': self.running.std,
+            'min': self.running.min,
+            'max': self.running.max,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99)
+        }
+
+
+class RollingStats:
+    """Statistik untuk `window` detik terakhir, dibagi `slots` slot StreamingStats"""
+
+    def __init__(self, window=3600, slots=60, relative_accuracy=0.01):
+        self.window = window
+        self.slot_seconds = window / slots
+        self.relative_accuracy = relative_accuracy
+        self.slots = [None] * slots
+        self.slot_ids = [None] * slots
+
+    def add(self, value, now=None):
+        slot_id = int((time.time() if now is None else now) // self.slot_seconds)
+        index = slot_id % len(self.slots)
+        if self.slot_ids[index] != slot_id:
+            # Slot lama sudah keluar dari jendela: ganti dengan slot baru
+            self.slots[index] = StreamingStats(self.relative_accuracy)
+            self.slot_ids[index] = slot_id
+        self.slots[index].add(value)
+
+    def snapshot(self, now=None):
+        """Gabungan semua slot yang masih di dalam jendela"""
+        current = int((time.time() if now is None else now) // self.slot_seconds)
+        merged = StreamingStats(self.relative_accuracy)
+        for slot_id, slot in zip(self.slot_ids, self.slots):
+            if slot is not None and current - slot_id < len(self.slots):
+                merged.merge(slot)
+        return merged
+
+    def summary(self, now=None):
+        return self.snapshot(now).summary()
@@ -3,22 +3,26 @@
 # =============================================
 
 import time
-import numpy as np
+import threading
 import psutil
 from collections import defaultdict, deque
-import GPUtil
+from utils.streaming_stats import StreamingStats, RollingStats
+
+STATUSES = ['RED', 'YELLOW', 'GREEN', 'OVERALL']
 
 class SystemMonitor:
-    def __init__(self):
-        self.stats = {
-            'RED': defaultdict(list),
-            'YELLOW': defaultdict(list),
-            'GREEN': defaultdict(list),
-            'OVERALL': defaultdict(list)
-        }
+    def __init__(self, sample_interval=1.0, recent_window=3600, gpu=True):
+        # Statistik streaming (memori konstan) per fase lampu dan keseluruhan
+        self.stats = {status: defaultdict(StreamingStats) for status in STATUSES}
+        # Jendela bergulir untuk laporan "N menit terakhir"
+        self.recent_window = recent_window
+        self.recent = defaultdict(lambda: RollingStats(window=recent_window, slots=60))
         self.start_time = time.time()
         self.last_update = time.time()
 
+        # Snapshot terakhir dari thread sampler. Dict ini tidak pernah diubah
+        # setelah dipublikasikan, hanya referensinya yang diganti, sehingga
+        # main loop cukup membaca atribut tanpa lock.
         self.current_stats = {
             'cpu_percent': 0,
             'ram_percent': 0,
@@ -33,8 +37,39 @@ class SystemMonitor:
         self.ram_history = deque(maxlen=10)
         self.temp_history = deque(maxlen=10)
 
+        # Sampling di background
+        self.sample_interval = sample_interval
+        # GPUtil baru diimport di thread sampler saat probe pertama (gpu=False: tidak pernah)
+        self.gpu_available = gpu
+        self._stop_event = threading.Event()
+        self._sampler_thread = None
+
         print("📊 System Monitor initialized")
 
+    def start(self):
+        """Jalankan thread sampler di background"""
+        if self._sampler_thread and self._sampler_thread.is_alive():
+            return
+        self._stop_event.clear()
+        # Panggilan pertama cpu_percent(None) hanya menyiapkan baseline
+        psutil.cpu_percent(interval=None)
+        self._sampler_thread = threading.Thread(target=self._sampler_loop, daemon=True)
+        self._sampler_thread.start()
+        print(f"📊 Sampler sistem berjalan tiap {self.sample_interval:.1f}s")
+
+    def stop(self):
+        """Hentikan thread sampler"""
+        self._stop_event.set()
+        if self._sampler_thread:
+            self._sampler_thread.join(timeout=self.sample_interval + 1)
+            self._sampler_thread = None
+
+    def _sampler_loop(self):
+        """Loop sampler: ambil sampel sistem sesuai interval"""
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.sample_interval)
+
     def get_cpu_temperature(self):
         try:
             with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
@@ -52,15 +87,33 @@ class SystemMonitor:
             except:
                 return 0
 
+    def get_gpu_usage(self):
+        """Baca beban GPU; probe dimatikan setelah gagal pertama kali"""
+        if not self.gpu_available:
+            return 0, 0
+        try:
+            import GPUtil
+            gpus = GPUtil.getGPUs()
+            if gpus:
+                gpu = gpus[0]
+                return gpu.load * 100, gpu.memoryUsed
+        except Exception as e:
+            print(f"⚠️ GPU probe gagal, GPU monitoring dinonaktifkan: {e}")
+        # Tidak ada GPU: jangan jalankan nvidia-smi lagi di sampel berikutnya
+        self.gpu_available = False
+        return 0, 0
+
     def estimate_power_consumption(self, cpu_percent, gpu_percent=0):
         base_power = 2.5
         cpu_power = (cpu_percent / 100) * 3.0
         gpu_power = (gpu_percent / 100) * 1.5
         return base_power + cpu_power + gpu_power
 
-    def update_stats(self, light_status, fps):
+    def sample(self):
+        """Ambil satu sampel CPU, RAM, suhu, dan GPU lalu publikasikan snapshot"""
         try:
-            cpu_percent = psutil.cpu_percent(interval=0.1)
+            # interval=None: persentase sejak sampel sebelumnya, tidak blocking
+            cpu_percent = psutil.cpu_percent(interval=None)
             self.cpu_history.append(cpu_percent)
 
             ram = psutil.virtual_memory()
@@ -68,16 +121,7 @@ class SystemMonitor:
             ram_mb = ram.used / (1024 * 1024)
             self.ram_history.append(ram_percent)
 
-            gpu_percent = 0
-            gpu_memory = 0
-            try:
-                gpus = GPUtil.getGPUs()
-                if gpus:
-                    gpu = gpus[0]
-                    gpu_percent = gpu.load * 100
-                    gpu_memory = gpu.memoryUsed
-            except:
-                pass
+            gpu_percent, gpu_memory = self.get_gpu_usage()
 
             temperature = self.get_cpu_temperature()
             self.temp_history.append(temperature)
@@ -85,25 +129,48 @@ class SystemMonitor:
             power_watts = self.estimate_power_consumption(cpu_percent, gpu_percent)
 
             self.current_stats = {
-                'cpu_percent': np.mean(self.cpu_history),
-                'ram_percent': np.mean(self.ram_history),
+                'cpu_percent': sum(self.cpu_history) / len(self.cpu_history),
+                'ram_percent': sum(self.ram_history) / len(self.ram_history),
                 'ram_mb': ram_mb,
                 'gpu_percent': gpu_percent,
                 'gpu_memory': gpu_memory,
-                'temperature': np.mean(self.temp_history),
+                'temperature': sum(self.temp_history) / len(self.temp_history),
                 'power_watts': power_watts
             }
-
-            for key in ['fps', 'cpu', 'ram', 'gpu', 'temperature', 'power']:
-                self.stats[light_status][key].append(self.current_stats[key if key != 'cpu' else 'cpu_percent'])
-                self.stats['OVERALL'][key].append(self.current_stats[key if key != 'cpu' else 'cpu_percent'])
+            self.last_update = time.time()
 
         except Exception as e:
             print(f"⚠️ Error updating system stats: {e}")
 
+    def update_stats(self, light_status, fps):
+        """Catat FPS frame ini bersama snapshot sistem terakhir (tanpa blocking)"""
+        snapshot = self.current_stats
+
+        values = {
+            'fps': fps,
+            'cpu': snapshot['cpu_percent'],
+            'ram': snapshot['ram_percent'],
+            'gpu': snapshot['gpu_percent'],
+            'temperature': snapshot['temperature'],
+            'power': snapshot['power_watts']
+        }
+        now = time.time()
+        for key, value in values.items():
+            self.stats[light_status][key].add(value)
+            self.stats['OVERALL'][key].add(value)
+            self.recent[key].add(value, now)
+
     def get_current_stats(self):
         return self.current_stats
 
+    def get_summary(self, status='OVERALL', key='fps'):
+        """Ringkasan (count, mean, std, min, max, p50/p95/p99) satu metrik; None jika belum ada sampel"""
+        return self.stats[status][key].summary()
+
+    def get_recent_summary(self, key='fps'):
+        """Ringkasan satu metrik dalam jendela recent_window detik terakhir"""
+        return self.recent[key].summary()
+
     def print_final_report(self):
         print("\n" + "="*80)
         print("📈 LAPORAN AKHIR SISTEM MONITORING")
@@ -112,30 +179,29 @@ class SystemMonitor:
         runtime = time.time() - self.start_time
         print(f"⏱️  Total Runtime: {runtime/60:.2f} menit ({runtime:.2f} detik)")
 
-        for status in ['RED', 'YELLOW', 'GREEN', 'OVERALL']:
-            data = self.stats[status]
+        for status in STATUSES:
+            data = {key: stats.summary() for key, stats in self.stats[status].items()}
             if not data.get('fps'):
                 continue
-
             print(f"\n🚦 Status: {status}")
             print("-" * 40)
-            avg_fps = np.mean(data['fps'])
-            avg_cpu = np.mean(data['cpu'])
-            avg_ram = np.mean(data['ram'])
-            avg_gpu = np.mean(data['gpu']) if data['gpu'] else 0
-            avg_temp = np.mean(data['temperature'])
-            avg_power = np.mean(data['power'])
-
-            min_fps, max_fps = np.min(data['fps']), np.max(data['fps'])
-            min_cpu, max_cpu = np.min(data['cpu']), np.max(data['cpu'])
-            min_temp, max_temp = np.min(data['temperature']), np.max(data['temperature'])
-
-            print(f"   FPS      : {avg_fps:.2f} (min: {min_fps:.2f}, max: {max_fps:.2f})")
-            print(f"   CPU      : {avg_cpu:.1f}% (min: {min_cpu:.1f}%, max: {max_cpu:.1f}%)")
-            print(f"   RAM      : {avg_ram:.1f}%")
-            print(f"   GPU      : {avg_gpu:.1f}%")
-            print(f"   Temp     : {avg_temp:.1f}°C (min: {min_temp:.1f}°C, max: {max_temp:.1f}°C)")
-            print(f"   Power    : {avg_power:.2f}W")
-            print(f"   Samples  : {len(data['fps'])}")
+            self._print_summary(data)
+
+        recent = {key: rolling.summary() for key, rolling in self.recent.items()}
+        if recent.get('fps'):
+            print(f"\n🕐 {self.recent_window / 60:.0f} menit terakhir")
+            print("-" * 40)
+            self._print_summary(recent)
 
         print("\n" + "="*80)
+
+    def _print_summary(self, data):
+        fps, cpu, temp = data['fps'], data['cpu'], data['temperature']
+        print(f"   FPS      : {fps['mean']:.2f} ± {fps['std']:.2f} (min: {fps['min']:.2f}, max: {fps['max']:.2f})")
+        print(f"              p50 {fps['p50']:.2f} | p95 {fps['p95']:.2f} | p99 {fps['p99']:.2f}")
+        print(f"   CPU      : {cpu['mean']:.1f}% (min: {cpu['min']:.1f}%, max: {cpu['max']:.1f}%, p95: {cpu['p95']:.1f}%)")
+        print(f"   RAM      : {data['ram']['mean']:.1f}%")
+        print(f"   GPU      : {data['gpu']['mean']:.1f}%")
+        print(f"   Temp     : {temp['mean']:.1f}°C (min: {temp['min']:.1f}°C, max: {temp['max']:.1f}°C, p95: {temp['p95']:.1f}°C)")
+        print(f"   Power    : {data['power']['mean']:.2f}W")
+        print(f"   Samples  : {fps['count']}")
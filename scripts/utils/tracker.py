@@ -0,0 +1,185 @@
+# =============================================
+# MULTI-OBJECT TRACKER (IoU + KALMAN, GAYA BYTETRACK)
+# =============================================
+
+import itertools
+import numpy as np
+
+# Bobot noise Kalman relatif terhadap tinggi box (sama seperti SORT/ByteTrack)
+STD_WEIGHT_POSITION = 1.0 / 20
+STD_WEIGHT_VELOCITY = 1.0 / 160
+
+def iou_matrix(boxes_a, boxes_b):
+    """IoU antar semua pasangan box [x1, y1, x2, y2] (vektorisasi NumPy)"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    a = np.asarray(boxes_a, dtype=np.float32)[:, None, :4]
+    b = np.asarray(boxes_b, dtype=np.float32)[None, :, :4]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+def greedy_match(iou, threshold):
+    """Pasangkan track-deteksi dengan IoU tertinggi lebih dulu"""
+    matches = []
+    if iou.size == 0:
+        return matches, list(range(iou.shape[0])), list(range(iou.shape[1]))
+
+    used_rows, used_cols = set(), set()
+    order = np.argsort(-iou, axis=None)
+    for flat_index in order:
+        row, col = divmod(int(flat_index), iou.shape[1])
+        if iou[row, col] < threshold:
+            break
+        if row in used_rows or col in used_cols:
+            continue
+        matches.append((row, col))
+        used_rows.add(row)
+        used_cols.add(col)
+
+    unmatched_rows = [r for r in range(iou.shape[0]) if r not in used_rows]
+    unmatched_cols = [c for c in range(iou.shape[1]) if c not in used_cols]
+    return matches, unmatched_rows, unmatched_cols
+
+
+class KalmanBoxFilter:
+    """Kalman filter kecepatan konstan untuk state [cx, cy, w, h, vcx, vcy, vw, vh]"""
+
+    def __init__(self, box):
+        x1, y1, x2, y2 = box[:4]
+        w, h = x2 - x1, y2 - y1
+        self.mean = np.array([x1 + w / 2, y1 + h / 2, w, h, 0, 0, 0, 0], dtype=np.float64)
+        std = [
+            2 * STD_WEIGHT_POSITION * h, 2 * STD_WEIGHT_POSITION * h,
+            2 * STD_WEIGHT_POSITION * h, 2 * STD_WEIGHT_POSITION * h,
+            10 * STD_WEIGHT_VELOCITY * h, 10 * STD_WEIGHT_VELOCITY * h,
+            10 * STD_WEIGHT_VELOCITY * h, 10 * STD_WEIGHT_VELOCITY * h
+        ]
+        self.covariance = np.diag(np.square(std))
+
+        self.motion = np.eye(8)
+        for i in range(4):
+            self.motion[i, i + 4] = 1.0
+        self.observation = np.eye(4, 8)
+
+    def predict(self):
+        h = self.mean[3]
+        std = [STD_WEIGHT_POSITION * h] * 4 + [STD_WEIGHT_VELOCITY * h] * 4
+        process_noise = np.diag(np.square(std))
+        self.mean = self.motion @ self.mean
+        self.covariance = self.motion @ self.covariance @ self.motion.T + process_noise
+
+    def update(self, box):
+        x1, y1, x2, y2 = box[:4]
+        w, h = x2 - x1, y2 - y1
+        measurement = np.array([x1 + w / 2, y1 + h / 2, w, h])
+        measurement_noise = np.diag(np.square([STD_WEIGHT_POSITION * h] * 4))
+
+        projected_cov = self.observation @ self.covariance @ self.observation.T + measurement_noise
+        kalman_gain = self.covariance @ self.observation.T @ np.linalg.inv(projected_cov)
+        innovation = measurement - self.observation @ self.mean
+        self.mean = self.mean + kalman_gain @ innovation
+        self.covariance = self.covariance - kalman_gain @ self.observation @ self.covariance
+
+    def to_box(self):
+        cx, cy, w, h = self.mean[:4]
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+
+class Track:
+    def __init__(self, track_id, detection):
+        self.track_id = track_id
+        self.kalman = KalmanBoxFilter(detection)
+        self.box = np.asarray(detection[:4], dtype=np.float64)
+        self.confidence = float(detection[4])
+        self.cls_id = int(detection[5])
+        self.hits = 1
+        self.time_since_update = 0
+
+        # Status pelanggaran
+        self.center_y = (self.box[1] + self.box[3]) / 2
+        self.seen_before_line = False
+        self.violated = False
+
+    def predict(self):
+        self.kalman.predict()
+        self.time_since_update += 1
+
+    def update(self, detection):
+        self.kalman.update(detection)
+        self.box = np.asarray(detection[:4], dtype=np.float64)
+        self.confidence = float(detection[4])
+        self.cls_id = int(detection[5])
+        self.hits += 1
+        self.time_since_update = 0
+        self.center_y = (self.box[1] + self.box[3]) / 2
+
+    def predicted_box(self):
+        return self.kalman.to_box()
+
+
+class ViolationTracker:
+    def __init__(self, high_thresh=0.6, low_thresh=0.25, match_iou=0.3, max_age=30, min_hits=2, id_source=None):
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.match_iou = match_iou
+        self.max_age = max_age
+        self.min_hits = min_hits
+
+        self.tracks = []
+        # id_source bisa dibagi antar kamera agar track ID unik secara global
+        self.id_source = id_source or itertools.count(1)
+
+    def reset(self):
+        """Hapus semua track (misal saat fase merah berakhir)"""
+        self.tracks = []
+
+    def update(self, detections, marka_y=None):
+        """
+        Update tracker dengan deteksi Nx6 [x1, y1, x2, y2, conf, cls].
+        Return (tracks aktif, track yang baru saja melanggar garis marka).
+        """
+        detections = np.asarray(detections, dtype=np.float64).reshape(-1, 6)
+
+        for track in self.tracks:
+            track.predict()
+
+        high = detections[detections[:, 4] >= self.high_thresh]
+        low = detections[(detections[:, 4] >= self.low_thresh) & (detections[:, 4] < self.high_thresh)]
+
+        # 1️⃣ Asosiasi pertama: deteksi confidence tinggi
+        predicted = [track.predicted_box() for track in self.tracks]
+        matches, unmatched_tracks, unmatched_high = greedy_match(
+            iou_matrix(predicted, high), self.match_iou)
+        for track_index, det_index in matches:
+            self.tracks[track_index].update(high[det_index])
+
+        # 2️⃣ Asosiasi kedua: deteksi confidence rendah ke track yang tersisa
+        remaining = [self.tracks[i] for i in unmatched_tracks]
+        matches, _, _ = greedy_match(
+            iou_matrix([t.predicted_box() for t in remaining], low), self.match_iou)
+        for track_index, det_index in matches:
+            remaining[track_index].update(low[det_index])
+
+        # 3️⃣ Deteksi confidence tinggi yang tidak terpasang menjadi track baru
+        for det_index in unmatched_high:
+            self.tracks.append(Track(next(self.id_source), high[det_index]))
+
+        # 4️⃣ Buang track yang terlalu lama hilang
+        self.tracks = [t for t in self.tracks if t.time_since_update <= self.max_age]
+
+        new_violations = []
+        active = [t for t in self.tracks if t.time_since_update == 0]
+        if marka_y:
+            for track in active:
+                if track.center_y <= marka_y:
+                    track.seen_before_line = True
+                elif track.seen_before_line and not track.violated and track.hits >= self.min_hits:
+                    # Pusat box melintasi garis marka: satu event per track
+                    track.violated = True
+                    new_violations.append(track)
+
+        return active, new_violations